@@ -8,6 +8,7 @@ import sys
 
 from datetime import datetime
 
+from infrastructure import clock
 from resource_manager.kube_kata import kube_kata
 from resource_manager.kubernetes import kubernetes
 from resource_manager.endpoint import endpoint
@@ -60,7 +61,12 @@ def start(config, machines):
     elif config["benchmark"]["resource_manager"] in ["kubernetes", "kubeedge"]:
         kube(config, machines)
     elif config["benchmark"]["resource_manager"] in ["kubecontrol", "kube_kata"]:
-        kube_control(config, machines)
+        if config["benchmark"]["application"] == "mem_usage":
+            kube_density(config, machines)
+        elif config["benchmark"].get("churn_rate", 0.0) > 0.0:
+            kube_churn(config, machines)
+        else:
+            kube_control(config, machines)
     else:
         logging.error("ERROR: Don't have a deployment for this resource manager / application")
         sys.exit()
@@ -275,6 +281,26 @@ def kube(config, machines):
     config["module"]["application"].format_output(config, worker_metrics, endpoint_metrics)
 
 
+def measure_clock(config, run):
+    """Run a benchmark between two clock offset measurements of all VMs, and create the clock
+    model from them to compare timestamps between VMs afterwards (stored in config["clock"])
+
+    Args:
+        config (dict): Parsed configuration
+        run (func() -> object): Function that runs the benchmark
+
+    Returns:
+        object: Return value of run
+    """
+    clock_before = clock.measure_offsets(config, config["cloud_ssh"])
+    result = run()
+    clock_after = clock.measure_offsets(config, config["cloud_ssh"])
+
+    config["clock"] = clock.create_model(clock_before, clock_after)
+    clock.print_model(config, config["clock"])
+    return result
+
+
 def kube_control(config, machines):
     """Launch a K8 deployment, benchmarking K8's controlplane instead of applications running on it
 
@@ -290,17 +316,16 @@ def kube_control(config, machines):
         app_vars = config["module"]["application"].cache_worker(config, machines)
         kubernetes.cache_worker(config, machines, app_vars)
 
-    if config["benchmark"]["application"] == "mem_usage":
-        config["module"]["application"].get_mem_usage(config, machines, kubernetes)
+    def run():
+        # Start the worker
+        app_vars = config["module"]["application"].start_worker(config, machines)
+        deployment = kubernetes.start_worker(config, machines, app_vars, get_starttime=True)
 
-    # Start the worker
-    app_vars = config["module"]["application"].start_worker(config, machines)
-    starttime, kubectl_out, status = kubernetes.start_worker(
-        config, machines, app_vars, get_starttime=True
-    )
+        # Wait for benchmark to finish
+        kubernetes.wait_worker_completion(config, machines)
+        return deployment
 
-    # Wait for benchmark to finish
-    kubernetes.wait_worker_completion(config, machines)
+    starttime, kubectl_out, status = measure_clock(config, run)
 
     # Now get raw output
     logging.info("Benchmark has been finished, prepare results")
@@ -318,7 +343,7 @@ def kube_control(config, machines):
 
     if "runtime" in config["benchmark"] and "kata" in config["benchmark"]["runtime"]:
         if config["benchmark"]["application"] == "empty_kata":
-            kata_ts = kube_kata.get_kata_timestamps(config, worker_output)
+            kata_ts = kube_kata.get_kata_timestamps(config, worker_description, starttime, endtime)
             config["module"]["application"].format_output(
                 config,
                 None,
@@ -349,3 +374,72 @@ def kube_control(config, machines):
         resource_output=resource_output,
         endtime=float(endtime - starttime),
     )
+
+
+def kube_density(config, machines):
+    """Deploy ever more pods per worker to find the maximum pod density of the cluster, and the
+    memory and CPU usage per pod at every density
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+    """
+    # Start the resource utilization metrics, these sample all nodes during the entire sweep
+    kubernetes.start_resource_metrics(config, machines)
+
+    # Cache the worker to prevent loading
+    if config["benchmark"]["cache_worker"]:
+        app_vars = config["module"]["application"].cache_worker(config, machines)
+        kubernetes.cache_worker(config, machines, app_vars)
+
+    steps, starttime, endtime = measure_clock(
+        config, lambda: config["module"]["application"].density_sweep(config, machines)
+    )
+
+    logging.info("Benchmark has been finished, prepare results")
+    resource_output = kubernetes.get_resource_output(config, machines, starttime, endtime)
+    config["module"]["application"].format_density(config, steps, starttime, resource_output)
+
+
+def kube_churn(config, machines):
+    """Launch a continuous stream of K8 jobs that are deleted once finished, benchmarking the
+    throughput of K8's controlplane under constant churn instead of a single burst
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+    """
+    # Start the resource utilization metrics
+    kubernetes.start_resource_metrics(config, machines)
+
+    # Cache the worker to prevent loading
+    if config["benchmark"]["cache_worker"]:
+        app_vars = config["module"]["application"].cache_worker(config, machines)
+        kubernetes.cache_worker(config, machines, app_vars)
+
+    def run():
+        # Submit all jobs at the configured rates, this returns once the last job has been submitted
+        app_vars = config["module"]["application"].start_worker(config, machines)
+        starttime, kubectl_out = kubernetes.start_churn(config, machines, app_vars)
+        status, transitions = kubernetes.wait_churn_completion(config, app_vars["replicas"])
+        return starttime, kubectl_out, status, transitions
+
+    starttime, kubectl_out, status, transitions = measure_clock(config, run)
+
+    # Now get raw output
+    logging.info("Benchmark has been finished, prepare results")
+    control_output, endtime = kubernetes.get_control_output(config, machines, starttime, status)
+    resource_output = kubernetes.get_resource_output(config, machines, starttime, endtime)
+
+    # Add kubectl output
+    node = config["cloud_ssh"][0].split("@")[0]
+    control_output[node]["kubectl"] = kubectl_out
+
+    config["module"]["application"].format_churn(
+        config,
+        control_output,
+        transitions,
+        starttime,
+        resource_output,
+        float(endtime - starttime),
+    )
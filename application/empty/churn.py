@@ -0,0 +1,284 @@
+"""\
+Analyze the churn mode of the empty application: jobs arrive at a fixed rate for a while and are
+deleted once finished, with the rate ramped up in steps. Instead of the timeline of one burst,
+we report the throughput the control plane sustains, how the latency of each deployment phase
+develops over time, and the arrival rate at which the control plane saturates.
+"""
+
+import logging
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from infrastructure import clock
+
+from .timeline import MAPPING
+
+# Width of the time windows that throughput and latency are reported in (s)
+WINDOW = 5.0
+
+PERCENTILES = [50, 90, 99]
+
+# A rate step is saturated if the control plane starts fewer pods per second than arrive,
+# or if the median time to start a pod grows by this factor compared to the first step
+SATURATION_THROUGHPUT = 0.9
+SATURATION_LATENCY = 2.0
+
+# Only measure throughput in the last part of each step, when the control plane is in steady state
+STEADY_STATE = 0.5
+
+# Pod lifecycle events seen by the pod tracker, in lifecycle order
+EVENTS = ["created", "scheduled", "started", "deleted"]
+
+JOB = re.compile(r"job=(?:default/)?(\S+)")
+POD = re.compile(r"pod=(?:default/)?(\S+)")
+
+
+def get_steps(config):
+    """Get the arrival rate of every step of the benchmark
+
+    Args:
+        config (dict): Parsed configuration
+
+    Returns:
+        list(tuple(float, float, float)): Start (s), end (s), and arrival rate (jobs/s) per step
+    """
+    duration = config["benchmark"]["churn_duration"]
+    steps = []
+    for s in range(config["benchmark"]["churn_steps"]):
+        rate = config["benchmark"]["churn_rate"] + s * config["benchmark"]["churn_ramp"]
+        steps.append((s * duration, (s + 1) * duration, rate))
+
+    return steps
+
+
+def get_jobs(config):
+    """Get the total number of jobs to submit, as bulk_submit.py releases them in batches
+
+    Args:
+        config (dict): Parsed configuration
+
+    Returns:
+        int: Number of jobs
+    """
+    batch = config["benchmark"]["bulk_batch"]
+    return sum(
+        batch * math.ceil(rate * (end - start) / batch - 1e-9)
+        for start, end, rate in get_steps(config)
+    )
+
+
+def to_job(pod):
+    """Get the job a pod belongs to, from a pod name like empty-1-f4lwj
+
+    Args:
+        pod (str or Series): Name of the pod
+
+    Returns:
+        str or Series: Name of the job
+    """
+    if isinstance(pod, pd.Series):
+        return pod.str.rsplit("-", n=1).str[0]
+
+    return pod.rsplit("-", 1)[0]
+
+
+def create_frame(config, control, transitions, starttime):
+    """Collect the time of every deployment phase and lifecycle event per job
+
+    Only prints that name their job or pod are used. Unlike a single burst, jobs are created
+    while others are running, so prints without a name can't be matched to a job by their order.
+
+    Args:
+        config (dict): Parsed configuration
+        control (dict): Parsed output from control plane components, including kubectl
+        transitions (dict(dict)): Transition times per pod, see PodTracker.transitions()
+        starttime (float): Start of the submission, on the cloud controller
+
+    Returns:
+        (DataFrame): Per job, the time (s) since the start of each phase in MAPPING and EVENTS
+    """
+    model = config.get("clock")
+    controller = config["cloud_ssh"][0].split("@")[0]
+    starttime = clock.to_host(model, controller, starttime)
+
+    # All prints, on the clock of the host
+    frames = []
+    for node, components in control.items():
+        for component, entries in components.items():
+            if not entries:
+                continue
+
+            t, line = zip(*entries)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "component": component,
+                        "time": clock.to_host(model, node, np.array(t)),
+                        "line": line,
+                    }
+                )
+            )
+
+    df = pd.concat(frames, ignore_index=True)
+    df["code"] = df["line"].str.split(" ", n=1).str[0]
+    df["job"] = df["line"].str.extract(JOB, expand=False)
+    df["job"] = df["job"].fillna(to_job(df["line"].str.extract(POD, expand=False)))
+
+    mapping = pd.DataFrame(
+        [m for m in MAPPING if m[0] is not None], columns=["component", "code", "phase"]
+    )
+    df = df.dropna(subset=["job"]).merge(mapping, on=["component", "code"])
+    phases = df.pivot_table(index="job", columns="phase", values="time", aggfunc="min")
+    phases = phases.reindex(columns=[m[2] for m in MAPPING if m[2] in phases.columns])
+
+    # Lifecycle events from the pod tracker, which timestamps on the cloud controller
+    events = pd.DataFrame(
+        [
+            {
+                "job": to_job(pod),
+                "created": min(t["observed"].values()),
+                "scheduled": t["conditions"].get("PodScheduled"),
+                "started": t["observed"].get("Running", t["observed"].get("Succeeded")),
+                "deleted": t["deleted"],
+            }
+            for pod, t in transitions.items()
+        ],
+        columns=["job"] + EVENTS,
+    ).set_index("job")
+    events = clock.to_host(model, controller, events.astype(float))
+
+    return phases.join(events, how="outer") - starttime
+
+
+def get_throughput(df, endtime):
+    """Count how many jobs arrive, and how many pods go through each lifecycle event, per second
+
+    Args:
+        df (DataFrame): Phase and event times per job, see create_frame()
+        endtime (float): End of the benchmark, relative to its start (s)
+
+    Returns:
+        (DataFrame): Per time window, the rate of arrivals and events
+    """
+    bins = np.arange(0.0, endtime + WINDOW, WINDOW)
+    throughput = pd.DataFrame({"Time (s)": bins[:-1]})
+    throughput["arrived (jobs/s)"] = np.histogram(df[MAPPING[0][2]].dropna(), bins)[0] / WINDOW
+    for event in EVENTS:
+        throughput["%s (pods/s)" % (event)] = np.histogram(df[event].dropna(), bins)[0] / WINDOW
+
+    return throughput
+
+
+def get_latency(df):
+    """Compute latency percentiles of each deployment phase, for jobs per arrival window.
+    A phase lasts from its own print until the next print of the same job.
+
+    Args:
+        df (DataFrame): Phase and event times per job, see create_frame()
+
+    Returns:
+        (DataFrame): Per arrival window and phase, the number of jobs and latency percentiles (s)
+    """
+    columns = [c for c in df.columns if c not in ["created", "scheduled", "deleted"]]
+    latency = pd.DataFrame(
+        {first: df[second] - df[first] for first, second in zip(columns[:-1], columns[1:])}
+    )
+    latency["end_to_end"] = df["started"] - df[MAPPING[0][2]]
+    latency["Time (s)"] = np.floor(df[MAPPING[0][2]] / WINDOW) * WINDOW
+
+    latency = latency.dropna(subset=["Time (s)"]).melt(
+        id_vars="Time (s)", var_name="phase", value_name="latency"
+    )
+    grouped = latency.dropna().groupby(["Time (s)", "phase"], sort=False)["latency"]
+
+    result = grouped.count().rename("jobs").to_frame()
+    for p in PERCENTILES:
+        result["p%i (s)" % (p)] = grouped.quantile(p / 100.0)
+
+    # Keep the phases in deployment order within each window
+    result = result.reset_index()
+    order = {phase: i for i, phase in enumerate(columns + ["end_to_end"])}
+    result["order"] = result["phase"].map(order)
+    return result.sort_values(["Time (s)", "order"], ignore_index=True).drop(columns="order")
+
+
+def get_saturation(config, df):
+    """Compare the arrival rate of each step with the throughput the control plane achieved
+
+    Args:
+        config (dict): Parsed configuration
+        df (DataFrame): Phase and event times per job, see create_frame()
+
+    Returns:
+        (DataFrame): Per step, the arrival rate, throughput, start latency, and saturation
+    """
+    arrival = df[MAPPING[0][2]]
+    start_latency = df["started"] - arrival
+
+    rows = []
+    for start, end, rate in get_steps(config):
+        arrived = arrival.between(start, end, inclusive="left")
+        steady = end - STEADY_STATE * (end - start)
+        rows.append(
+            {
+                "rate (jobs/s)": rate,
+                "arrived (jobs/s)": arrived.sum() / (end - start),
+                "started (pods/s)": df["started"].between(steady, end, inclusive="left").sum()
+                / (end - steady),
+                "deleted (pods/s)": df["deleted"].between(steady, end, inclusive="left").sum()
+                / (end - steady),
+                "p50 start (s)": start_latency[arrived].quantile(0.5),
+                "p99 start (s)": start_latency[arrived].quantile(0.99),
+            }
+        )
+
+    steps = pd.DataFrame(rows)
+    steps["saturated"] = (
+        steps["started (pods/s)"] < SATURATION_THROUGHPUT * steps["rate (jobs/s)"]
+    ) | (steps["p50 start (s)"] > SATURATION_LATENCY * steps["p50 start (s)"].iloc[0])
+
+    return steps
+
+
+def print_churn(config, throughput, latency, steps):
+    """Print and save the results of the churn benchmark
+
+    Args:
+        config (dict): Parsed configuration
+        throughput (DataFrame): Rate of arrivals and events over time, see get_throughput()
+        latency (DataFrame): Latency percentiles per phase over time, see get_latency()
+        steps (DataFrame): Throughput and saturation per rate step, see get_saturation()
+    """
+    logging.info("------------------------------------")
+    logging.info("%s CHURN OUTPUT", config["mode"].upper())
+    logging.info("------------------------------------")
+    logging.info("Throughput per %i seconds:\n%s", WINDOW, throughput.to_string(index=False))
+    logging.info(
+        "End-to-end latency per %i seconds of arrivals:\n%s",
+        WINDOW,
+        latency[latency["phase"] == "end_to_end"].to_string(index=False),
+    )
+    logging.info("Throughput per rate step:\n%s", steps.to_string(index=False))
+
+    saturated = steps[steps["saturated"]]
+    if saturated.empty:
+        logging.info(
+            "Control plane did not saturate, sustained %.2f pods/s",
+            steps["started (pods/s)"].max(),
+        )
+    else:
+        sustained = steps.loc[: saturated.index[0] - 1, "started (pods/s)"]
+        logging.info(
+            "Control plane saturated at %.2f jobs/s, sustained %.2f pods/s before",
+            saturated["rate (jobs/s)"].iloc[0],
+            sustained.max() if not sustained.empty else 0.0,
+        )
+
+    # Save as csv files
+    for name, df in [("throughput", throughput), ("latency", latency), ("steps", steps)]:
+        df.to_csv(
+            "./logs/%s_churn_%s.csv" % (config["timestamp"], name), index=False, encoding="utf-8"
+        )
@@ -336,21 +336,60 @@ def plot_p56(df, timestamp, xmax=None, ymax=None, xinter=None, yinter=None):
     plt.close(fig)
 
 
+def plot_churn(throughput, latency, timestamp):
+    """Plot the throughput and end-to-end latency of the churn benchmark over time
+
+    Args:
+        throughput (DataFrame): Rate of arrivals and pod lifecycle events per time window
+        latency (DataFrame): Latency percentiles per deployment phase per time window
+        timestamp (time): Global timestamp used to save all files of this run
+    """
+    plt.rcParams.update({"font.size": 20})
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+
+    # Throughput of arrivals and of each lifecycle event
+    colors = ["#6929c4", "#1192e8", "#005d5d", "#9f1853", "#fa4d56"]
+    for column, c in zip(throughput.columns[1:], colors):
+        ax1.step(throughput["Time (s)"], throughput[column], where="post", color=c, label=column)
+
+    ax1.set_ylabel("Throughput (/s)")
+    ax1.set_ylim(bottom=0)
+    ax1.grid(True)
+    ax1.legend(loc="upper left", fontsize="12")
+
+    # End-to-end latency percentiles, from arrival until the pod runs
+    df = latency[latency["phase"] == "end_to_end"]
+    percentiles = [col for col in df.columns if col.startswith("p") and col.endswith("(s)")]
+    for column, c in zip(percentiles, colors[2:]):
+        ax2.step(df["Time (s)"], df[column], where="post", color=c, label=column)
+
+    ax2.set_xlabel("Time (s)")
+    ax2.set_ylabel("Start latency (s)")
+    ax2.set_xlim(0, max(1.0, throughput["Time (s)"].max()))
+    ax2.set_ylim(bottom=0)
+    ax2.grid(True)
+    ax2.legend(loc="upper left", fontsize="12")
+
+    # Save plot
+    plt.savefig("./logs/%s_churn.pdf" % (timestamp), bbox_inches="tight")
+    plt.close(fig)
+
+
 def plot_resources(df, timestamp, xmax=None, ymax=None, xinter=None, yinter=None):
     """Plot resource utilization data
 
     Args:
-        df (DataFrame): Pandas dataframe object with parsed timestamps per category
+        df (DataFrame): Pandas dataframe object with all resource metrics on one time grid
         timestamp (time): Global timestamp used to save all files of this run
         xmax (bool): Optional. Set the xmax of the plot by hand. Defaults to None.
         ymax (bool): Optional. Set the ymax of the plot by hand. Defaults to None.
     """
-    plot_resources_kube(df[0], timestamp, xmax, ymax, xinter, yinter)
-    plot_resources_os(df[1], timestamp, xmax, ymax, xinter, yinter)
+    plot_resources_kube(df, timestamp, xmax, ymax, xinter, yinter)
+    plot_resources_os(df, timestamp, xmax, ymax, xinter, yinter)
 
 
 def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter=None):
-    """Plot resources based on kubectl top command
+    """Plot resources of nodes and control plane components, based on cgroups
 
     Args:
         df (DataFrame): Pandas dataframe object with parsed timestamps per category
@@ -372,7 +411,7 @@ def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter
 
     # Set y axis details
     ax1.set_ylabel("CPU Usage (millicpu)")
-    y_max = math.ceil(df.filter(like="_cpu").values.max() * 1.1)
+    y_max = math.ceil(np.nanmax(df.filter(like="_cpu").values) * 1.1)
     if ymax:
         y_max = ymax
 
@@ -412,7 +451,7 @@ def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter
 
     # Set y axis details
     ax1.set_ylabel("Memory Usage (MB)")
-    y_max = math.ceil(df.filter(like="_memory").values.max() * 1.1)
+    y_max = math.ceil(np.nanmax(df.filter(like="_memory").values) * 1.1)
     if ymax:
         y_max = ymax
 
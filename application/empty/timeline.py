@@ -0,0 +1,439 @@
+"""\
+Reconstruct the deployment timeline of every pod from the custom prints in Kubernetes.
+Shared by all applications that analyze the Kubernetes control plane (empty, empty_kata).
+Every print is matched to its pod via hash indexes, and chronological insertion uses
+sorted lists with binary search, so parsing scales linearly with the number of pods.
+"""
+
+import bisect
+import copy
+import logging
+import sys
+
+from datetime import datetime
+
+from infrastructure import clock
+
+# Component, tag to search for, name
+MAPPING = [
+    # 0: Timestamp before kubectl command is invoked, in framework
+    ["kubectl", "0400", "1_kubectl_start"],  # Start of kubectl command
+    ["kubectl", "0401", "2_kubectl_send"],  # Before kubectl sends data to apiserver
+    ["apiserver", "0200", "3_api_receive_job"],  # Receive write request for job from kubectl
+    ["controller-manager", "0028", "4_jobcontroller_start"],  # Start of job controller
+    ["controller-manager", "0277", "5_pod_object_create"],  # After unpacking, per pod start
+    ["apiserver", "0202", "6_api_receive_pod"],  # Receive write request for pod from controller
+    ["scheduler", "0124", "7_scheduler_start"],  # Start of scheduler
+    ["apiserver", "0204", "8_api_receive_pod"],  # Receive write request for pod from scheduler
+    ["kubelet", "0500", "9_kubelet_start"],  # Start of kubelet (create pod, includes cgroups)
+    ["kubelet", "0504", "10_volume_mount"],  # Start mounting volumes
+    ["kubelet", "0505", "11_sandbox_start"],  # Create sandbox
+    ["kubelet", "0514", "12_create_container"],  # Create containers
+    ["kubelet", "0517", "13_start_container"],  # Start container
+    [None, None, "14_app_start"],  # First print in the application
+]
+
+
+def time_delta(t, starttime):
+    """Calculate a time delta.
+    Timezones may not be applied to all measurement data,
+    so we need to detect and correct negative time deltas manually
+
+    Args:
+        t (float): Timestamp of a particular event
+        starttime (float): Timestamp of the start of the benchmark
+
+    Returns:
+        float: Possitive time delta
+    """
+    delta = t - starttime
+    seconds_per_hour = 3600.0
+    while delta < 0.0:
+        delta += seconds_per_hour
+
+    return delta
+
+
+def create_control_object(worker_description, mapping):
+    """Create the data object to store our final parsed data in.
+    Make one entry for each pod-container combination.
+    Mainly used for filtering pod and container names per entry
+
+    Args:
+        worker_description (list(dict)): Index of all pods and containers
+        mapping (list(list(str))): Mapping of components with custom prints to tags for analysis
+    """
+    worker_metrics = []
+    worker_set = {
+        "pod": None,  # Name of the pod for which these metrics are captured
+        "container": None,  # Name of the container in the pod
+    }
+
+    for _, _, name in mapping:
+        worker_set[name] = None
+
+    # Set pod and container object per metric set
+    # Containers are unique by ID, even if the same pod appears multiple times in the index
+    container_ids = set()
+    for pod in worker_description:
+        for container in pod["containers"]:
+            if not container["id"]:
+                logging.error("ERROR: container_id could not be be set for pod %s", pod["name"])
+                sys.exit()
+
+            if container["id"] in container_ids:
+                continue
+
+            container_ids.add(container["id"])
+
+            w_set = copy.deepcopy(worker_set)
+            w_set["pod"] = pod["name"]
+            w_set["container"] = container["name"]
+            worker_metrics.append(w_set)
+
+    return worker_metrics
+
+
+def create_index(worker_metrics):
+    """Index the metric entries by pod, pod + container, container, and job name.
+    Job pods are named after their job plus a random suffix: job empty-5 has pod empty-5-asdfa.
+
+    Args:
+        worker_metrics (list(dict)): Metrics per worker node
+
+    Returns:
+        dict(dict(list(dict))): Per key type, the metric entries belonging to each key
+    """
+    index = {"pod": {}, "pod_container": {}, "container": {}, "job": {}}
+    for metric in worker_metrics:
+        pod = metric["pod"]
+        container = metric["container"]
+        index["pod"].setdefault(pod, []).append(metric)
+        index["pod_container"].setdefault((pod, container), []).append(metric)
+        index["container"].setdefault(container, []).append(metric)
+        index["job"].setdefault(pod.rsplit("-", 1)[0], []).append(metric)
+
+    return index
+
+
+class Ordered:
+    """Metric entries that don't have a timestamp for a tag yet, ordered on another tag.
+    Used to insert timestamps chronologically when a print doesn't say which pod it is for.
+    """
+
+    def __init__(self, worker_metrics, tag, compare_tag):
+        """Sort the metric entries once for all insertions of this tag
+
+        Args:
+            worker_metrics (list(dict)): Metrics per worker node
+            tag (str): Dict key to save the found logs under
+            compare_tag (str): Other dict key against which you should sort on time
+        """
+        self.tag = tag
+        self.compare_tag = compare_tag
+
+        # Sorting is stable, so entries with equal timestamps keep their original order
+        try:
+            entries = sorted(
+                (m for m in worker_metrics if m[tag] is None), key=lambda x: x[compare_tag]
+            )
+        except Exception as e:
+            logging.error("ERROR: couldnt sort due to exception %s", str(e))
+            logging.error(str(worker_metrics))
+            sys.exit()
+
+        self.entries = entries
+        self.keys = [m[compare_tag] for m in entries]
+
+    def insert(self, timestamp, future_compare):
+        """Insert a timestamp in the earliest entry (sorted on compare_tag) that is compatible.
+
+        Args:
+            timestamp (float): Timestamp to insert
+            future_compare (bool): Compare to a dataset in the future (<) or past (>)
+        """
+        if future_compare:
+            # First entry with compare_tag > timestamp
+            i = bisect.bisect_right(self.keys, timestamp)
+        else:
+            # Only the earliest entry can have compare_tag < timestamp if any entry has
+            i = 0
+            if self.keys and not timestamp > self.keys[0]:
+                i = len(self.keys)
+
+        if i > 0:
+            logging.warning(
+                "WARNING: Expected insertion timestamp %s didn't succeed on %i entries of %s to %s"
+                + " (future=%i)",
+                str(timestamp),
+                min(i, len(self.keys)),
+                self.tag,
+                self.compare_tag,
+                int(future_compare),
+            )
+
+        if i == len(self.keys):
+            logging.error("ERROR: didn't find an entry to insert a %s print into", self.tag)
+            sys.exit()
+
+        self.entries.pop(i)[self.tag] = timestamp
+        self.keys.pop(i)
+
+
+def fill(index, key_type, key, tag, timestamp):
+    """Set a timestamp on all metric entries of a key that don't have a timestamp for the tag.
+    Logs are already sorted by time, so the first print for each entry is the one we keep.
+
+    Args:
+        index (dict(dict(list(dict)))): Metric entries per key, see create_index()
+        key_type (str): Type of the key: pod, pod_container, container, or job
+        key (str or tuple(str)): Key to look up
+        tag (str): Dict key to save the found logs under
+        timestamp (float): Timestamp to set
+
+    Returns:
+        int: Number of entries that were filled
+    """
+    filled = 0
+    for metric in index[key_type].get(key, []):
+        if metric[tag] is None:
+            metric[tag] = timestamp
+            filled += 1
+
+    return filled
+
+
+def parse_pod(line):
+    """Get the pod name from a print with pod=default/name or pod=name
+
+    Args:
+        line (str): Custom print
+
+    Returns:
+        str: Pod name
+    """
+    pod = line.strip().split("pod=")[1]
+    if "default/" in pod:
+        pod = pod.split("default/")[1]
+
+    return pod
+
+
+def check(
+    config,
+    control,
+    starttime,
+    worker_metrics,
+    index,
+    component,
+    sub_string,
+    tag,
+    compare_tag="",
+    reverse=False,
+):
+    """Parse [timestamp, line (0400 job=X)] pairs to datastructures for plotting
+
+    Args:
+        config (dict): Parsed configuration
+        control (list(str), optional): Parsed output from control plane components
+        starttime (datetime, optional): Invocation time of kubectl apply command
+        worker_metrics (list(dict)): Metrics per worker node
+        index (dict(dict(list(dict)))): Metric entries per key, see create_index()
+        component (str): Kubernetes component in which logs we look
+        sub_string (str): String to check for in each line of component's logs
+        tag (str): Dict key to save the found logs under
+        compare_tag (str): Optional. When no tag exists in the output line (like 0400 job=empty-1)
+                           compare against worker_metrics[compare_tag] for chronological insertion.
+        reverse (bool): Optional. Reverse insertion chronological. Defaults to False
+    """
+    logging.debug(
+        "Parsing output for component [%s], with tag [%s] and filter: %s (unto %s in reverse=%s)",
+        component,
+        tag,
+        sub_string,
+        compare_tag,
+        reverse,
+    )
+    controlplane_node = "controller"
+    if config["infrastructure"]["provider"] == "gcp":
+        controlplane_node = "cloud0"
+
+    # Only the kubelet component is on worker nodes, all other components are in the controlplane
+    is_controlplane = True
+    if component == "kubelet":
+        is_controlplane = False
+
+    # Prints that don't say which pod they are for are inserted in chronological order
+    sort_on_time = component == "apiserver" or (
+        tag == "5_pod_object_create"
+        and config["benchmark"]["kube_deployment"] in ["pod", "container"]
+    )
+    ordered = None
+    if sort_on_time:
+        ordered = Ordered(worker_metrics, tag, compare_tag)
+
+    i = 0
+
+    # Investigate either the control plane node or all worker nodes
+    for node, output in control.items():
+        if (controlplane_node in node) != is_controlplane:
+            continue
+
+        # Get output from a specific component you want to filter
+        if component not in output:
+            logging.error("ERROR: component %s not a valid key", component)
+            sys.exit()
+
+        for t, line in output[component]:
+            if sub_string not in line:
+                continue
+
+            if i == len(worker_metrics):
+                logging.debug("WARNING: i == number of deployed pods. Stop processing")
+                break
+
+            # Convert to the clock of the host, which starttime is already converted to
+            timestamp = time_delta(clock.to_host(config.get("clock"), node, t), starttime)
+
+            if sort_on_time:
+                ordered.insert(timestamp, reverse)
+                i += 1
+            elif "pod=" in line and "container=" in line:
+                # Match pod and container
+                pod, container = parse_pod(line).split(" container=")
+                i += fill(index, "pod_container", (pod, container), tag, timestamp)
+            elif "pod=" in line:
+                # Add to correct pod
+                i += fill(index, "pod", parse_pod(line), tag, timestamp)
+            elif "container=" in line:
+                # Add to correct container
+                container = line.strip().split("container=default/")[1]
+                i += fill(index, "container", container, tag, timestamp)
+            elif "job=" in line:
+                # Filter on job
+                if "default/" in line:
+                    # For prints inside Kubernetes' control plane
+                    job = line.strip().split("job=default/")[1]
+                else:
+                    # For prints in kubectl
+                    job = line.strip().split("job=")[1]
+
+                i += fill(index, "job", job, tag, timestamp)
+
+    if i < len(worker_metrics):
+        if (component == "apiserver" or tag == "5_pod_object_create") and i == 1:
+            # Only fill up the rest if there was only 1 entry and its the apiserver we're parsing
+            logging.debug(
+                "Parsed output for %i / %i pods. Fill up the rest.", i, len(worker_metrics)
+            )
+
+            # Fill up if there are multiple containers per pod
+            j = i - 1
+            while i < len(worker_metrics):
+                worker_metrics[i][tag] = worker_metrics[j][tag]
+                i += 1
+        else:
+            # In all other conditions all pods should have been parsed automatically
+            # If that didn't happen, generate an error
+            logging.error("ERROR: Only parsed output for %i / %i pods.", i, len(worker_metrics))
+            sys.exit()
+
+
+def fill_control(config, control, starttime, worker_output, worker_description):
+    """Gather all data/timestamps on control plane activities
+
+    Args:
+        config (dict): Parsed configuration
+        control (list(str), optional): Parsed output from control plane components
+        starttime (datetime, optional): Invocation time of kubectl apply command
+        worker_output (list(list(str))): Output of each container ran on the edge
+        worker_description (list(dict)): Index of all pods and containers
+
+    Returns:
+        list(dict): Timestamp of every deployment phase per container
+    """
+    logging.info("Gather metrics on deployment phases")
+
+    mapping = copy.deepcopy(MAPPING)
+    worker_metrics = create_control_object(worker_description, mapping)
+    index = create_index(worker_metrics)
+
+    # Timestamps of different VMs are compared on the clock of the host, if it was measured.
+    # The starttime is taken on the cloud controller.
+    model = config.get("clock")
+    starttime = clock.to_host(model, config["cloud_ssh"][0].split("@")[0], starttime)
+
+    # Clock offsets are per VM, which has a different name than its Kubernetes node
+    pod_nodes = {pod["name"]: pod.get("vm", pod["node"]) for pod in worker_description}
+
+    # Issue: 5_pod_object_create does not print the pod that has been created
+    #        So, we only insert it after 7_scheduler_start, which does have this info
+    #        And we insert it in chronological order
+    #        The new order is 7 -> 6 -> 5 and reverse insertion
+    #        See 0277 comments in check()
+    pod_5 = mapping[4]
+    mapping[4] = mapping[6]
+    mapping[6] = pod_5
+
+    # Parse and insert
+    for i, (component, sub_string, tag) in enumerate(mapping):
+        if component == "apiserver" or tag == "5_pod_object_create":
+            compare_tag = mapping[i - 1][2]
+            if i == 7:
+                # 8_api_receive_pod should be shorted against 7_scheduler_start
+                # But, 7_scheduler_start is now in mapping[4]
+                compare_tag = mapping[4][2]
+
+            # Reverse insertion for entry 5 and 6 because of previous issue
+            reverse = False
+            if i in [5, 6]:
+                reverse = True
+
+            check(
+                config,
+                control,
+                starttime,
+                worker_metrics,
+                index,
+                component,
+                sub_string,
+                tag,
+                compare_tag,
+                reverse,
+            )
+        elif component is not None:
+            check(config, control, starttime, worker_metrics, index, component, sub_string, tag)
+
+    # 14_app_start: First print in the application
+    for pod, output in worker_output:
+        for line in output:
+            if "Start the application" in line:
+                if config["infrastructure"]["provider"] == "qemu":
+                    # Example: 2023-09-03T11:50:03.183541380+02:00 Start the application
+                    dt = line.split("+")[0]
+                elif config["infrastructure"]["provider"] == "gcp":
+                    # Example: 2023-09-03T11:50:03.183541380Z Start the application
+                    dt = line.split("Z")[0]
+
+                dt = dt.replace("T", " ")
+                dt = dt[:-3]
+                dt = datetime.strptime(dt, "%Y-%m-%d %H:%M:%S.%f")
+                end_time = datetime.timestamp(dt)
+                end_time = clock.to_host(model, pod_nodes.get(pod.split(" ")[0]), end_time)
+
+                # Add timestamp to the correct entry
+                # Variable pod can either be something like "empty-f4lwj" if container/pod == 1
+                # If container/pod > 1, it will be "empty-f4lwj empty-1" being the pod+container
+                #
+                # This mapping should be 100% strictly correct because to get the output, you
+                # need the correct pod/container names as well (which are used to create the
+                # worker_metrics object itself)
+                if " " in pod:
+                    entries = index["pod_container"].get(tuple(pod.split(" ")), [])
+                else:
+                    entries = index["pod"].get(pod, [])
+
+                for metric in entries:
+                    metric[mapping[-1][2]] = time_delta(end_time, starttime)
+
+    return worker_metrics
@@ -430,17 +430,17 @@ def plot_resources(df, timestamp, xmax=None, ymax=None, xinter=None, yinter=None
     """Plot resource utilization data
 
     Args:
-        df (DataFrame): Pandas dataframe object with parsed timestamps per category
+        df (DataFrame): Pandas dataframe object with all resource metrics on one time grid
         timestamp (time): Global timestamp used to save all files of this run
         xmax (bool): Optional. Set the xmax of the plot by hand. Defaults to None.
         ymax (bool): Optional. Set the ymax of the plot by hand. Defaults to None.
     """
-    plot_resources_kube(df[0], timestamp, xmax, ymax, xinter, yinter)
-    plot_resources_os(df[1], timestamp, xmax, ymax, xinter, yinter)
+    plot_resources_kube(df, timestamp, xmax, ymax, xinter, yinter)
+    plot_resources_os(df, timestamp, xmax, ymax, xinter, yinter)
 
 
 def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter=None):
-    """Plot resources based on kubectl top command
+    """Plot resources of nodes and control plane components, based on cgroups
 
     Args:
         df (DataFrame): Pandas dataframe object with parsed timestamps per category
@@ -462,7 +462,7 @@ def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter
 
     # Set y axis details
     ax1.set_ylabel("CPU Usage (millicpu)")
-    y_max = math.ceil(df.filter(like="_cpu").values.max() * 1.1)
+    y_max = math.ceil(np.nanmax(df.filter(like="_cpu").values) * 1.1)
     if ymax:
         y_max = ymax
 
@@ -502,7 +502,7 @@ def plot_resources_kube(df, timestamp, xmax=None, ymax=None, xinter=None, yinter
 
     # Set y axis details
     ax1.set_ylabel("Memory Usage (MB)")
-    y_max = math.ceil(df.filter(like="_memory").values.max() * 1.1)
+    y_max = math.ceil(np.nanmax(df.filter(like="_memory").values) * 1.1)
     if ymax:
         y_max = ymax
 
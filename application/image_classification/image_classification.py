@@ -2,6 +2,7 @@
 
 import logging
 import copy
+import json
 import sys
 import numpy as np
 import pandas as pd
@@ -44,6 +45,14 @@ def add_options(_config):
     settings = [
         ["frequency", int, lambda x: x >= 1, True, None],
         ["duration", int, lambda x: x >= 1, False, 300],
+        ["arrival", str, lambda x: x in ["constant", "poisson", "burst"], False, "constant"],
+        ["burst_size", int, lambda x: x >= 1, False, 10],
+        ["payload", str, lambda x: x in ["binary", "json"], False, "binary"],
+        ["batch_size", int, lambda x: x >= 1, False, 1],
+        ["batch_timeout", int, lambda x: x >= 0, False, 10],
+        ["ring_slots", int, lambda x: x >= 1, False, 64],
+        ["metrics", str, lambda x: x in ["lines", "summary"], False, "lines"],
+        ["metrics_interval", int, lambda x: x >= 0, False, 0],
     ]
 
     return settings
@@ -64,6 +73,10 @@ def verify_options(parser, config):
         parser.error("ERROR: Application image_classification does not support kubecontrol")
     elif config["infrastructure"]["endpoint_nodes"] <= 0:
         parser.error("ERROR: Application image classification requires at least 1 endpoint")
+    elif config["benchmark"]["arrival"] != "constant" and not (
+        "execution_model" in config and config["execution_model"]["model"] == "openfaas"
+    ):
+        parser.error("ERROR: Only the serverless image_classification app supports arrival")
 
 
 def start_worker(config, machines):
@@ -110,6 +123,11 @@ def start_worker_kube(config, _machines):
         "mqtt_logs": True,
         "endpoint_connected": int(config["infrastructure"]["endpoint_nodes"] / worker_apps),
         "cpu_threads": max(1, int(config["benchmark"]["application_worker_cpu"])),
+        "batch_size": config["benchmark"]["batch_size"],
+        "batch_timeout": config["benchmark"]["batch_timeout"],
+        "ring_slots": config["benchmark"]["ring_slots"],
+        "metrics": config["benchmark"]["metrics"],
+        "metrics_interval": config["benchmark"]["metrics_interval"],
     }
     return app_vars
 
@@ -127,6 +145,11 @@ def start_worker_mist(config, _machines):
     app_vars = [
         "MQTT_LOGS=True",
         "CPU_THREADS=%i" % (config["infrastructure"]["edge_cores"]),
+        "BATCH_SIZE=%i" % (config["benchmark"]["batch_size"]),
+        "BATCH_TIMEOUT=%i" % (config["benchmark"]["batch_timeout"]),
+        "RING_SLOTS=%i" % (config["benchmark"]["ring_slots"]),
+        "METRICS=%s" % (config["benchmark"]["metrics"]),
+        "METRICS_INTERVAL=%i" % (config["benchmark"]["metrics_interval"]),
         "ENDPOINT_CONNECTED=%i"
         % (
             int(config["infrastructure"]["endpoint_nodes"] / config["infrastructure"]["edge_nodes"])
@@ -149,6 +172,11 @@ def start_worker_baremetal(config, _machines):
         "MQTT_LOCAL_IP=%s" % (config["registry"].split(":")[0]),
         "MQTT_LOGS=True",
         "CPU_THREADS=%i" % (config["infrastructure"]["cloud_cores"]),
+        "BATCH_SIZE=%i" % (config["benchmark"]["batch_size"]),
+        "BATCH_TIMEOUT=%i" % (config["benchmark"]["batch_timeout"]),
+        "RING_SLOTS=%i" % (config["benchmark"]["ring_slots"]),
+        "METRICS=%s" % (config["benchmark"]["metrics"]),
+        "METRICS_INTERVAL=%i" % (config["benchmark"]["metrics_interval"]),
         "ENDPOINT_CONNECTED=%i"
         % (
             int(
@@ -178,9 +206,15 @@ def gather_worker_metrics(_machines, _config, worker_output, _starttime):
     worker_set = {
         "worker_id": None,  # ID of this worker
         "total_time": None,  # Total runtime for the worker
-        "comm_delay_avg": None,  # Average endpoint -> worker delay
+        "comm_delay_avg": None,  # Average endpoint -> worker delay, includes clock offset
         "comm_delay_stdev": None,  # Stdev of delay
         "proc_avg": None,  # Average time to process 1 data element on worker
+        "decode_avg": None,  # Average time to decode and resize 1 data element for the model
+        "infer_avg": None,  # Average time of the model inference itself
+        "queue_avg": None,  # Average time a data element waits for its batch to start
+        "batch_avg": None,  # Average number of data elements processed at once
+        "throughput": None,  # Data elements processed per second
+        "dropped": None,  # Data elements dropped because the ring buffer was full
     }
 
     # Use 5th-90th percentile for average
@@ -193,10 +227,23 @@ def gather_worker_metrics(_machines, _config, worker_output, _starttime):
         worker_metrics.append(copy.deepcopy(worker_set))
         worker_metrics[-1]["worker_id"] = i
 
+        # Workers running with metrics = summary report everything in one record instead
+        summary = parse_summary(out[1])
+        if summary is not None:
+            worker_metrics[-1].update(
+                summary_worker_metrics(summary, lower_percentile, upper_percentile)
+            )
+            continue
+
         # Get network delay in ms (10**-3) and execution times
         # Sometimes, the program gets an incorrect line, then skip
         delays = []
         processing = []
+        queueing = []
+        decoding = []
+        inference = []
+        batches = []
+        dropped = None
         start_time = 0
         end_time = 0
         negatives = []
@@ -205,7 +252,20 @@ def gather_worker_metrics(_machines, _config, worker_output, _starttime):
                 start_time = application.to_datetime(line)
             elif "Get item" in line:
                 end_time = application.to_datetime(line)
-            elif any(word in line for word in ["Latency", "Processing"]):
+            elif "Dropped images" in line:
+                try:
+                    dropped = int(line.rstrip().split(":")[-1])
+                except ValueError as e:
+                    logging.warning("Got an error while parsing line: %s. Exception: %s", line, e)
+            elif "Batch size" in line:
+                try:
+                    batches.append(int(line.rstrip().split(":")[-1]))
+                except ValueError as e:
+                    logging.warning("Got an error while parsing line: %s. Exception: %s", line, e)
+            elif any(
+                word in line
+                for word in ["Latency", "Processing", "Preprocessing", "Inference", "Queue time"]
+            ):
                 try:
                     unit = line[line.find("(") + 1 : line.find(")")]
                     time = int(line.rstrip().split(":")[-1])
@@ -227,6 +287,12 @@ def gather_worker_metrics(_machines, _config, worker_output, _starttime):
                         delays.append(round(time / 10**6, 4))
                     elif "Processing" in line:
                         processing.append(round(time / 10**6, 4))
+                    elif "Preprocessing" in line:
+                        decoding.append(round(time / 10**6, 4))
+                    elif "Inference" in line:
+                        inference.append(round(time / 10**6, 4))
+                    elif "Queue time" in line:
+                        queueing.append(round(time / 10**6, 4))
 
         worker_metrics[-1]["total_time"] = round((end_time - start_time).total_seconds(), 2)
 
@@ -251,9 +317,273 @@ def gather_worker_metrics(_machines, _config, worker_output, _starttime):
         worker_metrics[-1]["comm_delay_stdev"] = round(np.std(delays_perc), 2)
         worker_metrics[-1]["proc_avg"] = round(np.mean(processing_perc), 2)
 
+        # Only subscribers that batch report their queue time and batch sizes
+        if queueing:
+            queueing.sort()
+            queueing_perc = queueing[
+                int(len(queueing) * lower_percentile) : int(len(queueing) * upper_percentile)
+            ]
+            worker_metrics[-1]["queue_avg"] = round(np.mean(queueing_perc), 2)
+
+        if batches:
+            worker_metrics[-1]["batch_avg"] = round(np.mean(batches), 2)
+
+        # Preprocessing is reported apart from inference since both run in the same process
+        if decoding:
+            worker_metrics[-1]["decode_avg"] = round(np.mean(decoding), 2)
+
+        if inference:
+            worker_metrics[-1]["infer_avg"] = round(np.mean(inference), 2)
+
+        worker_metrics[-1]["dropped"] = dropped
+
+        if worker_metrics[-1]["total_time"] > 0:
+            worker_metrics[-1]["throughput"] = round(
+                len(processing) / worker_metrics[-1]["total_time"], 2
+            )
+
     return sorted(worker_metrics, key=lambda x: x["worker_id"])
 
 
+def one_way_latency(timings, window=10 * 10**9):
+    """Split round trips between an endpoint and a worker into one-way latencies.
+    Each round trip has four timestamps: send and receive on the endpoint, and receive and
+    reply on the worker, which has a different clock. Like NTP, the round trip with the least
+    network delay gives the most accurate clock offset. We take that best round trip per time
+    window, and fit a line through those offsets to follow drift of the worker clock.
+
+    Args:
+        timings (list(list(int))): Per round trip: t_send, t_recv, t_reply, t_back in ns
+        window (int, optional): Length of a time window in ns. Defaults to 10 seconds.
+
+    Returns:
+        list(float): Uplink (endpoint -> worker) latency per round trip in ms
+        list(float): Downlink (worker -> endpoint) latency per round trip in ms
+        float: Average clock offset (worker - endpoint) in ms
+    """
+    t = np.array(timings, dtype=np.int64)
+    t_send, t_recv, t_reply, t_back = t[:, 0], t[:, 1], t[:, 2], t[:, 3]
+
+    # Time spent on the network only, and the clock offset as seen by each round trip
+    network = (t_back - t_send) - (t_reply - t_recv)
+    offsets = ((t_recv - t_send) + (t_reply - t_back)) / 2
+
+    # Best round trip per window
+    windows = (t_send - t_send.min()) // window
+    best = [
+        np.flatnonzero(windows == w)[np.argmin(network[windows == w])] for w in np.unique(windows)
+    ]
+
+    if len(best) > 1:
+        drift, offset = np.polyfit(t_send[best] - t_send.min(), offsets[best], 1)
+        offset = offset + drift * (t_send - t_send.min())
+    else:
+        offset = np.full(len(t_send), offsets[best[0]])
+
+    uplink = (t_recv - t_send - offset) / 10**6
+    downlink = (t_back - t_reply + offset) / 10**6
+    return list(np.round(uplink, 4)), list(np.round(downlink, 4)), np.mean(offset) / 10**6
+
+
+def parse_summary(out):
+    """Get the metrics record of an app that ran with metrics = summary
+
+    Args:
+        out (list(str)): Output lines of the app
+
+    Returns:
+        dict: Histograms, counters, and other values of the app, None if there is no record
+    """
+    for line in reversed(out):
+        if "Metrics: {" in line:
+            try:
+                return json.loads(line[line.find("{") :])
+            except ValueError as e:
+                logging.warning("Got an error while parsing metrics record. Exception: %s", e)
+                return None
+
+    return None
+
+
+def histogram_stats(histogram, lower_percentile, upper_percentile, scale):
+    """Compute the mean and stdev of the values between two percentiles of a histogram.
+    Each bucket counts as its middle value, see metrics.py of the apps for the bucket layout.
+
+    Args:
+        histogram (dict): Serialized histogram, None if the app didn't record it
+        lower_percentile (float): Lowest fraction of values to skip
+        upper_percentile (float): Fraction of values up to which to include values
+        scale (float): Divide values by this, to convert units
+
+    Returns:
+        float: Mean, None if there are no values
+        float: Stdev, None if there are no values
+    """
+    if not histogram or not histogram["count"]:
+        return None, None
+
+    middles = []
+    counts = []
+    for bucket, count in histogram["buckets"]:
+        width = 1 << max(0, abs(bucket).bit_length() - histogram["bits"])
+        middle = abs(bucket) + (width - 1) / 2
+        middles.append(middle if bucket >= 0 else -middle)
+        counts.append(count)
+
+    order = np.argsort(middles)
+    values = np.array(middles)[order] / scale
+    counts = np.array(counts)[order]
+
+    # Count how many values of each bucket are between the percentiles, like slicing a sorted list
+    end = np.cumsum(counts)
+    start = end - counts
+    lower = int(histogram["count"] * lower_percentile)
+    upper = int(histogram["count"] * upper_percentile)
+    weights = np.clip(np.minimum(end, upper) - np.maximum(start, lower), 0, None)
+    if not weights.sum():
+        return None, None
+
+    mean = np.average(values, weights=weights)
+    stdev = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+    return mean, stdev
+
+
+def histogram_mean(histogram, scale):
+    """Compute the exact mean of all values of a histogram
+
+    Args:
+        histogram (dict): Serialized histogram, None if the app didn't record it
+        scale (float): Divide values by this, to convert units
+
+    Returns:
+        float: Mean, None if there are no values
+    """
+    if not histogram or not histogram["count"]:
+        return None
+
+    return histogram["sum"] / histogram["count"] / scale
+
+
+def round_metric(value):
+    """Round a metric for the output, leaving missing metrics as they are
+
+    Args:
+        value (float): Metric, None if missing
+
+    Returns:
+        float: Rounded metric, None if missing
+    """
+    return None if value is None else round(value, 2)
+
+
+def summary_worker_metrics(summary, lower_percentile, upper_percentile):
+    """Compute the worker metrics from a metrics record, see gather_worker_metrics()
+
+    Args:
+        summary (dict): Metrics record of the worker, see parse_summary()
+        lower_percentile (float): Lowest fraction of values to skip for averages
+        upper_percentile (float): Fraction of values up to which to include values for averages
+
+    Returns:
+        dict: Parsed metrics of the worker
+    """
+    histograms = summary["histograms"]
+    values = summary["values"]
+
+    delay_avg, delay_stdev = histogram_stats(
+        histograms.get("latency"), lower_percentile, upper_percentile, 10**6
+    )
+    proc_avg, _ = histogram_stats(
+        histograms.get("processing"), lower_percentile, upper_percentile, 10**6
+    )
+    queue_avg, _ = histogram_stats(
+        histograms.get("queue"), lower_percentile, upper_percentile, 10**6
+    )
+
+    # Time between the start of the first and the end of the last batch
+    total_time = 0.0
+    if "first" in values:
+        total_time = (values["last"] - values["first"]) / 10**9
+
+    throughput = None
+    if total_time > 0 and "processing" in histograms:
+        throughput = histograms["processing"]["count"] / total_time
+
+    return {
+        "total_time": round(total_time, 2),
+        "comm_delay_avg": round_metric(delay_avg),
+        "comm_delay_stdev": round_metric(delay_stdev),
+        "proc_avg": round_metric(proc_avg),
+        "decode_avg": round_metric(histogram_mean(histograms.get("decode"), 10**6)),
+        "infer_avg": round_metric(histogram_mean(histograms.get("inference"), 10**6)),
+        "queue_avg": round_metric(queue_avg),
+        "batch_avg": round_metric(histogram_mean(histograms.get("batch"), 1)),
+        "throughput": round_metric(throughput),
+        "dropped": summary["counters"].get("dropped"),
+    }
+
+
+def summary_endpoint_metrics(summary, lower_percentile, upper_percentile):
+    """Compute the endpoint metrics from a metrics record, see gather_endpoint_metrics()
+
+    Args:
+        summary (dict): Metrics record of the endpoint, see parse_summary()
+        lower_percentile (float): Lowest fraction of values to skip for averages
+        upper_percentile (float): Fraction of values up to which to include values for averages
+
+    Returns:
+        dict: Parsed metrics of the endpoint
+    """
+    histograms = summary["histograms"]
+    values = summary["values"]
+
+    # Publishers report their preparation time, the combined app its total processing time
+    proc_avg, _ = histogram_stats(
+        histograms.get("processing", histograms.get("preprocessing")),
+        lower_percentile,
+        upper_percentile,
+        10**6,
+    )
+    latency_avg, latency_stdev = histogram_stats(
+        histograms.get("latency"), lower_percentile, upper_percentile, 10**6
+    )
+
+    metrics = {
+        "proc_avg": round_metric(proc_avg),
+        "dispatch_avg": round_metric(histogram_mean(histograms.get("dispatch"), 10**6)),
+        "data_avg": round_metric(histogram_mean(histograms.get("data"), 10**3)) or 0.0,
+        "wire_avg": round_metric(histogram_mean(histograms.get("wire"), 10**3)),
+        "latency_avg": round_metric(latency_avg),
+        "latency_stdev": round_metric(latency_stdev),
+        "decode_avg": round_metric(histogram_mean(histograms.get("decode"), 10**6)),
+        "infer_avg": round_metric(histogram_mean(histograms.get("inference"), 10**6)),
+    }
+
+    # Serverless cold starts are reported apart from the warm invocations above
+    if "cold_latency" in histograms:
+        metrics["cold_starts"] = histograms["cold_latency"]["count"]
+        metrics["cold_latency_avg"] = round_metric(
+            histogram_mean(histograms["cold_latency"], 10**6)
+        )
+        metrics["model_load_avg"] = round_metric(histogram_mean(histograms["model_load"], 10**6))
+
+    # One-way latencies include the clock offset, which is estimated from the best round trips.
+    # Unlike one_way_latency(), drift of the worker clock during the run is not corrected.
+    if "offsets" in values:
+        offset = np.mean([o for _, o in values["offsets"]]) / 10**6
+        uplink, _ = histogram_stats(
+            histograms["uplink"], lower_percentile, upper_percentile, 10**6
+        )
+        downlink, _ = histogram_stats(
+            histograms["downlink"], lower_percentile, upper_percentile, 10**6
+        )
+        metrics["uplink_avg"] = round_metric(uplink - offset)
+        metrics["downlink_avg"] = round_metric(downlink + offset)
+        metrics["clock_offset"] = round_metric(offset)
+
+    return metrics
+
+
 def gather_endpoint_metrics(config, endpoint_output, container_names):
     """Gather metrics from endpoints
 
@@ -270,9 +600,23 @@ def gather_endpoint_metrics(config, endpoint_output, container_names):
         "worker_id": None,  # To which worker is this endpoint connected
         "total_time": None,  # Total runtime of the endpoint
         "proc_avg": None,  # Average procesing time per data element
+        "dispatch_avg": None,  # Average delay of open-loop requests after their intended send time
+        "decode_avg": None,  # Average time to decode and resize a data element for the model
+        "infer_avg": None,  # Average time of the model inference itself
         "data_avg": None,  # Average generated data size
+        "wire_avg": None,  # Average request size on the wire, including HTTP headers
         "latency_avg": None,  # Average end-to-end latency
         "latency_stdev": None,  # Stdev latency
+        "uplink_avg": None,  # Average endpoint -> worker latency, corrected for clock offset
+        "downlink_avg": None,  # Average worker -> endpoint latency, corrected for clock offset
+        "clock_offset": None,  # Average clock offset of the worker compared to the endpoint
+        "cold_starts": None,  # Number of serverless invocations that had to load the model
+        "cold_latency_avg": None,  # Average end-to-end latency of cold starts
+        "model_load_avg": None,  # Average time spent loading the model in cold starts
+        "target_rate": None,  # Configured request rate of serverless endpoints
+        "offered_rate": None,  # Rate at which requests were actually sent
+        "achieved_rate": None,  # Rate at which responses were received
+        "failed": None,  # Number of requests without a valid response
     }
 
     # Use 5th-90th percentile for average
@@ -303,14 +647,51 @@ def gather_endpoint_metrics(config, endpoint_output, container_names):
         processing = []
         latency = []
         data_size = []
+        timings = []
+        cold_latency = []
+        wire_size = []
+        model_load = []
+        decoding = []
+        inference = []
+        dispatch = []
         for line in out:
-            if any(
+            if "Metrics: {" in line:
+                continue
+
+            if "rate (requests/s)" in line or "Failed requests" in line:
+                # Open-loop serverless endpoints report the load they generated at the end
+                try:
+                    number = float(line.rstrip().split(":")[-1])
+                except ValueError as e:
+                    logging.warning("Got an error while parsing line: %s. Exception: %s", line, e)
+                    continue
+
+                for word, key in [
+                    ("Target rate", "target_rate"),
+                    ("Offered rate", "offered_rate"),
+                    ("Achieved rate", "achieved_rate"),
+                    ("Failed requests", "failed"),
+                ]:
+                    if word in line:
+                        endpoint_metrics[-1][key] = round(number, 2)
+            elif "Timing" in line:
+                try:
+                    timings.append([int(t) for t in line.rstrip().split(":")[-1].split()])
+                except ValueError as e:
+                    logging.warning("Got an error while parsing line: %s. Exception: %s", line, e)
+            elif any(
                 word in line
                 for word in [
                     "Preparation and preprocessing",
                     "Preparation, preprocessing and processing",
+                    "Dispatch lag",
                     "Sending data",
+                    "Wire data",
                     "Latency",
+                    "Cold start latency",
+                    "Model loading",
+                    "Preprocessing",
+                    "Inference",
                 ]
             ):
                 try:
@@ -339,10 +720,30 @@ def gather_endpoint_metrics(config, endpoint_output, container_names):
                     processing.append(round(number / 10**6, 4))
                 elif "Preparation and preprocessing" in line:
                     processing.append(round(number / 10**6, 4))
+                elif "Dispatch lag" in line:
+                    dispatch.append(round(number / 10**6, 4))
                 elif "Latency" in line:
                     latency.append(round(number / 10**6, 4))
+                elif "Cold start latency" in line:
+                    cold_latency.append(round(number / 10**6, 4))
+                elif "Model loading" in line:
+                    model_load.append(round(number / 10**6, 4))
                 elif "Sending data" in line:
                     data_size.append(round(number / 10**3, 4))
+                elif "Wire data" in line:
+                    wire_size.append(round(number / 10**3, 4))
+                elif "Preprocessing" in line:
+                    decoding.append(round(number / 10**6, 4))
+                elif "Inference" in line:
+                    inference.append(round(number / 10**6, 4))
+
+        # Endpoints running with metrics = summary report everything else in one record
+        summary = parse_summary(out)
+        if summary is not None:
+            endpoint_metrics[-1].update(
+                summary_endpoint_metrics(summary, lower_percentile, upper_percentile)
+            )
+            continue
 
         processing.sort()
         latency.sort()
@@ -365,6 +766,42 @@ def gather_endpoint_metrics(config, endpoint_output, container_names):
         if data_size:
             endpoint_metrics[-1]["data_avg"] = round(np.mean(data_size), 2)
 
+        if wire_size:
+            endpoint_metrics[-1]["wire_avg"] = round(np.mean(wire_size), 2)
+
+        if dispatch:
+            endpoint_metrics[-1]["dispatch_avg"] = round(np.mean(dispatch), 2)
+
+        # Endpoints that run the model themselves report preprocessing apart from inference
+        if decoding:
+            endpoint_metrics[-1]["decode_avg"] = round(np.mean(decoding), 2)
+
+        if inference:
+            endpoint_metrics[-1]["infer_avg"] = round(np.mean(inference), 2)
+
+        # Serverless cold starts are reported apart from the warm invocations above
+        if cold_latency:
+            endpoint_metrics[-1]["cold_starts"] = len(cold_latency)
+            endpoint_metrics[-1]["cold_latency_avg"] = round(np.mean(cold_latency), 2)
+            endpoint_metrics[-1]["model_load_avg"] = round(np.mean(model_load), 2)
+
+        # Only apps that reply with a timing header can split latency into uplink and downlink
+        if timings:
+            uplink, downlink, offset = one_way_latency(timings)
+            uplink.sort()
+            downlink.sort()
+
+            uplink_perc = uplink[
+                int(len(uplink) * lower_percentile) : int(len(uplink) * upper_percentile)
+            ]
+            downlink_perc = downlink[
+                int(len(downlink) * lower_percentile) : int(len(downlink) * upper_percentile)
+            ]
+
+            endpoint_metrics[-1]["uplink_avg"] = round(np.mean(uplink_perc), 2)
+            endpoint_metrics[-1]["downlink_avg"] = round(np.mean(downlink_perc), 2)
+            endpoint_metrics[-1]["clock_offset"] = round(offset, 2)
+
     endpoint_metrics = sorted(endpoint_metrics, key=lambda x: x["worker_id"])
 
     return endpoint_metrics
@@ -394,6 +831,10 @@ def format_output(config, worker_metrics, endpoint_metrics, status=None):
                 "comm_delay_avg": "delay_avg (ms)",
                 "comm_delay_stdev": "delay_stdev (ms)",
                 "proc_avg": "proc_time/data (ms)",
+                "decode_avg": "decode_time/data (ms)",
+                "infer_avg": "inference_time (ms)",
+                "queue_avg": "queue_time/data (ms)",
+                "throughput": "throughput (data/s)",
             },
             inplace=True,
         )
@@ -411,9 +852,19 @@ def format_output(config, worker_metrics, endpoint_metrics, status=None):
                     "worker_id": "connected_to",
                     "total_time": "total_time (s)",
                     "proc_avg": "preproc_time/data (ms)",
+                    "dispatch_avg": "dispatch_lag_avg (ms)",
                     "data_avg": "data_size_avg (kb)",
+                    "wire_avg": "wire_size_avg (kb)",
                     "latency_avg": "latency_avg (ms)",
                     "latency_stdev": "latency_stdev (ms)",
+                    "uplink_avg": "uplink_avg (ms)",
+                    "downlink_avg": "downlink_avg (ms)",
+                    "clock_offset": "clock_offset (ms)",
+                    "cold_latency_avg": "cold_latency_avg (ms)",
+                    "model_load_avg": "model_load_avg (ms)",
+                    "target_rate": "target_rate (req/s)",
+                    "offered_rate": "offered_rate (req/s)",
+                    "achieved_rate": "achieved_rate (req/s)",
                 },
                 inplace=True,
             )
@@ -424,6 +875,8 @@ def format_output(config, worker_metrics, endpoint_metrics, status=None):
                     "worker_id",
                     "total_time",
                     "proc_avg",
+                    "decode_avg",
+                    "infer_avg",
                     "latency_avg",
                     "latency_stdev",
                 ],
@@ -433,6 +886,8 @@ def format_output(config, worker_metrics, endpoint_metrics, status=None):
                     "worker_id": "endpoint_id",
                     "total_time": "total_time (s)",
                     "proc_avg": "proc_time/data (ms)",
+                    "decode_avg": "decode_time/data (ms)",
+                    "infer_avg": "inference_time (ms)",
                     "latency_avg": "latency_avg (ms)",
                     "latency_stdev": "latency_stdev (ms)",
                 },
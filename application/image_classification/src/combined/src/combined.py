@@ -3,15 +3,18 @@ This is a combination of a publisher and subscriber,
 modeling handling ML workload on the endpoint itself.
 """
 
+import io
 import os
 import time
 import multiprocessing
 import numpy as np
-from PIL import Image
 
 # pylint: disable-next=import-error
 import tflite_runtime.interpreter as tflite
 
+from metrics import Metrics, VERBOSE
+from preprocess import Preprocessor
+
 
 CPU_THREADS = int(os.environ["CPU_THREADS"])
 FREQUENCY = int(os.environ["FREQUENCY"])
@@ -33,6 +36,7 @@ def generate(queue):
         queue (object): Multiprocessing queue
     """
     print("Start generating")
+    metrics = Metrics()
 
     # Loop over the dataset of 60 images
     files = []
@@ -42,8 +46,10 @@ def generate(queue):
 
     for i in range(MAX_IMGS):
         start_time = time.time_ns()
-        image = Image.open("images/" + files[i % len(files)])
-        queue.put([start_time, image])
+
+        # Pass the encoded image, like a camera would, and decode it when processing
+        with open("images/" + files[i % len(files)], "rb") as f:
+            queue.put([start_time, f.read()])
 
         # Try to keep a frame rate of X
         sec_frame = time.time_ns() - start_time
@@ -56,7 +62,14 @@ def generate(queue):
                 time.sleep(frame)
                 sec_frame = float(time.time_ns() - start_time) / 10**9
         else:
-            print("Can't keep up with %f seconds per frame: Took %f" % (SEC_PER_FRAME, sec_frame))
+            metrics.count("late")
+            if VERBOSE:
+                print(
+                    "Can't keep up with %f seconds per frame: Took %f" % (SEC_PER_FRAME, sec_frame)
+                )
+
+    # Tell the processor we're done, and hand over our metrics
+    queue.put([None, metrics.to_dict()])
 
 
 def process(queue):
@@ -73,29 +86,35 @@ def process(queue):
     interpreter = tflite.Interpreter(model_path="model.tflite", num_threads=CPU_THREADS)
     interpreter.allocate_tensors()
 
-    # Get model input details and resize image
+    # Get model input details, and allocate the input tensor once
     input_details = interpreter.get_input_details()
-    floating_model = input_details[0]["dtype"] == np.float32
-
-    iw = input_details[0]["shape"][2]
-    ih = input_details[0]["shape"][1]
+    preprocessor = Preprocessor(input_details[0])
+    floating_model = preprocessor.floating
+    metrics = Metrics()
 
     while True:
         # Get item from queue
-        print("Get item")
+        if VERBOSE:
+            print("Get item")
+
         item = queue.get(block=True)
         start_process_time = time.time_ns()
         start_time = item[0]
-        image = item[1]
 
-        # Resize image and prepare data/model
-        image = image.resize((iw, ih)).convert(mode="RGB")
-        input_data = np.expand_dims(image, axis=0)
+        # The generator is done, all images have been processed
+        if start_time is None:
+            metrics.merge(item[1])
+            metrics.emit()
+            return
 
-        if floating_model:
-            input_data = (np.float32(input_data) - 127.5) / 127.5
+        # Decode and resize the image into the input tensor
+        preprocessor.load(io.BytesIO(item[1]))
+        start_inference = time.time_ns()
+        metrics.record("decode", start_inference - start_process_time)
+        if VERBOSE:
+            print("Preprocessing (ns): %i" % (start_inference - start_process_time))
 
-        interpreter.set_tensor(input_details[0]["index"], input_data)
+        interpreter.set_tensor(input_details[0]["index"], preprocessor.batch())
 
         # Do inference, parse and print output
         interpreter.invoke()
@@ -103,18 +122,25 @@ def process(queue):
         output_details = interpreter.get_output_details()
         output_data = interpreter.get_tensor(output_details[0]["index"])
         results = np.squeeze(output_data)
-
-        top_k = results.argsort()[-5:][::-1]
-        for i in top_k:
-            if floating_model:
-                print("\t{:08.6f} - {}".format(float(results[i]), labels[i]))
-            else:
-                print("\t{:08.6f} - {}".format(float(results[i] / 255.0), labels[i]))
+        inference = time.time_ns() - start_inference
+        metrics.record("inference", inference)
+
+        if VERBOSE:
+            print("Inference (ns): %i" % (inference))
+            top_k = results.argsort()[-5:][::-1]
+            for i in top_k:
+                if floating_model:
+                    print("\t{:08.6f} - {}".format(float(results[i]), labels[i]))
+                else:
+                    print("\t{:08.6f} - {}".format(float(results[i] / 255.0), labels[i]))
 
         # Time it took
         now = time.time_ns()
-        print("Preparation, preprocessing and processing (ns): %i" % (now - start_process_time))
-        print("Latency (ns): %i" % (now - start_time))
+        metrics.record("processing", now - start_process_time)
+        metrics.record("latency", now - start_time)
+        if VERBOSE:
+            print("Preparation, preprocessing and processing (ns): %i" % (now - start_process_time))
+            print("Latency (ns): %i" % (now - start_time))
 
 
 def main():
@@ -128,12 +154,9 @@ def main():
     p1 = multiprocessing.Process(target=generate, args=(queue,))
     p1.start()
 
-    # Wait for the generator to finish, then wait until the work queue is empty
+    # Wait for the generator to finish, the processor stops after the last image
     p1.join()
-    while not queue.empty():
-        time.sleep(5)
-
-    p2.terminate()
+    p2.join()
 
     print("Finished, processed %i images" % (MAX_IMGS))
 
@@ -0,0 +1,255 @@
+"""\
+Keep metrics of the image classification apps in memory, instead of printing lines per image.
+This file is shared by the publishers, subscriber, and combined application, their docker.sh
+copies it next to their own source.
+
+With METRICS=lines (default), apps print a line per image for every metric, as before.
+With METRICS=summary, apps only record metrics in histograms and counters, and print them as one
+JSON record when they finish. If METRICS_INTERVAL is set, the record also contains a snapshot of
+every histogram per interval of that many seconds, to see how metrics develop over time.
+
+Histograms are log-linear like HDR histograms: values up to 2^BITS are kept exactly, and larger
+values are rounded down to BITS significant bits, so the relative error is at most 2^-(BITS-1).
+A histogram is serialized as a list of [bucket, count] pairs, where a bucket is the rounded value.
+"""
+
+import json
+import os
+import threading
+import time
+
+MODE = os.environ.get("METRICS", "lines")
+INTERVAL = float(os.environ.get("METRICS_INTERVAL", 0))
+
+# Print a line per image or not
+VERBOSE = MODE == "lines"
+
+# Significant bits per value, 8 bits gives an error of at most 0.8%
+BITS = 8
+
+# Length of the time windows in which the best round trip estimates the clock offset (ns)
+WINDOW = 10 * 10**9
+
+
+class Histogram:
+    """Counts of recorded values per log-linear bucket, with the exact count, sum, min, and max"""
+
+    def __init__(self):
+        """Initialize the object"""
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        """Add a value
+
+        Args:
+            value (int): Value to add, negative values are rounded towards zero
+        """
+        value = int(value)
+        magnitude = abs(value)
+        shift = max(0, magnitude.bit_length() - BITS)
+        bucket = (magnitude >> shift) << shift
+        if value < 0:
+            bucket = -bucket
+
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add all values of another histogram
+
+        Args:
+            other (dict): Serialized histogram, see to_dict()
+        """
+        for bucket, count in other["buckets"]:
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+        self.count += other["count"]
+        self.sum += other["sum"]
+        for key, pick in [("min", min), ("max", max)]:
+            if other[key] is not None:
+                current = getattr(self, key)
+                setattr(self, key, other[key] if current is None else pick(current, other[key]))
+
+    def percentile(self, p):
+        """Get the bucket that a percentile of the values falls in
+
+        Args:
+            p (float): Percentile, between 0 and 100
+
+        Returns:
+            int: Bucket, None if the histogram is empty
+        """
+        if not self.count:
+            return None
+
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return bucket
+
+        return self.max
+
+    def to_dict(self):
+        """Serialize the histogram
+
+        Returns:
+            dict: Count, sum, min, max, and [bucket, count] pairs
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "bits": BITS,
+            "buckets": sorted(self.buckets.items()),
+        }
+
+
+class Metrics:
+    """Histograms and counters of one app, with snapshots per interval"""
+
+    def __init__(self):
+        """Initialize the object"""
+        self.histograms = {}
+        self.counters = {}
+        self.values = {}
+        self.snapshots = []
+        self.interval = {}
+        self.best = {}
+        self.start = time.time_ns()
+        self.last = self.start
+        self.lock = threading.Lock()
+
+    def record(self, name, value):
+        """Add a value to a histogram
+
+        Args:
+            name (str): Name of the histogram
+            value (int): Value to add
+        """
+        with self.lock:
+            self.histograms.setdefault(name, Histogram()).record(value)
+            if INTERVAL:
+                self.interval.setdefault(name, Histogram()).record(value)
+                self._snapshot()
+
+    def count(self, name, n=1):
+        """Increase a counter
+
+        Args:
+            name (str): Name of the counter
+            n (int, optional): Increase. Defaults to 1.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        """Store any other value in the record, like the first and last time something happened
+
+        Args:
+            name (str): Name of the value
+            value (object): JSON serializable value
+        """
+        with self.lock:
+            self.values[name] = value
+
+    def round_trip(self, t_send, t_recv, t_reply, t_back):
+        """Record the one-way latencies of a round trip between an endpoint and a worker.
+        Both include the clock offset between the two. Like NTP, the round trip with the least
+        network delay per time window gives the best estimate of that offset, which is kept so the
+        latencies can be corrected afterwards.
+
+        Args:
+            t_send (int): Send time on the endpoint (ns)
+            t_recv (int): Receive time on the worker (ns)
+            t_reply (int): Reply time on the worker (ns)
+            t_back (int): Receive time of the reply on the endpoint (ns)
+        """
+        self.record("uplink", t_recv - t_send)
+        self.record("downlink", t_back - t_reply)
+
+        network = (t_back - t_send) - (t_reply - t_recv)
+        offset = ((t_recv - t_send) + (t_reply - t_back)) // 2
+        window = (t_send - self.start) // WINDOW
+        with self.lock:
+            if window not in self.best or network < self.best[window][0]:
+                self.best[window] = (network, t_send, offset)
+
+    def _snapshot(self, force=False):
+        """Summarize the histograms of the current interval once it has passed
+
+        Args:
+            force (bool, optional): Summarize even if the interval didn't pass. Defaults to False.
+        """
+        now = time.time_ns()
+        if not self.interval or (not force and now - self.last < INTERVAL * 10**9):
+            return
+
+        snapshot = {"time": now}
+        for name, histogram in self.interval.items():
+            snapshot[name] = {
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count,
+                "p50": histogram.percentile(50),
+                "p99": histogram.percentile(99),
+                "max": histogram.max,
+            }
+
+        self.snapshots.append(snapshot)
+        self.interval = {}
+        self.last = now
+
+    def merge(self, other):
+        """Add the metrics of another process of the same app
+
+        Args:
+            other (dict): Serialized metrics, see to_dict()
+        """
+        with self.lock:
+            for name, histogram in other["histograms"].items():
+                self.histograms.setdefault(name, Histogram()).merge(histogram)
+
+            for name, n in other["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+            self.values.update(other["values"])
+            self.snapshots += other["snapshots"]
+            self.start = min(self.start, other["start"])
+
+    def to_dict(self):
+        """Serialize the metrics
+
+        Returns:
+            dict: Start time, histograms, counters, other values, and snapshots
+        """
+        with self.lock:
+            if INTERVAL:
+                self._snapshot(force=True)
+
+            # Only the time and clock offset of the best round trip per window
+            values = dict(self.values)
+            if self.best:
+                values["offsets"] = sorted(best[1:] for best in self.best.values())
+
+            return {
+                "start": self.start,
+                "end": time.time_ns(),
+                "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+                "counters": dict(self.counters),
+                "values": values,
+                "snapshots": sorted(self.snapshots, key=lambda s: s["time"]),
+            }
+
+    def emit(self):
+        """Print all metrics as one record, only in summary mode"""
+        if not VERBOSE:
+            print("Metrics: %s" % (json.dumps(self.to_dict(), separators=(",", ":"))))
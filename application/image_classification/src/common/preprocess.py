@@ -0,0 +1,65 @@
+"""\
+Prepare images as input for the TFLite image classification model. This file is shared by the
+subscribers and the combined application, their docker.sh copies it next to their own source.
+
+JPEG images are decoded at reduced resolution: libjpeg can scale an image by 1/2, 1/4, or 1/8
+while decoding it (in the DCT domain), which is much cheaper than decoding the full image and
+resizing it afterwards. Images are written into an input tensor that is allocated once.
+"""
+
+import numpy as np
+from PIL import Image
+
+
+class Preprocessor:
+    """Decode and resize images into a reusable input tensor of the model"""
+
+    def __init__(self, input_details, batch_size=1):
+        """Initialize the object
+
+        Args:
+            input_details (dict): Input details of the model, see Interpreter.get_input_details()
+            batch_size (int, optional): Maximum number of images per invocation. Defaults to 1.
+        """
+        self.height = input_details["shape"][1]
+        self.width = input_details["shape"][2]
+        self.floating = input_details["dtype"] == np.float32
+        self.tensor = np.empty(
+            (batch_size, self.height, self.width, 3), dtype=input_details["dtype"]
+        )
+
+    def load(self, fp, index=0):
+        """Decode an image into the input tensor
+
+        Args:
+            fp (str or file): Path or file object of the image
+            index (int, optional): Position of the image in the batch. Defaults to 0.
+        """
+        image = Image.open(fp)
+
+        # For JPEG, decode at the smallest scale that is still at least the model input size
+        image.draft("RGB", (self.width, self.height))
+
+        # Only convert if the decoder can't output RGB itself, e.g. for grayscale or PNG images
+        if image.mode != "RGB":
+            image = image.convert(mode="RGB")
+
+        if image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height))
+
+        target = self.tensor[index]
+        target[...] = np.asarray(image)
+        if self.floating:
+            target -= 127.5
+            target /= 127.5
+
+    def batch(self, size=1):
+        """Get the input tensor of the first images in the batch, without copying it
+
+        Args:
+            size (int, optional): Number of images. Defaults to 1.
+
+        Returns:
+            ndarray: Input tensor with shape (size, height, width, 3)
+        """
+        return self.tensor[:size]
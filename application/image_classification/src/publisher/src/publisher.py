@@ -6,6 +6,8 @@ import time
 import os
 import paho.mqtt.client as mqtt
 
+from metrics import Metrics, VERBOSE
+
 MQTT_LOCAL_IP = os.environ["MQTT_LOCAL_IP"]
 MQTT_REMOTE_IP = os.environ["MQTT_REMOTE_IP"]
 MQTT_LOGS = os.environ["MQTT_LOGS"]
@@ -24,6 +26,8 @@ MAX_IMGS = FREQUENCY * DURATION
 
 RECEIVED = 0
 
+metrics = Metrics()
+
 
 def on_connect(local_client, _userdata, _flags, rc):
     """Execute when connecting to MQTT broker
@@ -72,10 +76,19 @@ def on_message(_client, _userdata, msg):
     """
     t_now = time.time_ns()
 
-    t_old_bytes = msg.payload[-25:]
-    t_old = int(t_old_bytes.decode("utf-8"))
+    # Timing header: our send time, and the receive and reply time of the worker.
+    # Each timestamp is a fixed length of 20 characters.
+    header = msg.payload.decode("utf-8")
+    t_old = int(header[:20])
+    t_recv = int(header[20:40])
+    t_reply = int(header[40:60])
+
+    metrics.record("latency", t_now - t_old)
+    metrics.round_trip(t_old, t_recv, t_reply, t_now)
+    if VERBOSE:
+        print("Latency (ns): %i" % (t_now - t_old))
+        print("Timing (ns): %i %i %i %i" % (t_old, t_recv, t_reply, t_now))
 
-    print("Latency (ns): %i" % (t_now - t_old))
     global RECEIVED
     RECEIVED += 1
 
@@ -88,7 +101,8 @@ def on_publish(_mqttc, _obj, _mid):
         _obj (_type_): _description_
         _mid (_type_): _description_
     """
-    print("Published data")
+    if VERBOSE:
+        print("Published data")
 
 
 def connect():
@@ -143,12 +157,18 @@ def send():
         ip_bytes = (15 - len(MQTT_LOCAL_IP)) * "-" + MQTT_LOCAL_IP
         byte_arr.extend(ip_bytes.encode("utf-8"))
 
-        print("Sending data (bytes): %i" % (len(byte_arr)))
+        metrics.record("data", len(byte_arr))
+        if VERBOSE:
+            print("Sending data (bytes): %i" % (len(byte_arr)))
+
         _ = remote_client.publish(MQTT_TOPIC_SUB, byte_arr, qos=0)
 
         # Try to keep a frame rate of X
         sec_frame = time.time_ns() - start_time
-        print("Preparation and preprocessing (ns): %i" % (sec_frame))
+        metrics.record("preprocessing", sec_frame)
+        if VERBOSE:
+            print("Preparation and preprocessing (ns): %i" % (sec_frame))
+
         sec_frame = float(sec_frame) / 10**9
 
         if sec_frame < SEC_PER_FRAME:
@@ -158,7 +178,11 @@ def send():
                 time.sleep(frame)
                 sec_frame = float(time.time_ns() - start_time) / 10**9
         else:
-            print("Can't keep up with %f seconds per frame: Took %f" % (SEC_PER_FRAME, sec_frame))
+            metrics.count("late")
+            if VERBOSE:
+                print(
+                    "Can't keep up with %f seconds per frame: Took %f" % (SEC_PER_FRAME, sec_frame)
+                )
 
     # Make sure the finish message arrives
     remote_client.loop_start()
@@ -179,3 +203,4 @@ if __name__ == "__main__":
         time.sleep(10)
 
     print("All %i images have been received back" % (MAX_IMGS))
+    metrics.emit()
@@ -1,4 +1,6 @@
 #!/bin/bash
 cp -r ../images src/
+cp ../common/metrics.py ./src/
 docker buildx build --platform linux/amd64,linux/arm64 -t redplanet00/kubeedge-applications:image_classification_publisher_serverless --push .
 rm -r src/images
+rm src/metrics.py
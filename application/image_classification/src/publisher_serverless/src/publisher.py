@@ -1,13 +1,22 @@
 """\
 This is a publisher, sending local images over HTTP to a subscriber for further processing.
+
+Requests are sent open-loop: every request has an intended send time following the arrival
+process, and is sent at that time no matter how many earlier requests are still waiting for a
+response. Latency is measured from the intended send time, so a slow function shows up as
+higher latency instead of as a lower offered load (no coordinated omission).
 """
 
-import time
-import os
-import sys
+import asyncio
 import base64
 import json
-import requests
+import os
+import random
+import time
+
+import aiohttp
+
+from metrics import Metrics, VERBOSE
 
 FREQUENCY = int(os.environ["FREQUENCY"])
 CLOUD_CONTROLLER_IP = os.environ["CLOUD_CONTROLLER_IP"]
@@ -17,77 +26,213 @@ if "DURATION" in os.environ:
 else:
     DURATION = 300
 
+# Arrival process of requests: constant, poisson, or burst (BURST_SIZE requests at once)
+ARRIVAL = os.environ.get("ARRIVAL", "constant")
+BURST_SIZE = int(os.environ.get("BURST_SIZE", 10))
+
+# Request format: binary sends the raw JPEG with the send time and ID in headers,
+# json sends it base64 encoded in a JSON body like older versions of the function expect
+PAYLOAD = os.environ.get("PAYLOAD", "binary")
+
+# Maximum number of open connections to the gateway, reused between requests
+CONNECTIONS = int(os.environ.get("CONNECTIONS", 100))
+
+# Seconds to wait for a connection or for data from the gateway, before a request fails.
+# Waiting for a free connection in the pool doesn't count, that is part of the latency.
+TIMEOUT = float(os.environ.get("TIMEOUT", 100000))
+
 # Set how many imgs to send, and how often
 SEC_PER_FRAME = float(1 / FREQUENCY)
 MAX_IMGS = FREQUENCY * DURATION
 
+URL = "http://%s:8080/function/image" % (CLOUD_CONTROLLER_IP)
+
+metrics = Metrics()
+
+
+def get_schedule():
+    """Get the intended send time of every request, relative to the start
 
-def send():
-    """Loop over local images, and send them one by one to a remote MQTT broker"""
-    # Loop over the dataset of 60 images
-    files = []
-    for file in os.listdir("images"):
+    Returns:
+        list(int): Send time of each request (ns)
+    """
+    if ARRIVAL == "poisson":
+        # Exponential inter-arrival times with a mean of SEC_PER_FRAME
+        schedule = []
+        t = 0.0
+        for _ in range(MAX_IMGS):
+            schedule.append(int(t * 10**9))
+            t += random.expovariate(FREQUENCY)
+
+        return schedule
+
+    if ARRIVAL == "burst":
+        # Same average rate, but BURST_SIZE requests arrive at the same time
+        return [
+            int((i // BURST_SIZE) * BURST_SIZE * SEC_PER_FRAME * 10**9) for i in range(MAX_IMGS)
+        ]
+
+    return [int(i * SEC_PER_FRAME * 10**9) for i in range(MAX_IMGS)]
+
+
+def load_images():
+    """Load (and encode, for JSON) all local images once, so this doesn't delay sending
+
+    Returns:
+        list(bytes or str): Raw images, or base64 encoded images for JSON
+    """
+    images = []
+    for file in sorted(os.listdir("images")):
         if file.endswith(".JPEG"):
-            files.append(file)
+            with open("images/" + file, "rb") as f:
+                image = f.read()
 
-    # Send all frames over MQTT, one by one
-    for i in range(MAX_IMGS):
-        start_time = time.time_ns()
-        with open("images/" + files[i % len(files)], "rb") as f:
-            im_bytes = f.read()
+            if PAYLOAD == "json":
+                image = base64.b64encode(image).decode("utf-8")
 
-        im_b64 = base64.b64encode(im_bytes).decode("utf-8")
+            images.append(image)
 
-        # Prepend 0's to the time to get a fixed length string
-        t = time.time_ns()
-        t_str = str(t)
+    return images
 
-        # In JSON
-        headers = {"Content-type": "application/json", "Accept": "text/plain"}
-        payload = json.dumps({"image": im_b64, "time": t_str})
 
-        print("Sending data (bytes): %i" % (len(payload)))
-        t_before_send = time.time_ns()
-        response = requests.post(
-            "http://%s:8080/function/image" % (CLOUD_CONTROLLER_IP),
-            data=payload,
-            headers=headers,
-            timeout=100000,
-        )
+def get_wire_size(request_info, payload):
+    """Get the size of a request on the wire, including the HTTP request line and headers
+
+    Args:
+        request_info (RequestInfo): Method, URL, and headers of the sent request
+        payload (bytes or str): Request body
+
+    Returns:
+        int: Size in bytes
+    """
+    size = len("%s %s HTTP/1.1\r\n" % (request_info.method, request_info.url.raw_path_qs))
+    for key, value in request_info.headers.items():
+        size += len(key) + len(value) + 4
 
-        # pylint: disable=broad-except
-        try:
-            response = response.text
-            return_line = response.split("\n")[-2]
-            return_dict_str = return_line.replace("'", '"')
-            return_dict = json.loads(return_dict_str)
-            t_old = int(return_dict["time"])
-        except Exception:
-            print("ERROR: Can't decode the output, something went wrong")
-            print(response.text)
-            sys.exit()
-        # pylint: enable=broad-except
+    return size + 2 + len(payload)
 
-        t_respone = time.time_ns()
-        print("Latency (ns): %i" % (t_respone - t_old))
 
-        # Try to keep a frame rate of X
-        sec_frame = t_before_send - start_time
-        print("Preparation and preprocessing (ns): %i" % (sec_frame))
+async def send(session, image, i, intended, stats):
+    """Send one image to the serverless function and print its latency
 
-        sec_frame = float(t_respone - t_old) / 10**9
+    Args:
+        session (ClientSession): Session with the shared connection pool
+        image (bytes or str): Image to send, see load_images()
+        i (int): ID of this request
+        intended (int): Time at which this request should have been sent (ns)
+        stats (dict): Counters of sent, answered, and failed requests
+    """
+    # The function echoes the send time, which we use to split latency into uplink and downlink
+    # Requests may start after their intended send time if the event loop is busy: dispatch lag
+    t = time.time_ns()
+    if PAYLOAD == "json":
+        headers = {"Content-type": "application/json", "Accept": "text/plain"}
+        payload = json.dumps({"image": image, "time": str(t), "id": i})
+    else:
+        headers = {
+            "Content-type": "image/jpeg",
+            "Accept": "text/plain",
+            "X-Send-Time": str(t),
+            "X-Request-Id": str(i),
+        }
+        payload = image
+
+    t_before_send = time.time_ns()
+    metrics.record("data", len(payload))
+    metrics.record("preprocessing", t_before_send - t)
+    metrics.record("dispatch", t - intended)
+    if VERBOSE:
+        print("Sending data (bytes): %i" % (len(payload)))
+        print("Preparation and preprocessing (ns): %i" % (t_before_send - t))
+        print("Dispatch lag (ns): %i" % (t - intended))
+
+    stats["sent"] += 1
+
+    # pylint: disable=broad-except
+    try:
+        async with session.post(URL, data=payload, headers=headers) as response:
+            text = await response.text()
+            wire = get_wire_size(response.request_info, payload)
+
+        return_line = text.split("\n")[-2]
+        return_dict_str = return_line.replace("'", '"')
+        return_dict = json.loads(return_dict_str)
+        t_old = int(return_dict["time"])
+    except Exception as e:
+        print("ERROR: Request failed or can't decode the output: %s" % (str(e)))
+        stats["failed"] += 1
+        return
+    # pylint: enable=broad-except
+
+    t_respone = time.time_ns()
+    stats["answered"] += 1
+    stats["last"] = max(stats["last"], t_respone)
+    metrics.record("wire", wire)
+
+    # Report invocations that had to load the model apart, so they don't skew the latency
+    if return_dict.get("cold"):
+        metrics.record("cold_latency", t_respone - intended)
+        metrics.record("model_load", return_dict["cold"])
+    else:
+        metrics.record("latency", t_respone - intended)
+
+    if "received" in return_dict:
+        metrics.round_trip(t_old, return_dict["received"], return_dict["replied"], t_respone)
+
+    if not VERBOSE:
+        return
+
+    print("Wire data (bytes): %i" % (wire))
+    if return_dict.get("cold"):
+        print("Cold start latency (ns): %i" % (t_respone - intended))
+        print("Model loading (ns): %i" % (return_dict["cold"]))
+    else:
+        print("Latency (ns): %i" % (t_respone - intended))
+
+    if "received" in return_dict:
+        print(
+            "Timing (ns): %i %i %i %i"
+            % (t_old, return_dict["received"], return_dict["replied"], t_respone)
+        )
 
-        if sec_frame < SEC_PER_FRAME:
-            # Wait until next frame should happen
-            frame = 0.1 * (SEC_PER_FRAME - sec_frame)
-            while sec_frame < SEC_PER_FRAME:
-                time.sleep(frame)
-                sec_frame = float(time.time_ns() - start_time) / 10**9
-        else:
-            print("Can't keep up with %f seconds per frame: Took %f" % (SEC_PER_FRAME, sec_frame))
 
-    print("Finished, sent %i images" % (MAX_IMGS))
+async def generate():
+    """Send all images following the arrival process, without waiting for responses"""
+    images = load_images()
+    schedule = get_schedule()
+    stats = {"sent": 0, "answered": 0, "failed": 0, "last": 0}
+
+    connector = aiohttp.TCPConnector(limit=CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=TIMEOUT, sock_read=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.time_ns()
+        tasks = []
+        for i, offset in enumerate(schedule):
+            intended = start + offset
+            delay = (intended - time.time_ns()) / 10**9
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            tasks.append(
+                asyncio.ensure_future(send(session, images[i % len(images)], i, intended, stats))
+            )
+
+        sent = time.time_ns()
+        await asyncio.gather(*tasks)
+
+    # Compare the offered load and throughput with the configured frequency
+    print("Target rate (requests/s): %.2f" % (FREQUENCY))
+    # Sending took longer than the configured duration if the event loop could not keep up
+    offered = len(schedule) / max(DURATION, (sent - start) / 10**9)
+    print("Offered rate (requests/s): %.2f" % (offered))
+    if stats["answered"]:
+        throughput = stats["answered"] / max(stats["last"] - start, 1) * 10**9
+        print("Achieved rate (requests/s): %.2f" % (throughput))
+    print("Failed requests: %i" % (stats["failed"]))
+
+    print("Finished, sent %i images" % (stats["sent"]))
+    metrics.emit()
 
 
 if __name__ == "__main__":
-    send()
+    asyncio.run(generate())
@@ -0,0 +1,166 @@
+"""\
+Pass images from the MQTT receiver to the inference processes through shared memory.
+Images are written once into a fixed-size slot of a shared memory ring buffer, and only the
+slot index is sent through a queue. Workers decode the image straight from shared memory, and
+return the slot when done. If all slots are in use, new images are dropped and counted.
+"""
+
+import io
+import multiprocessing
+
+from multiprocessing import shared_memory
+from queue import Empty
+
+# Time to wait for a free slot before an image is dropped (s)
+SLOT_TIMEOUT = 0.005
+
+
+class RingBuffer:
+    """Shared memory with fixed-size slots, and a queue of free slots"""
+
+    def __init__(self, slots, slot_size):
+        """Initialize the object. Create before forking workers, so they share the memory.
+
+        Args:
+            slots (int): Number of slots, the maximum number of images waiting or in processing
+            slot_size (int): Size of a slot in bytes, the maximum size of an image
+        """
+        self.slots = slots
+        self.slot_size = slot_size
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_size)
+
+        self.free = multiprocessing.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+
+        # Overload accounting, only updated by the producer
+        self.peak = 0
+        self.dropped_full = 0
+        self.dropped_size = 0
+
+    def put(self, data):
+        """Copy data into a free slot
+
+        Args:
+            data (bytes): Data to store
+
+        Returns:
+            int: Slot the data is stored in, None if the data was dropped
+        """
+        if len(data) > self.slot_size:
+            self.dropped_size += 1
+            return None
+
+        try:
+            slot = self.free.get(timeout=SLOT_TIMEOUT)
+        except Empty:
+            self.dropped_full += 1
+            return None
+
+        start = slot * self.slot_size
+        self.shm.buf[start : start + len(data)] = data
+
+        self.peak = max(self.peak, self.slots - self.free.qsize())
+        return slot
+
+    def view(self, slot, length):
+        """Get the data in a slot without copying it
+
+        Args:
+            slot (int): Slot to read
+            length (int): Length of the data in the slot
+
+        Returns:
+            memoryview: Data in the slot
+        """
+        start = slot * self.slot_size
+        return self.shm.buf[start : start + length]
+
+    def release(self, slot):
+        """Return a slot once its data is no longer used
+
+        Args:
+            slot (int): Slot to return
+        """
+        self.free.put(slot)
+
+    def stats(self):
+        """Describe the capacity and overload of the buffer, for the producer
+
+        Returns:
+            str: Number and size of slots, peak slots in use, and dropped images
+        """
+        return "%i slots of %i bytes, peak in use %i, dropped %i (full) + %i (too large)" % (
+            self.slots,
+            self.slot_size,
+            self.peak,
+            self.dropped_full,
+            self.dropped_size,
+        )
+
+    def close(self):
+        """Free the shared memory, only call from the process that created the buffer"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SlotFile(io.RawIOBase):
+    """Read-only file object over a memoryview, so images can be decoded without copying them"""
+
+    def __init__(self, view):
+        """Initialize the object
+
+        Args:
+            view (memoryview): Data to read
+        """
+        super().__init__()
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        """The file can be read"""
+        return True
+
+    def seekable(self):
+        """The file supports random access"""
+        return True
+
+    def readinto(self, b):
+        """Read data into a pre-allocated buffer
+
+        Args:
+            b (bytearray or memoryview): Buffer to read into
+
+        Returns:
+            int: Number of bytes read
+        """
+        n = min(len(b), len(self.view) - self.pos)
+        b[:n] = self.view[self.pos : self.pos + n]
+        self.pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move to a position in the file
+
+        Args:
+            offset (int): Offset to move
+            whence (int, optional): Offset relative to start, current, or end. Defaults to start.
+
+        Returns:
+            int: New position
+        """
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        """Get the current position in the file
+
+        Returns:
+            int: Position
+        """
+        return self.pos
@@ -3,14 +3,17 @@ This is a subscriber, receiving images through MQTT and
 processing them using image classification from TFLite.
 """
 
-import io
 import os
 import time
 import multiprocessing
-from PIL import Image
+from queue import Empty
 import numpy as np
 import paho.mqtt.client as mqtt
 
+from metrics import Metrics, VERBOSE
+from preprocess import Preprocessor
+from ring_buffer import RingBuffer, SlotFile
+
 # pylint: disable-next=import-error
 import tflite_runtime.interpreter as tflite
 
@@ -18,10 +21,27 @@ MQTT_LOCAL_IP = os.environ["MQTT_LOCAL_IP"]
 MQTT_LOGS = os.environ["MQTT_LOGS"]
 CPU_THREADS = int(os.environ["CPU_THREADS"])
 ENDPOINT_CONNECTED = int(os.environ["ENDPOINT_CONNECTED"])
+
+# Classify up to BATCH_SIZE images in one invocation, waiting at most BATCH_TIMEOUT ms for them
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 1))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", 10))
+
+# Images wait in a shared memory ring buffer of RING_SLOTS slots of RING_SLOT_SIZE bytes each
+RING_SLOTS = int(os.environ.get("RING_SLOTS", 64))
+RING_SLOT_SIZE = int(os.environ.get("RING_SLOT_SIZE", 1048576))
+
+# Every image ends with its send time (20 bytes) and the IP of its sender (15 bytes)
+TRAILER = 35
+
+# Asks a subscriber process to hand over its metrics and stop, in summary mode
+FLUSH = b"metrics"
 MQTT_TOPIC_PUB = "image-classification-pub"
 MQTT_TOPIC_SUB = "image-classification-sub"
 
+# Only slot indices go through the queue, the images themselves stay in shared memory
+ring = RingBuffer(RING_SLOTS, RING_SLOT_SIZE)
 work_queue = multiprocessing.Queue()
+metrics_queue = multiprocessing.Queue()
 endpoints_connected = multiprocessing.Value("i", ENDPOINT_CONNECTED)
 images_processed = multiprocessing.Value("i", 0)
 
@@ -71,7 +91,21 @@ def on_message(_client, _userdata, msg):
         _userdata (_type_): _description_
         msg (str): Received message
     """
-    work_queue.put([time.time_ns(), msg.payload])
+    t_now = time.time_ns()
+
+    # Control messages are small, send them by value
+    if len(msg.payload) <= TRAILER:
+        work_queue.put((t_now, None, msg.payload))
+        return
+
+    slot = ring.put(msg.payload)
+    if slot is None:
+        if VERBOSE:
+            print("Dropped image, ring buffer is full or the image is too large\n", end="")
+
+        return
+
+    work_queue.put((t_now, slot, len(msg.payload)))
 
 
 def on_publish(_mqttc, _obj, _mid):
@@ -82,7 +116,8 @@ def on_publish(_mqttc, _obj, _mid):
         _obj (_type_): _description_
         _mid (_type_): _description_
     """
-    print("Published data")
+    if VERBOSE:
+        print("Published data")
 
 
 def connect_remote_client(current, ip):
@@ -106,9 +141,72 @@ def connect_remote_client(current, ip):
     return remote_client
 
 
+def get_batch(queue, current):
+    """Get the next batch of images from the queue: wait for one image, then collect more until
+    we have BATCH_SIZE images or BATCH_TIMEOUT ms have passed. Stop messages are handled here.
+
+    Args:
+        queue (obj): Multiprocessing queue with work
+        current (obj): Multiprocessing current process object
+
+    Returns:
+        list(tuple(int, int, int)): Receive time, ring buffer slot, and length of each image.
+            None if the process should hand over its metrics and stop.
+    """
+    batch = []
+    deadline = None
+    while len(batch) < BATCH_SIZE:
+        if deadline is None:
+            item = queue.get(block=True)
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                item = queue.get(block=True, timeout=remaining)
+            except Empty:
+                break
+
+        # Stop if a specific message is sent, other control messages are ignored
+        if item[1] is None:
+            if item[2] == b"1":
+                with endpoints_connected.get_lock():
+                    endpoints_connected.value -= 1
+                    counter = endpoints_connected.value
+
+                print(
+                    "[%s] A client disconnected, %i clients left\n" % (current.name, counter),
+                    end="",
+                )
+
+                # Don't hold back images already in the batch when clients disconnect
+                if batch:
+                    break
+            elif item[2] == FLUSH:
+                # Finish the current batch first
+                if batch:
+                    queue.put(item)
+                    break
+
+                return None
+
+            continue
+
+        if VERBOSE:
+            print("[%s] Read image and apply ML\n" % (current.name), end="")
+
+        batch.append(item)
+        if deadline is None:
+            deadline = time.monotonic() + BATCH_TIMEOUT / 1000
+
+    return batch
+
+
 def do_tflite(queue):
     """A Multiprocessing thread
-    Receive images from a queue, and perform image classification on it
+    Receive images from a queue, and perform image classification on them.
+    With BATCH_SIZE > 1, images that arrive close together are classified in one invocation.
 
     Args:
         queue (obj): Multiprocessing queue with work
@@ -130,87 +228,151 @@ def do_tflite(queue):
 
     iw = input_details[0]["shape"][2]
     ih = input_details[0]["shape"][1]
+    batch_size = input_details[0]["shape"][0]
+    preprocessor = Preprocessor(input_details[0], BATCH_SIZE)
 
     print("[%s] Preparations finished\n" % (current.name), end="")
 
     remote_clients = {}
+    metrics = Metrics()
 
     while True:
-        print("[%s] Get item\n" % (current.name), end="")
-        item = queue.get(block=True)
+        if VERBOSE:
+            print("[%s] Get item\n" % (current.name), end="")
 
-        start_time = time.time_ns()
-        t_now = item[0]
-        data = item[1]
+        batch = get_batch(queue, current)
+        if batch is None:
+            metrics_queue.put(metrics.to_dict())
+            return
 
-        # Stop if a specific message is sent
-        try:
-            if data.decode() == "1":
-                with endpoints_connected.get_lock():
-                    endpoints_connected.value -= 1
-                    counter = endpoints_connected.value
-
-                print(
-                    "[%s] A client disconnected, %i clients left\n" % (current.name, counter),
-                    end="",
-                )
-                continue
-        except (AttributeError, UnicodeDecodeError):
-            print("[%s] Read image and apply ML\n" % (current.name), end="")
+        start_time = time.time_ns()
+        if "first" not in metrics.values:
+            metrics.set("first", start_time)
 
-        # Read the image, do ML on it
+        # Read the images, do ML on them
         with images_processed.get_lock():
-            images_processed.value += 1
+            images_processed.value += len(batch)
+
+        senders = []
+        for index, (t_now, slot, length) in enumerate(batch):
+            data = ring.view(slot, length)
+
+            # Get sender IP, needed to reply back
+            ip_bytes = bytes(data[-15:])
+            ip = ip_bytes.decode("utf-8")
+            while ip[0] == "-":
+                ip = ip[1:]
+
+            # Get timestamp to calculate latency, prepended with 0s to make it a fixed length
+            t_bytes = bytes(data[-TRAILER:-15])
+            t_old = int(t_bytes.decode("utf-8"))
+            metrics.record("latency", t_now - t_old)
+            metrics.record("queue", start_time - t_now)
+            if VERBOSE:
+                print("[%s] Latency (ns): %s\n" % (current.name, str(t_now - t_old)), end="")
+                print("[%s] Queue time (ns): %i\n" % (current.name, start_time - t_now), end="")
+
+            senders.append((ip, t_bytes, t_now))
+
+            # Decode the image straight from shared memory, then free the slot for new images
+            start_preprocess = time.time_ns()
+            preprocessor.load(SlotFile(data[:-TRAILER]), index)
+            del data
+            ring.release(slot)
+            preprocess = time.time_ns() - start_preprocess
+            metrics.record("decode", preprocess)
+            if VERBOSE:
+                print("[%s] Preprocessing (ns): %i\n" % (current.name, preprocess), end="")
+
+        # Only resize the input tensor if the batch size changed, reallocating takes time
+        if len(batch) != batch_size:
+            batch_size = len(batch)
+            interpreter.resize_tensor_input(input_details[0]["index"], [batch_size, ih, iw, 3])
+            interpreter.allocate_tensors()
+
+        start_inference = time.time_ns()
+        interpreter.set_tensor(input_details[0]["index"], preprocessor.batch(len(batch)))
 
-        # Get sender IP, needed to reply back
-        ip_bytes = data[-15:]
-        ip = ip_bytes.decode("utf-8")
-        while ip[0] == "-":
-            ip = ip[1:]
+        interpreter.invoke()
 
-        # Get timestamp to calculate latency. We prepended 0's to the time to make it a fixed length
-        t_bytes = data[-35:-15]
-        t_old = int(t_bytes.decode("utf-8"))
-        print("[%s] Latency (ns): %s\n" % (current.name, str(t_now - t_old)), end="")
+        output_details = interpreter.get_output_details()
+        output_data = interpreter.get_tensor(output_details[0]["index"])
+        inference = time.time_ns() - start_inference
+
+        # Print the top 5 labels of every image
+        if VERBOSE:
+            for results in output_data:
+                top_k = results.argsort()[-5:][::-1]
+                for i in top_k:
+                    if floating_model:
+                        print("\t{:08.6f} - {}\n".format(float(results[i]), labels[i]), end="")
+                    else:
+                        print(
+                            "\t{:08.6f} - {}\n".format(float(results[i] / 255.0), labels[i]),
+                            end="",
+                        )
+
+        # Every image in the batch waits for the entire batch to be processed
+        sec_frame = time.time_ns() - start_time
+        metrics.record("batch", len(batch))
+        metrics.set("last", time.time_ns())
+        for _ in batch:
+            metrics.record("inference", inference)
+            metrics.record("processing", sec_frame)
+
+        if VERBOSE:
+            print("[%s] Batch size: %i\n" % (current.name, len(batch)), end="")
+            for _ in batch:
+                print("[%s] Inference (ns): %i\n" % (current.name, inference), end="")
+                print("[%s] Processing (ns): %i\n" % (current.name, sec_frame), end="")
+
+        # Send results back to the source of each image (currently only timestamps,
+        # but adding real feedback is trivial and has no impact)
+        for ip, t_bytes, t_now in senders:
+            if VERBOSE:
+                print("[%s] Send result to source: %s" % (current.name, ip))
 
-        # Get data to process
-        data = data[:-35]
-        image = Image.open(io.BytesIO(data))
-        image = image.resize((iw, ih)).convert(mode="RGB")
+            if ip not in remote_clients:
+                remote_clients[ip] = connect_remote_client(current, ip)
 
-        input_data = np.expand_dims(image, axis=0)
+            # Timing header: send time of the endpoint, and receive and reply time of this worker.
+            # With both clocks in one round trip, the endpoint can remove the clock offset.
+            t_recv = (20 - len(str(t_now))) * "0" + str(t_now)
+            t_reply = time.time_ns()
+            t_reply = (20 - len(str(t_reply))) * "0" + str(t_reply)
+            header = t_bytes + t_recv.encode("utf-8") + t_reply.encode("utf-8")
 
-        if floating_model:
-            input_data = (np.float32(input_data) - 127.5) / 127.5
+            _ = remote_clients[ip].publish(MQTT_TOPIC_PUB, header, qos=0)
 
-        interpreter.set_tensor(input_details[0]["index"], input_data)
 
-        interpreter.invoke()
+def collect_metrics():
+    """Ask every subscriber process for its metrics, and merge them
 
-        output_details = interpreter.get_output_details()
-        output_data = interpreter.get_tensor(output_details[0]["index"])
-        results = np.squeeze(output_data)
+    Returns:
+        Metrics: Metrics of all processes, with the first and last time any process was busy
+    """
+    for _ in range(CPU_THREADS):
+        work_queue.put((time.time_ns(), None, FLUSH))
 
-        top_k = results.argsort()[-5:][::-1]
-        for i in top_k:
-            if floating_model:
-                print("\t{:08.6f} - {}\n".format(float(results[i]), labels[i]), end="")
-            else:
-                print(
-                    "\t{:08.6f} - {}\n".format(float(results[i] / 255.0), labels[i]),
-                    end="",
-                )
+    metrics = Metrics()
+    first = []
+    last = []
+    for _ in range(CPU_THREADS):
+        try:
+            other = metrics_queue.get(timeout=60)
+        except Empty:
+            print("A subscriber process did not hand over its metrics")
+            break
 
-        sec_frame = time.time_ns() - start_time
-        print("[%s] Processing (ns): %i\n" % (current.name, sec_frame), end="")
+        metrics.merge(other)
+        first += [other["values"]["first"]] if "first" in other["values"] else []
+        last += [other["values"]["last"]] if "last" in other["values"] else []
 
-        # Send result back (currently only timestamp,
-        # but adding real feedback is trivial and has no impact)
-        print("[%s] Send result to source: %s" % (current.name, ip))
-        if ip not in remote_clients:
-            remote_clients[ip] = connect_remote_client(current, ip)
+    if first:
+        metrics.set("first", min(first))
+        metrics.set("last", max(last))
 
-        _ = remote_clients[ip].publish(MQTT_TOPIC_PUB, t_bytes, qos=0)
+    return metrics
 
 
 def main():
@@ -241,9 +403,20 @@ def main():
 
         local_client.loop_stop()
 
+        # Collect the metrics of all subscriber processes into one record
+        metrics = None if VERBOSE else collect_metrics()
+
         work_queue.close()
         work_queue.join_thread()
 
+    print("Ring buffer: %s" % (ring.stats()))
+    print("Dropped images: %i" % (ring.dropped_full + ring.dropped_size))
+    ring.close()
+
+    if metrics is not None:
+        metrics.count("dropped", ring.dropped_full + ring.dropped_size)
+        metrics.emit()
+
     with images_processed.get_lock():
         print("Finished, processed images: %i" % images_processed.value)
 
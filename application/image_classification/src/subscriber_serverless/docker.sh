@@ -1,5 +1,6 @@
 #!/bin/bash
 cp ../model/* ./function/
+cp ../common/preprocess.py ./function/
 docker build -t redplanet00/kubeedge-applications:image_classification_subscriber_serverless .
 docker push redplanet00/kubeedge-applications:image_classification_subscriber_serverless
-rm function/labels.txt function/model.tflite
+rm function/labels.txt function/model.tflite function/preprocess.py
@@ -1,90 +1,159 @@
 """\
 This is a subscriber, receiving images through HTTP as serverless and
 processing them using image classification from TFLite.
+
+The function process stays alive between invocations (of-watchdog http mode), so the labels
+and interpreters are kept at process scope. Interpreters are not thread-safe: every concurrent
+invocation takes its own interpreter from a pool, which is filled on demand up to POOL_SIZE.
+An invocation that had to load the model is a cold start, and reports the loading time.
 """
 
 import io
 import os
+import queue
+import threading
 import time
 import base64
 import json
-from PIL import Image
 import numpy as np
 
 # pylint: disable-next=import-error
 import tflite_runtime.interpreter as tflite
 
+from .preprocess import Preprocessor
+
 CPU_THREADS = int(os.environ["CPU_THREADS"])
 
+# Number of interpreters, and so of concurrent invocations. They share the CPU threads.
+POOL_SIZE = int(os.environ.get("POOL_SIZE", max(1, CPU_THREADS)))
+THREADS = max(1, CPU_THREADS // POOL_SIZE)
 
-def handle(req):
-    """A Multiprocessing thread
-    Receive images from a queue, and perform image classification on it
+# Load the labels once per process
+with open("/home/app/function/labels.txt", "r", encoding="utf-8") as f:
+    LABELS = [line.strip() for line in f.readlines()]
 
-    Args:
-        req (str): Request body as string
+POOL = queue.LifoQueue()
+POOL_LOCK = threading.Lock()
+POOL_CREATED = 0
+
+
+def acquire_interpreter():
+    """Take a warm interpreter from the pool, or load a new one if the pool is not full yet
+
+    Returns:
+        Interpreter: TFLite interpreter with allocated tensors
+        Preprocessor: Preprocessor with the input tensor of this interpreter
+        int: Time spent loading the model (ns), 0 for a warm interpreter
     """
-    t_now = time.time_ns()
-    print("Start\n")
+    global POOL_CREATED  # pylint: disable=global-statement
+
+    try:
+        return (*POOL.get_nowait(), 0)
+    except queue.Empty:
+        pass
 
-    # Load the labels
-    with open("/home/app/function/labels.txt", "r", encoding="utf-8") as f:
-        labels = [line.strip() for line in f.readlines()]
+    with POOL_LOCK:
+        create = POOL_CREATED < POOL_SIZE
+        if create:
+            POOL_CREATED += 1
 
-    # Load the model
-    threads = max(1, CPU_THREADS)
+    # The pool is full: wait for another invocation to return its interpreter
+    if not create:
+        return (*POOL.get(), 0)
+
+    t_load = time.time_ns()
     interpreter = tflite.Interpreter(
-        model_path="/home/app/function/model.tflite", num_threads=threads
+        model_path="/home/app/function/model.tflite", num_threads=THREADS
     )
     interpreter.allocate_tensors()
+    preprocessor = Preprocessor(interpreter.get_input_details()[0])
+    return interpreter, preprocessor, time.time_ns() - t_load
+
+
+def parse_request(req, headers):
+    """Get the image and send time from a request. Binary requests carry the raw image in the
+    body and the send time in a header, JSON requests carry both in the body (base64 encoded)
 
-    # Get model input details and resize image
-    input_details = interpreter.get_input_details()
-    floating_model = input_details[0]["dtype"] == np.float32
+    Args:
+        req (bytes): Request body
+        headers (dict): Request headers, with lowercase names
+
+    Returns:
+        bytes: Image
+        str: Send time of the request (ns)
+        str: ID of the request, None if not set
+    """
+    if headers.get("content-type", "application/json").startswith("application/json"):
+        request = json.loads(req)
+        image = base64.b64decode(request["image"].encode("utf-8"))
+        return image, request["time"], request.get("id")
+
+    return req, headers["x-send-time"], headers.get("x-request-id")
+
+
+def handle(req, headers=None):
+    """Perform image classification on an image received over HTTP
 
-    iw = input_details[0]["shape"][2]
-    ih = input_details[0]["shape"][1]
+    Args:
+        req (bytes): Request body
+        headers (dict, optional): Request headers, with lowercase names. Defaults to None (JSON).
+
+    Returns:
+        dict: Timing of this invocation, with the model loading time if it was a cold start
+    """
+    t_now = time.time_ns()
+    print("Start\n")
 
-    print("Preparations finished")
+    interpreter, preprocessor, t_load = acquire_interpreter()
+    try:
+        if t_load:
+            print("Model loading (ns): %i\n" % (t_load), end="")
 
-    request = json.loads(req)
+        input_details = interpreter.get_input_details()
+        floating_model = preprocessor.floating
 
-    # Get timestamp to calculate latency.
-    # We prepended 0's to the time to make it a fixed length
-    t_str = request["time"]
-    t_old = int(t_str)
-    print("Latency (ns): %s\n" % (str(t_now - t_old)), end="")
+        print("Preparations finished")
 
-    # Get data to process
-    im_b64 = request["image"]
-    img_bytes = base64.b64decode(im_b64.encode("utf-8"))
-    image = Image.open(io.BytesIO(img_bytes))
-    image = image.resize((iw, ih)).convert(mode="RGB")
+        img_bytes, t_str, request_id = parse_request(req, headers or {})
 
-    input_data = np.expand_dims(image, axis=0)
+        # Get timestamp to calculate latency.
+        t_old = int(t_str)
+        print("Latency (ns): %s\n" % (str(t_now - t_old)), end="")
 
-    if floating_model:
-        input_data = (np.float32(input_data) - 127.5) / 127.5
+        # Get data to process
+        t_preprocess = time.time_ns()
+        preprocessor.load(io.BytesIO(img_bytes))
+        t_inference = time.time_ns()
+        print("Preprocessing (ns): %i\n" % (t_inference - t_preprocess), end="")
 
-    interpreter.set_tensor(input_details[0]["index"], input_data)
+        interpreter.set_tensor(input_details[0]["index"], preprocessor.batch())
 
-    interpreter.invoke()
+        interpreter.invoke()
 
-    output_details = interpreter.get_output_details()
-    output_data = interpreter.get_tensor(output_details[0]["index"])
-    results = np.squeeze(output_data)
+        output_details = interpreter.get_output_details()
+        output_data = interpreter.get_tensor(output_details[0]["index"])
+        results = np.squeeze(output_data)
+        print("Inference (ns): %i\n" % (time.time_ns() - t_inference), end="")
+    finally:
+        POOL.put((interpreter, preprocessor))
 
     top_k = results.argsort()[-5:][::-1]
     for i in top_k:
         if floating_model:
-            print("\t{:08.6f} - {}\n".format(float(results[i]), labels[i]), end="")
+            print("\t{:08.6f} - {}\n".format(float(results[i]), LABELS[i]), end="")
         else:
             print(
-                "\t{:08.6f} - {}\n".format(float(results[i] / 255.0), labels[i]),
+                "\t{:08.6f} - {}\n".format(float(results[i] / 255.0), LABELS[i]),
                 end="",
             )
 
-    sec_frame = time.time_ns() - t_now
+    # Processing without loading the model, so cold and warm invocations are comparable
+    sec_frame = time.time_ns() - t_now - t_load
     print("Processing (ns): %i\n" % (sec_frame), end="")
 
-    return {"time": t_old}
+    # Timing header: send time of the endpoint, and receive and reply time of this worker
+    reply = {"time": t_old, "received": t_now, "replied": time.time_ns(), "cold": t_load}
+    if request_id is not None:
+        reply["id"] = int(request_id)
+
+    return reply
@@ -1,29 +1,46 @@
 """\
 Copyright (c) Alex Ellis 2017. All rights reserved.
 Licensed under the MIT license. See LICENSE file in the project root for full license information.
+
+Serve the function over HTTP for the of-watchdog (mode=http), instead of starting a new process
+per request like the classic watchdog does. The process and everything the function keeps at
+module scope stays alive between invocations.
 """
 
-import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from function import handler
 
+# Address the of-watchdog forwards requests to, see upstream_url in the Dockerfile
+PORT = 5000
+
+
+class FunctionHandler(BaseHTTPRequestHandler):
+    """Forward every request body and its headers to the serverless function"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Call the function with the raw request body, and reply with its return value"""
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        ret = handler.handle(body, headers)
 
-def get_stdin():
-    """Get input from the trigger and forward the request body to the serverless function
+        # The publisher reads the return value from the last line of the response
+        reply = ("" if ret is None else str(ret) + "\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
 
-    Returns:
-        str: Input from trigger as string
-    """
-    buf = ""
-    while True:
-        line = sys.stdin.readline()
-        buf += line
-        if line == "":
-            break
-    return buf
+    def log_message(self, *_args):
+        """Don't log every request, the function prints its own output"""
 
 
 if __name__ == "__main__":
-    st = get_stdin()
-    ret = handler.handle(st)
-    if ret is not None:
-        print(ret)
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), FunctionHandler)
+    server.daemon_threads = True
+    server.serve_forever()
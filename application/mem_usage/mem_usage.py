@@ -1,9 +1,17 @@
-"""Manage the stress application"""
+"""Manage the mem_usage application: find the maximum pod density per worker and the memory
+usage per pod at each density"""
 
 import logging
+import sys
 import time
 
-from resource_manager.kubernetes import kubernetes
+import pandas as pd
+
+from infrastructure import clock
+from resource_manager.kubernetes import kube_api, kubernetes
+from resource_manager.kubernetes.pod_tracker import PodTracker
+
+from . import plot
 
 from ..empty.empty import set_container_location as empty_set_container_location
 from ..empty.empty import cache_worker as empty_cache_worker
@@ -27,7 +35,14 @@ def add_options(_config):
     Returns:
         list(list()): Options to add
     """
-    return []
+    settings = [
+        ["density_start", int, lambda x: x >= 1, False, 8],
+        ["density_max", int, lambda x: x >= 1, False, 256],
+        ["density_precision", int, lambda x: x >= 1, False, 4],
+        ["density_settle", int, lambda x: x >= 1, False, 30],
+        ["density_timeout", int, lambda x: x >= 1, False, 600],
+    ]
+    return settings
 
 
 def verify_options(parser, config):
@@ -39,10 +54,12 @@ def verify_options(parser, config):
     """
     if config["benchmark"]["application"] != "mem_usage":
         parser.error("ERROR: Application should be mem_usage")
-    elif config["benchmark"]["resource_manager"] != "kubecontrol":
-        parser.error("ERROR: Application mem_usage requires resource_manager kubecontrol")
-    # elif int(config["benchmark"]["sleep_time"]) < 6000 :
-    #     parser.error("ERROR: Application mem_usage requires that pods don't sleep (>6000)")
+    elif config["benchmark"]["resource_manager"] not in ["kubecontrol", "kube_kata"]:
+        parser.error("ERROR: Application mem_usage requires resource_manager kubecontrol/kube_kata")
+    elif config["benchmark"]["kube_deployment"] != "pod":
+        parser.error("ERROR: Application mem_usage requires kube_deployment = pod")
+    elif config["benchmark"]["density_start"] > config["benchmark"]["density_max"]:
+        parser.error("ERROR: density_start should be <= density_max")
 
 
 def cache_worker(_config, _machines):
@@ -74,71 +91,237 @@ def start_worker(_config, _machines):
     return app_vars
 
 
-def get_mem_usage(config, machines, _start_worker_kube):
-    """Get memory usage
+def get_controller_time(config, machines):
+    """Get the current time on the cloud controller, the clock pod transitions are measured on
 
     Args:
-        config (_type_): _description_
-        machines (_type_): _description_
-        _start_worker_kube (_type_): _description_
-    """
-
-    def deploy_memory_deployment(config, machines, replicas: int):
-        app_vars = start_worker(config, machines)
-
-        kubernetes.start_worker_kube(config, machines, app_vars, get_starttime=True)
-
-        command = "kubectl get pods | grep -c Running"
-
-        running_pods = 0
-        while running_pods != replicas:
-            output, _ = machines[0].process(
-                config, command, shell=True, ssh=config["cloud_ssh"][0]
-            )[0]
-
-            # if error:
-            #     logging.error("error while checking for runing pods")
-            #     sys.exit(1)
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
 
-            running_pods = int(output[0])
-            time.sleep(5)
+    Returns:
+        float: Time in seconds
+    """
+    output, error = machines[0].process(
+        config, "date +%s.%N", shell=True, ssh=config["cloud_ssh"][0]
+    )[0]
 
-    def undeploy_memory_deployment(config, machines):
-        logging.info("deleting k8s memory deployment")
+    if error or not output:
+        logging.error("Could not get the time of the cloud controller: %s", "".join(error))
+        sys.exit()
 
-        command = "kubectl delete job.batch --all"
+    return float(output[0])
 
-        output, _ = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])[0]
 
-        # if error:
-        #     logging.error("deleting k8s memory test deployment failed")
-        #     sys.exit(1)
+def get_pods_per_node(config, machines):
+    """Count the running pods on every worker VM
 
-        logging.info("output: %s", output)
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
 
-    def get_free_memory(config, machines) -> int:
-        command = "free -m | awk 'NR==2{print $4}'"
-        output, error = machines[0].process(
-            config, command, shell=True, ssh=config["cloud_ssh"][1]
-        )[0]
+    Returns:
+        dict(int): Number of running pods per VM name
+    """
+    client = kube_api.get_client(config, machines)
+    counts = {ssh.split("@")[0]: 0 for ssh in config["cloud_ssh"][1:]}
+    for pod in client.pods():
+        if pod["status"].get("phase") == "Running":
+            vm = kubernetes.get_node_vm(config, pod["spec"].get("nodeName"))
+            counts[vm] = counts.get(vm, 0) + 1
 
-        if error:
-            logging.error("could not get free memory of worker node")
-            return -1
+    return counts
 
-        return int(output[0])
 
-    replicas = config["benchmark"]["applications_per_worker"]
+def run_density(config, machines, tracker, density):
+    """Deploy a number of pods per worker, and check if they all keep running
 
-    mem_before = get_free_memory(config, machines)
-    logging.info("Worker free memory before deployment: %i MB", mem_before)
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+        tracker (PodTracker): Tracker following the pods of the benchmark
+        density (int): Number of pods per worker
 
-    deploy_memory_deployment(config, machines, replicas)
+    Returns:
+        dict: Density, stability, the window (controller clock) in which all pods were running,
+              and the number of running pods per VM name in that window
+    """
+    replicas = density * kubernetes.get_cloud_workers(config)
+    logging.info("Deploy %i pods per worker (%i in total)", density, replicas)
+
+    app_vars = start_worker(config, machines)
+    app_vars["replicas"] = replicas
+    kubernetes.start_worker_kube(config, machines, app_vars, get_starttime=True)
+
+    # Stable: all pods start, and keep running for density_settle seconds
+    step = {"density": density, "stable": False, "start": None, "end": None, "nodes": {}}
+    ready = tracker.wait(
+        lambda counts: counts["Running"] == replicas,
+        "%i pods are running" % (replicas),
+        timeout=config["benchmark"]["density_timeout"],
+    )
+    if ready is not None:
+        step["start"] = get_controller_time(config, machines)
+        dropped = tracker.wait(
+            lambda counts: counts["Running"] < replicas,
+            "a pod stops running",
+            timeout=config["benchmark"]["density_settle"],
+        )
+        step["end"] = get_controller_time(config, machines)
+        step["nodes"] = get_pods_per_node(config, machines)
+        step["stable"] = dropped is None and tracker.get_failure() is None
+
+    logging.info("%i pods per worker: %s", density, "stable" if step["stable"] else "NOT stable")
+
+    # Remove all pods, and wait until they are gone so the next step starts from a clean node
+    # Pods of an unstable step may fail, or fail while they are deleted: that is not an error
+    client = kube_api.get_client(config, machines)
+    client.delete("/apis/batch/v1/namespaces/default/jobs")
+    deadline = time.monotonic() + config["benchmark"]["density_timeout"]
+    tracker.clear_failure()
+
+    # Not all pods are in the status counts, like those stuck in ErrImagePull: check all pods
+    while True:
+        deleted = tracker.wait(
+            lambda _: len(tracker.pods) == 0,
+            "all pods are deleted",
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+        tracker.clear_failure()
+        if deleted is not None:
+            break
+
+        if time.monotonic() >= deadline:
+            logging.error("Pods of density %i were not deleted in time", density)
+            sys.exit()
+
+    return step
+
+
+def density_sweep(config, machines):
+    """Find the maximum number of pods per worker that keep running at the same time.
+    Double the density until deployment fails or density_max is reached, then binary search
+    between the last stable and the first unstable density. The resource metrics collectors sample
+    all nodes during the sweep.
 
-    mem_after = get_free_memory(config, machines)
-    logging.info("Worker free memory after deployment -> %i MB", mem_after)
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
 
-    mem_per_cont = (mem_before - mem_after) / replicas
-    logging.info("mem usage per container -> %i MB", mem_per_cont)
+    Returns:
+        list(dict): Every step of the sweep, starting with an idle step without pods
+        float: Start of the sweep on the cloud controller
+        float: End of the sweep on the cloud controller
+    """
+    tracker = PodTracker(config, machines)
+    tracker.start()
+
+    # Idle usage of the nodes, to compute the usage of the pods
+    starttime = get_controller_time(config, machines)
+    time.sleep(config["benchmark"]["density_settle"])
+    steps = [
+        {
+            "density": 0,
+            "stable": True,
+            "start": starttime,
+            "end": get_controller_time(config, machines),
+            "nodes": {ssh.split("@")[0]: 0 for ssh in config["cloud_ssh"][1:]},
+        }
+    ]
+
+    # Exponential search for the first unstable density
+    stable = 0
+    unstable = None
+    density = config["benchmark"]["density_start"]
+    density_max = config["benchmark"]["density_max"]
+    while True:
+        steps.append(run_density(config, machines, tracker, density))
+        if not steps[-1]["stable"]:
+            unstable = density
+            break
+
+        stable = density
+        if density == density_max:
+            break
+
+        # The last step is density_max itself, even if that is not a power of two times the start
+        density = min(density * 2, density_max)
+
+    if unstable is None:
+        logging.info("All densities up to density_max=%i are stable", density_max)
+    else:
+        # Binary search until we are within density_precision pods of the limit
+        while unstable - stable > config["benchmark"]["density_precision"]:
+            density = (stable + unstable) // 2
+            steps.append(run_density(config, machines, tracker, density))
+            if steps[-1]["stable"]:
+                stable = density
+            else:
+                unstable = density
+
+    tracker.stop()
+    endtime = get_controller_time(config, machines)
+    return steps, starttime, endtime
+
+
+def format_density(config, steps, starttime, resource_output):
+    """Compute the memory and CPU usage per pod for every density, and print and save them
 
-    undeploy_memory_deployment(config, machines)
+    Args:
+        config (dict): Parsed configuration
+        steps (list(dict)): Every step of the sweep, see density_sweep()
+        starttime (float): Start of the sweep on the cloud controller
+        resource_output (DataFrame): Resource metrics on one time grid, relative to starttime
+    """
+    model = config.get("clock")
+    controller = config["cloud_ssh"][0].split("@")[0]
+    start = clock.to_host(model, controller, starttime)
+    runtime = config["benchmark"].get("runtime", "runc")
+
+    rows = []
+    for step in steps:
+        if step["start"] is None:
+            rows.append({"runtime": runtime, "pods per worker": step["density"], "stable": False})
+            continue
+
+        window = resource_output[
+            resource_output["Time (s)"].between(
+                clock.to_host(model, controller, step["start"]) - start,
+                clock.to_host(model, controller, step["end"]) - start,
+            )
+        ]
+        for vm_name, pods in step["nodes"].items():
+            label = kubernetes.get_node_label(vm_name)
+            rows.append(
+                {
+                    "runtime": runtime,
+                    "pods per worker": step["density"],
+                    "stable": step["stable"],
+                    "node": label,
+                    "pods": pods,
+                    "cpu (millicores)": window[label + "_cpu"].mean(),
+                    "memory (MiB)": window[label + "_memory"].mean(),
+                }
+            )
+
+    df = pd.DataFrame(rows)
+
+    # Usage of the pods on each node, on top of the idle usage of that node
+    idle = df[df["pods per worker"] == 0].set_index("node")
+    for metric in ["cpu (millicores)", "memory (MiB)"]:
+        pods = df[metric] - df["node"].map(idle[metric])
+        df[metric.replace(" (", " per pod (")] = pods / df["pods"].where(df["pods"] > 0)
+
+    df = df.sort_values(["pods per worker", "node"], ignore_index=True)
+
+    logging.info("------------------------------------")
+    logging.info("%s DENSITY OUTPUT", config["mode"].upper())
+    logging.info("------------------------------------")
+    logging.info("\n%s", df.to_string(index=False))
+
+    stable = df.loc[df["stable"], "pods per worker"]
+    logging.info(
+        "Maximum stable density with runtime %s: %i pods per worker", runtime, stable.max()
+    )
+
+    df.to_csv("./logs/%s_density.csv" % (config["timestamp"]), index=False, encoding="utf-8")
+    plot.plot_density(df, config["timestamp"])
@@ -0,0 +1,39 @@
+"""Create plots for the mem_usage application"""
+
+import matplotlib.pyplot as plt
+
+
+def plot_density(df, timestamp):
+    """Plot the memory usage per pod, and the total memory usage of each worker, per density
+
+    Args:
+        df (DataFrame): Resource usage per density and node, see format_density()
+        timestamp (time): Global timestamp used to save all files of this run
+    """
+    plt.rcParams.update({"font.size": 20})
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+
+    df = df.dropna(subset=["node"]).sort_values("pods per worker")
+    for node, df_node in df.groupby("node"):
+        stable = df_node[df_node["stable"]]
+        ax1.plot(stable["pods"], stable["memory per pod (MiB)"], marker="o", label=node)
+        ax2.plot(stable["pods"], stable["memory (MiB)"], marker="o", label=node)
+
+        # Mark the densities at which the node was not stable
+        unstable = df_node[~df_node["stable"].astype(bool)]
+        ax2.scatter(unstable["pods"], unstable["memory (MiB)"], marker="x", color="#fa4d56")
+
+    ax1.set_ylabel("Memory per pod (MiB)")
+    ax1.set_ylim(bottom=0)
+    ax1.grid(True)
+    ax1.legend(loc="upper right", fontsize="12")
+
+    ax2.set_xlabel("Pods on the node")
+    ax2.set_ylabel("Memory (MiB)")
+    ax2.set_xlim(left=0)
+    ax2.set_ylim(bottom=0)
+    ax2.grid(True)
+
+    # Save plot
+    plt.savefig("./logs/%s_density.pdf" % (timestamp), bbox_inches="tight")
+    plt.close(fig)
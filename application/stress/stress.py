@@ -94,7 +94,7 @@ def format_output(
         control (list(str), optional): Parsed output from control plane components
         starttime (datetime, optional): Invocation time of kubectl apply command
         worker_output (list(list(str)), optional): Output of each container ran on the edge
-        worker_description (list(list(str)), optional): Extensive description of each container
+        worker_description (list(dict), optional): Index of all pods and containers
         endtime (str, optional): Timestamp of the slowest deployed pod
     """
     # Plot the status of each pod over time
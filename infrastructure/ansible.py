@@ -400,6 +400,11 @@ def copy(config, machines):
             path = os.path.join(config["base"], "resource_manager", rm, "cloud")
             out.append(machines[0].copy_files(config, path, dest, recursive=True))
 
+            # Resource metric collectors are shared between the Kubernetes-based managers
+            if rm in ["kubecontrol", "kube_kata"]:
+                path = os.path.join(config["base"], "resource_manager/kubernetes/metrics/*")
+                out.append(machines[0].copy_files(config, path, dest + "cloud/"))
+
             if config["mode"] == "edge":
                 path = os.path.join(config["base"], "resource_manager", rm, "edge")
                 out.append(machines[0].copy_files(config, path, dest, recursive=True))
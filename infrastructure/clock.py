@@ -0,0 +1,176 @@
+"""\
+Measure clock offsets between the host and the VMs, and correct timestamps taken on VMs.
+Uses an NTP-style exchange: the host asks a VM for its time and halves the round trip.
+The sample with the smallest round trip time gives the tightest bound on the offset.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+
+# Number of time requests per VM per measurement
+SAMPLES = 50
+
+# Reply with the current time for every line on stdin, runs on the VM
+ECHO_COMMAND = 'python3 -uc "import sys,time;[print(time.time_ns(),flush=True) for _ in sys.stdin]"'
+
+
+def measure_node(config, ssh, samples, results):
+    """Measure the clock offset of one VM relative to the host.
+    All samples use the same SSH connection, so only the network round trip is measured.
+
+    Args:
+        config (dict): Parsed configuration
+        ssh (str): VM to measure, as user@ip
+        samples (int): Number of time requests to send
+        results (dict): Dict to store the measurement in, under the VM name
+    """
+    command = ["ssh", ssh, "-i", config["ssh_key"], ECHO_COMMAND]
+
+    # pylint: disable-next=consider-using-with
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    )
+
+    best = None
+    try:
+        # The first request includes starting the remote process, so we skip it
+        for i in range(samples + 1):
+            t_send = time.time_ns()
+            process.stdin.write("\n")
+            process.stdin.flush()
+            t_remote = int(process.stdout.readline())
+            t_recv = time.time_ns()
+
+            rtt = t_recv - t_send
+            if i > 0 and (best is None or rtt < best[1]):
+                best = ((t_send + t_recv) // 2, rtt, t_remote - (t_send + t_recv) // 2)
+    except (ValueError, OSError) as e:
+        logging.debug("[WARNING][%s] Could not measure clock offset of %s", str(e), ssh)
+    finally:
+        process.stdin.close()
+        process.terminate()
+        process.wait()
+
+    if best is not None:
+        results[ssh.split("@")[0]] = {
+            "time": best[0] / 10**9,
+            "offset": best[2] / 10**9,
+            "uncertainty": best[1] / 2 / 10**9,
+        }
+
+
+def measure_offsets(config, ssh_nodes, samples=SAMPLES):
+    """Measure the clock offsets of many VMs at the same time
+
+    Args:
+        config (dict): Parsed configuration
+        ssh_nodes (list(str)): VMs to measure, as user@ip
+        samples (int, optional): Number of time requests per VM. Defaults to SAMPLES.
+
+    Returns:
+        dict(dict): Per VM name: the host time of the measurement, and the VM clock offset
+                    (VM time - host time) with its uncertainty, all in seconds
+    """
+    logging.info("Measure clock offsets of %i VMs", len(ssh_nodes))
+
+    results = {}
+    threads = [
+        threading.Thread(target=measure_node, args=(config, ssh, samples, results))
+        for ssh in ssh_nodes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    missing = [ssh for ssh in ssh_nodes if ssh.split("@")[0] not in results]
+    if missing:
+        logging.error("Could not measure clock offset of VMs: %s", ", ".join(missing))
+        sys.exit()
+
+    return results
+
+
+def create_model(before, after):
+    """Create a clock model per VM from measurements before and after the benchmark.
+    The clock of each VM is assumed to drift linearly between the two measurements.
+
+    Args:
+        before (dict(dict)): Output of measure_offsets() before the benchmark
+        after (dict(dict)): Output of measure_offsets() after the benchmark
+
+    Returns:
+        dict(dict): Per VM name: offset (s) at a reference host time (s), drift (s/s),
+                    and the uncertainty (s) of the offset
+    """
+    model = {}
+    for node, b in before.items():
+        a = after[node]
+
+        drift = 0.0
+        if a["time"] != b["time"]:
+            drift = (a["offset"] - b["offset"]) / (a["time"] - b["time"])
+
+        model[node] = {
+            "time": b["time"],
+            "offset": b["offset"],
+            "drift": drift,
+            "uncertainty": max(b["uncertainty"], a["uncertainty"]),
+        }
+
+    return model
+
+
+def to_host(model, node, t):
+    """Convert a timestamp taken on a VM to the clock of the host
+
+    Args:
+        model (dict(dict)): Clock model, see create_model()
+        node (str): Name of the VM the timestamp was taken on
+        t (float): Timestamp in seconds, according to the VM clock
+
+    Returns:
+        float: Timestamp in seconds, according to the host clock
+    """
+    if model is None or node not in model:
+        return t
+
+    m = model[node]
+    return t - (m["offset"] + m["drift"] * (t - m["time"]))
+
+
+def print_model(config, model):
+    """Print the clock model of all VMs, and save it as csv next to the other results
+
+    Args:
+        config (dict): Parsed configuration
+        model (dict(dict)): Clock model, see create_model()
+    """
+    df = pd.DataFrame(
+        [
+            {
+                "node": node,
+                "offset (ms)": m["offset"] * 1000.0,
+                "drift (ppm)": m["drift"] * 10**6,
+                "uncertainty (ms)": m["uncertainty"] * 1000.0,
+            }
+            for node, m in model.items()
+        ]
+    )
+
+    logging.info("Clock offsets of VMs compared to the host:\n%s", df.to_string(index=False))
+    df.to_csv(
+        os.path.join("./logs", "%s_clock_offsets.csv" % (config["timestamp"])),
+        index=False,
+        encoding="utf-8",
+    )
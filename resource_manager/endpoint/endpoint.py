@@ -90,6 +90,11 @@ def start_endpoint_default(config, machines):
                 "DURATION=%i" % (config["benchmark"]["duration"]),
             ]
 
+            # Print metrics per data element, or only a summary at the end
+            if "metrics" in config["benchmark"]:
+                env.append("METRICS=%s" % (config["benchmark"]["metrics"]))
+                env.append("METRICS_INTERVAL=%i" % (config["benchmark"]["metrics_interval"]))
+
             if config["mode"] == "cloud" or config["mode"] == "edge":
                 cont_name = "%s%i_" % (config["mode"], worker_i) + cont_name
                 env.append("MQTT_LOCAL_IP=%s" % (endpoint_ssh.split("@")[1]))
@@ -98,6 +103,12 @@ def start_endpoint_default(config, machines):
 
                 if config["control_ips"]:
                     env.append("CLOUD_CONTROLLER_IP=%s" % (config["control_ips"][0]))
+
+                # Arrival process and request format of the open-loop serverless publisher
+                if "arrival" in config["benchmark"]:
+                    env.append("ARRIVAL=%s" % (config["benchmark"]["arrival"]))
+                    env.append("BURST_SIZE=%i" % (config["benchmark"]["burst_size"]))
+                    env.append("PAYLOAD=%s" % (config["benchmark"]["payload"]))
             else:
                 env.append("CPU_THREADS=%i" % (config["infrastructure"]["endpoint_cores"]))
 
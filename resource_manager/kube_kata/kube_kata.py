@@ -5,15 +5,21 @@ This resource manager doesn't have any/many help functions, see the /kubernetes
 
 import logging
 import os
-import json
+import sys
+import threading
 
 from datetime import datetime
-from typing import Dict, List
 
 import requests
 
-from infrastructure import ansible
-from resource_manager.kubernetes import kubernetes
+from infrastructure import ansible, clock
+from resource_manager.kubernetes import kube_api, kubernetes
+
+# Number of traces to get from Jaeger per request
+TRACE_PAGE = 1000
+
+# Margin around the benchmark to get traces in, for clock differences between VMs (s)
+TRACE_MARGIN = 60
 
 
 def add_options(_config):
@@ -212,11 +218,8 @@ def get_deployment_duration(config, machines):
         _type_: _description_
     """
     try:
-        command = "kubectl get job stress -o json"
-        results = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])
-        results = "".join(results[0][0])
-
-        results_json = json.loads(results)
+        client = kube_api.get_client(config, machines)
+        results_json = client.get("/apis/batch/v1/namespaces/default/jobs/stress")
 
         end, st = results_json["status"]["completionTime"], results_json["status"]["startTime"]
         duration = datetime.strptime(end, "%Y-%m-%dT%H:%M:%SZ") - datetime.strptime(
@@ -229,35 +232,86 @@ def get_deployment_duration(config, machines):
         return -1
 
 
-def _gather_kata_traces(ip: str, port: str = "16686") -> List[List[Dict]]:
-    """(internal) curl request to jaeger server on `ip` to
-    get the traces produced by the kata runtime.
+def _gather_kata_traces(ip, start, end, traces, port="16686"):
+    """(internal) Get all traces produced by the kata runtime from the Jaeger server on `ip`.
+    Jaeger returns the newest traces first and has no offset parameter, so we page backwards
+    through the time window: every next page ends where the oldest trace of the last page started.
 
     Args:
         ip (str): Jaeger endpoint ip
+        start (int): Start of the time window (us)
+        end (int): End of the time window (us)
+        traces (dict): Dict to store the list of traces of this node in, by ip
         port (str, optional): Jaeger endpoint port. Defaults to "16686".
+    """
+    url = f"http://{ip}:{port}/api/traces"
+    found = {}
+    with requests.Session() as session:
+        while True:
+            params = {
+                "service": "kata",
+                "operation": "rootSpan",
+                "start": start,
+                "end": end,
+                "limit": TRACE_PAGE,
+            }
+            try:
+                response = session.get(url, params=params, timeout=600)
+                response.raise_for_status()
+                page = response.json()["data"] or []
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logging.error("ERROR: Could not get kata traces from %s: %s", ip, e)
+                return
+
+            # Traces on the page boundary may be returned twice
+            new = [trace for trace in page if trace["traceID"] not in found]
+            for trace in new:
+                found[trace["traceID"]] = trace
+
+            if len(page) < TRACE_PAGE or not new:
+                break
+
+            end = min(span["startTime"] for trace in page for span in trace["spans"])
+
+    logging.debug("Got %i kata traces from %s", len(found), ip)
+    traces[ip] = list(found.values())
+
+
+def gather_kata_traces(config, start, end):
+    """Get the kata traces of all cloud workers in parallel
+
+    Args:
+        config (dict): Parsed configuration
+        start (float): Start of the benchmark, on the cloud controller (s)
+        end (float): End of the benchmark, on the cloud controller (s)
 
     Returns:
-        List[List[Dict]]: a sorted list of traces for each kata deployment on `ip`.
+        dict(list(dict)): Per worker VM name, all traces in the time window of the benchmark
     """
-    jaeger_api_url = f"http://{ip}:{port}/api/traces?service=kata&operation=rootSpan&limit=10000"
-    response = requests.get(jaeger_api_url, timeout=600)
-    response_data = response.json()
+    workers = {ssh.split("@")[1]: ssh.split("@")[0] for ssh in config["cloud_ssh"][1:]}
+    window = (int((start - TRACE_MARGIN) * 10**6), int((end + TRACE_MARGIN) * 10**6))
 
-    traces = response_data["data"]
+    traces = {}
+    threads = [
+        threading.Thread(target=_gather_kata_traces, args=(ip, *window, traces)) for ip in workers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
-    # Sort each trace's spans based on starTime and sort traces based on startTime
-    traces = sorted(
-        [sorted(trace["spans"], key=lambda x: x["startTime"]) for trace in traces],
-        key=lambda x: x[0]["startTime"],
-    )
+    missing = [name for ip, name in workers.items() if ip not in traces]
+    if missing:
+        logging.error("ERROR: Could not get kata traces of VMs: %s", ", ".join(missing))
+        sys.exit()
 
-    print(f"gather_kata_traces({ip}, {port}) -> got {len(traces)} traces")
-    return traces
+    return {workers[ip]: node_traces for ip, node_traces in traces.items()}
 
 
-def get_kata_period_timestamps(traces: List[List[Dict]]) -> List[List[int]]:
-    """TODO
+def index_spans(trace):
+    """Index the spans of one kata trace in a single pass, and get the kata deployment phases.
+    A trace covers one sandbox, and starts two containers: the pause container and the
+    application.
 
     T0 -> T1 : create kata runtime
     T1 -> T2 : create VM
@@ -265,68 +319,99 @@ def get_kata_period_timestamps(traces: List[List[Dict]]) -> List[List[int]]:
     T3 -> T4 : create container and launch
 
     Args:
-        traces (List[List[Dict]]): _description_
+        trace (dict): Trace as returned by Jaeger
 
     Returns:
-        List[List[int]]: _description_
+        str: Sandbox ID, None if not found
+        set(str): IDs of the containers in the sandbox
+        list(int): T0 to T4 (us), None if the trace is incomplete
     """
+    sandbox = None
+    containers = set()
+    first = None
+    operations = {"StartVM": [], "connect": [], "ttrpc.StartContainer": []}
+
+    for span in trace["spans"]:
+        if first is None or span["startTime"] < first:
+            first = span["startTime"]
+
+        if span["operationName"] in operations:
+            operations[span["operationName"]].append(span)
 
-    timestamps: List[List[int]] = []
-
-    for trace in traces:
-        ts: List[int] = []
-        skip_first = True
-        for span in trace:
-            assert len([span for span in trace if span["operationName"] == "StartVM"]) == 2
-            assert len([span for span in trace if span["operationName"] == "connect"]) == 1
-            # T0
-            if len(ts) == 0:
-                ts.append(span["startTime"])
-            # T1, T2
-            elif len(ts) == 1 and span["operationName"] == "StartVM":
-                ts.append(span["startTime"])  # T1
-                ts.append(span["startTime"] + span["duration"])  # T2
-            # T3
-            elif len(ts) == 3 and span["operationName"] == "connect":
-                ts.append(span["startTime"] + span["duration"])  # T3
-            # T4
-            elif len(ts) == 4 and span["operationName"] == "ttrpc.StartContainer":
-                if skip_first is False:
-                    ts.append(span["startTime"] + span["duration"])  # T4
-                    break
-
-                skip_first = False
-
-        assert len(ts) == 5
-        timestamps.append(ts)
-
-    return timestamps
+        for tag in span.get("tags", []):
+            if tag["key"] == "sandbox_id" and tag["value"]:
+                sandbox = tag["value"]
+            elif tag["key"] == "container_id" and tag["value"]:
+                containers.add(tag["value"])
+
+    if (
+        len(operations["StartVM"]) != 2
+        or len(operations["connect"]) != 1
+        or len(operations["ttrpc.StartContainer"]) < 2
+    ):
+        return sandbox, containers, None
+
+    start_vm = min(operations["StartVM"], key=lambda x: x["startTime"])
+    connect = operations["connect"][0]
+    start_container = sorted(operations["ttrpc.StartContainer"], key=lambda x: x["startTime"])[1]
+
+    ts = [
+        first,
+        start_vm["startTime"],
+        start_vm["startTime"] + start_vm["duration"],
+        connect["startTime"] + connect["duration"],
+        start_container["startTime"] + start_container["duration"],
+    ]
+    return sandbox, containers, ts
 
 
 # Kata entry point.
-def get_kata_timestamps(config, _worker_output) -> List[List[int]]:
-    """_summary_
+def get_kata_timestamps(config, worker_description, starttime, endtime):
+    """Get the kata deployment phases of every pod, by matching kata traces to pods on their
+    container IDs
 
     Args:
-        config (_type_): _description_
-        _worker_output (_type_): _description_
+        config (dict): Parsed configuration
+        worker_description (list(dict)): Index of all pods and containers
+        starttime (float): Start of the benchmark, on the cloud controller (s)
+        endtime (float): End of the benchmark, on the cloud controller (s)
 
     Returns:
-        List[List[int]]: _description_
+        dict(list(float)): Per pod, the time of T0 to T4 on the clock of the host (s)
     """
-    logging.info(
-        "----------------------------------------------------------------------------------------"
-    )
-    logging.info("get_kata_timestamps")
-    logging.info(
-        "----------------------------------------------------------------------------------------"
-    )
-
-    _nodes_names, nodes_ips = map(list, zip(*[str.split(x, "@") for x in config["cloud_ssh"][1:]]))
-
-    traces = [_gather_kata_traces(ip)[1:] for ip in nodes_ips]
-    # Flatten list of lists
-    traces = [a for b in traces for a in b]
+    logging.info("Gather kata traces from cloud workers")
+    traces = gather_kata_traces(config, starttime, endtime)
+
+    pods = {
+        container["id"]: pod["name"]
+        for pod in worker_description
+        for container in pod["containers"]
+        if container["id"]
+    }
+
+    model = config.get("clock")
+    kata_ts = {}
+    incomplete = 0
+    for node, node_traces in traces.items():
+        for trace in node_traces:
+            sandbox, containers, ts = index_spans(trace)
+            pod = next((pods[c] for c in containers if c in pods), None)
+            if pod is None:
+                # Traces of other pods, like the ones used to cache the worker
+                continue
+
+            if ts is None:
+                logging.debug("Kata trace of pod %s (sandbox %s) is incomplete", pod, sandbox)
+                incomplete += 1
+                continue
+
+            kata_ts[pod] = [clock.to_host(model, node, t / 10**6) for t in ts]
+
+    if incomplete:
+        logging.info("[WARNING]: %i kata traces are incomplete, skip them", incomplete)
+
+    missing = [pod["name"] for pod in worker_description if pod["name"] not in kata_ts]
+    if missing:
+        logging.info("[WARNING]: No kata trace found for %i pods", len(missing))
 
-    kata_ts = get_kata_period_timestamps(traces)
     return kata_ts
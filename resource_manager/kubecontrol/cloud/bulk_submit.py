@@ -0,0 +1,356 @@
+"""\
+Submit many Kubernetes jobs to the apiserver concurrently, at a controlled rate.
+Runs on the cloud controller and only uses the standard library.
+
+Jobs arrive open-loop: batch k is released at start + k * batch / rate, no matter how fast earlier
+batches were submitted. The rate can be ramped up in steps to find where the control plane
+saturates: every step seconds, ramp jobs/s are added to the rate. Workers take batches from a
+shared queue and POST the jobs in it over their own keep-alive connection, limited by a
+client-side token bucket (qps, burst).
+
+Output on stdout, so the framework can build the same timeline as for kubectl:
+- First line: start time of the submission (ns)
+- Then per job, like kubectl's custom prints: <time (ns)> <code> job=<name>
+    0400: Job arrived (batch released), the start of its submission
+    0401: Job is sent to the apiserver
+    0402: Apiserver replied
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import logging
+import math
+import os
+import queue
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from urllib.parse import urlparse
+
+# Path to create jobs in
+JOBS_PATH = "/apis/batch/v1/namespaces/default/jobs"
+
+# Retry a job this often when the apiserver throttles us (429) or the connection breaks
+RETRIES = 10
+
+
+def enable_logging(verbose):
+    """Enable logging -> only used for debugging this script"""
+    # Set parameters
+    new_level = logging.INFO
+    if verbose:
+        new_level = logging.DEBUG
+
+    new_format = "[%(asctime)s %(filename)20s:%(lineno)4s - %(funcName)25s() ] %(message)s"
+    logging.basicConfig(format=new_format, level=new_level, datefmt="%Y-%m-%d %H:%M:%S")
+    logging.debug("Logging has been enabled")
+
+
+class RateLimiter:
+    """Token bucket shared by all workers, like the QPS/burst limiter of client-go"""
+
+    def __init__(self, qps, burst):
+        """Initialize the object
+
+        Args:
+            qps (float): Tokens added per second, 0 for no limit
+            burst (int): Maximum number of tokens
+        """
+        self.qps = qps
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Take one token, wait until one is available if needed"""
+        if self.qps <= 0:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.qps)
+            self.last = now
+
+            # Reserve the token now, so waiting workers are served in order
+            self.tokens -= 1
+            delay = -self.tokens / self.qps if self.tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_credentials():
+    """Get the apiserver address and credentials from the kubeconfig of this user
+
+    Returns:
+        str: Host of the apiserver
+        int: Port of the apiserver
+        SSLContext: Context with the cluster CA and client certificate loaded
+    """
+    output = subprocess.run(
+        ["kubectl", "config", "view", "--raw", "-o", "json"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    kubeconfig = json.loads(output)
+
+    cluster = kubeconfig["clusters"][0]["cluster"]
+    user = kubeconfig["users"][0]["user"]
+    url = urlparse(cluster["server"])
+
+    context = ssl.create_default_context(
+        cadata=base64.b64decode(cluster["certificate-authority-data"]).decode("utf-8")
+    )
+
+    # The ssl module only loads client certificates from files, mkstemp creates them with 0600
+    paths = []
+    try:
+        for key in ["client-certificate-data", "client-key-data"]:
+            fd, path = tempfile.mkstemp()
+            paths.append(path)
+            with os.fdopen(fd, "wb") as f:
+                f.write(base64.b64decode(user[key]))
+
+        context.load_cert_chain(paths[0], paths[1])
+    finally:
+        for path in paths:
+            os.remove(path)
+
+    return url.hostname, url.port or 443, context
+
+
+def read_jobs(path):
+    """Read all job descriptions before starting, so disk access doesn't delay submissions
+
+    Args:
+        path (str): Directory with one job description per file, as JSON
+
+    Returns:
+        list(tuple(str, bytes)): Name and body of each job
+    """
+    jobs = []
+
+    # Submit job-2 before job-10
+    for name in sorted(os.listdir(path), key=lambda n: (len(n), n)):
+        with open(os.path.join(path, name), "rb") as f:
+            body = f.read()
+
+        jobs.append((json.loads(body)["metadata"]["name"], body))
+
+    return jobs
+
+
+def arrivals(batches, rate, step, ramp):
+    """Get the arrival time of every batch, relative to the start of the submission
+
+    Args:
+        batches (int): Number of batches
+        rate (float): Batches arriving per second in the first step, 0 for all at once
+        step (float): Duration of each step in seconds, 0 for a constant rate
+        ramp (float): Batches per second added to the rate every step
+
+    Returns:
+        list(int): Arrival time of each batch (ns)
+    """
+    if rate <= 0:
+        return [0] * batches
+
+    times = []
+    s = 0
+    j = 0
+    while len(times) < batches:
+        # Batch j of step s, move to the next step once we are past the end of this one
+        t = s * step + j / (rate + s * ramp)
+        if step > 0 and t >= (s + 1) * step - 1e-9:
+            s += 1
+            j = 0
+            continue
+
+        times.append(int(round(t * 10**9)))
+        j += 1
+
+    return times
+
+
+class Worker(threading.Thread):
+    """Submit batches of jobs from the queue over one keep-alive connection"""
+
+    def __init__(self, address, batches, limiter, results):
+        """Initialize the object
+
+        Args:
+            address (tuple(str, int, SSLContext)): Apiserver to connect to, see get_credentials()
+            batches (Queue): Queue of (arrival time, list of jobs), None stops the worker
+            limiter (RateLimiter): Rate limiter shared by all workers
+            results (list): List to append (time, code, job name) tuples to
+        """
+        super().__init__(daemon=True)
+        self.host, self.port, self.context = address
+        self.batches = batches
+        self.limiter = limiter
+        self.results = results
+        self.connection = None
+        self.errors = []
+
+    def connect(self):
+        """(Re)open the connection to the apiserver"""
+        if self.connection is not None:
+            self.connection.close()
+
+        self.connection = http.client.HTTPSConnection(self.host, self.port, context=self.context)
+
+    def submit(self, name, body):
+        """Send one job to the apiserver, retry if we get throttled or disconnected
+
+        Args:
+            name (str): Name of the job
+            body (bytes): Job description, as JSON
+        """
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+
+        # Send time of the first attempt that may have created the job before the connection broke
+        unconfirmed = None
+        for _ in range(RETRIES):
+            self.limiter.wait()
+            sent = time.time_ns()
+
+            try:
+                self.connection.request("POST", JOBS_PATH, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                logging.debug("Connection error for job %s, retry: %s", name, str(e))
+                if unconfirmed is None:
+                    unconfirmed = sent
+
+                self.connect()
+                continue
+
+            if response.status == 429:
+                delay = float(response.getheader("Retry-After", "1"))
+                logging.debug("Throttled by the apiserver for job %s, retry in %.1fs", name, delay)
+                time.sleep(delay)
+                continue
+
+            if response.status == 409 and unconfirmed is not None:
+                # An earlier attempt did create the job, only its response got lost
+                logging.debug("Job %s already exists, created by an earlier attempt", name)
+                sent = unconfirmed
+            elif response.status != 201:
+                self.errors.append("Job %s: %i %s" % (name, response.status, data.decode()))
+
+            # Only the attempt that created the job counts, so every job has exactly one send
+            self.results.append((sent, "0401", name))
+            self.results.append((time.time_ns(), "0402", name))
+            return
+
+        self.errors.append("Job %s: no success after %i attempts" % (name, RETRIES))
+
+    def run(self):
+        """Submit batches until the queue is closed"""
+        self.connect()
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                break
+
+            arrival, jobs = batch
+            for name, body in jobs:
+                self.results.append((arrival, "0400", name))
+                self.submit(name, body)
+
+        self.connection.close()
+
+
+def main(args):
+    """Main function
+
+    Args:
+        args (Namespace): Argparse object
+    """
+    address = get_credentials()
+    jobs = read_jobs(args.path)
+    logging.debug("Submit %i jobs with %i workers", len(jobs), args.concurrency)
+
+    batches = queue.Queue()
+    limiter = RateLimiter(args.qps, args.burst)
+    results = []
+    workers = [Worker(address, batches, limiter, results) for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+
+    # Release batches on a fixed schedule, so slow submissions don't lower the arrival rate
+    schedule = arrivals(
+        math.ceil(len(jobs) / args.batch),
+        args.rate / args.batch,
+        args.step,
+        args.ramp / args.batch,
+    )
+    start = time.time_ns()
+    for offset, i in zip(schedule, range(0, len(jobs), args.batch)):
+        arrival = start + offset
+        delay = (arrival - time.time_ns()) / 10**9
+        if delay > 0:
+            time.sleep(delay)
+
+        batches.put((arrival, jobs[i : i + args.batch]))
+
+    for _ in workers:
+        batches.put(None)
+
+    for worker in workers:
+        worker.join()
+
+    # Print after submitting, so writing output doesn't interfere
+    print(start)
+    for t, code, name in sorted(results):
+        print("%i %s job=%s" % (t, code, name))
+
+    errors = [error for worker in workers for error in worker.errors]
+    if errors:
+        for error in errors:
+            logging.error(error)
+
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Get input arguments and parse them
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="Directory with job descriptions, as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="increase verbosity level")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=16, help="Number of concurrent connections"
+    )
+    parser.add_argument(
+        "--qps", type=float, default=0, help="Client-side requests per second, 0 for no limit"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=10, help="Requests allowed above qps in a burst"
+    )
+    parser.add_argument("-b", "--batch", type=int, default=1, help="Jobs released per arrival")
+    parser.add_argument(
+        "-r", "--rate", type=float, default=0, help="Jobs arriving per second, 0 for all at once"
+    )
+    parser.add_argument(
+        "-s", "--step", type=float, default=0, help="Seconds per rate step, 0 for a constant rate"
+    )
+    parser.add_argument(
+        "--ramp", type=float, default=0, help="Jobs per second added to the rate every step"
+    )
+    arguments = parser.parse_args()
+
+    if arguments.concurrency < 1 or arguments.burst < 1 or arguments.batch < 1:
+        print("Concurrency, burst, and batch should be at least 1")
+        sys.exit(1)
+
+    enable_logging(arguments.verbose)
+    main(arguments)
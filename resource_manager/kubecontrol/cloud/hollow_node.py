@@ -0,0 +1,668 @@
+"""\
+Simulate many Kubernetes nodes on one VM, like the hollow nodes of kubemark.
+Runs on a cloud worker and only uses the standard library.
+
+Every hollow node registers a Node object and renews its Lease against the real control plane,
+so the apiserver, scheduler, controllers, and etcd do the same work as for real nodes.
+Pods bound to a hollow node are not run: the kubelet phases are simulated with fixed delays.
+For each phase we write the same custom print as our kubelet build, and a container log line
+when the application "starts", so the timeline of the empty application works unchanged:
+- Custom prints: /var/log/hollow/kubelet/0.log, harvested like the prints of the real kubelet
+- Container logs: /var/log/pods/<namespace>_<pod>_<uid>/<container>/0.log, in CRI format
+"""
+
+import argparse
+import heapq
+import http.client
+import json
+import logging
+import os
+import queue
+import shutil
+import socket
+import ssl
+import sys
+import threading
+import time
+import uuid
+
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+# Custom prints of all hollow kubelets on this VM
+PRINTS = "/var/log/hollow/kubelet/0.log"
+
+# Container logs, read by the framework like those of real containers
+POD_LOGS = "/var/log/pods"
+
+# Label that marks hollow nodes, so the framework can tell them apart from real nodes
+HOLLOW_LABEL = "continuum/hollow"
+
+# Lease settings of the real kubelet
+LEASE_DURATION = 40
+LEASE_INTERVAL = 10
+
+# Report the node status this often, the lease is the heartbeat in between (s)
+STATUS_INTERVAL = 60
+
+# Default delays (s) between the simulated kubelet phases:
+# start pod (0500) -> mount volumes (0504) -> create sandbox (0505) -> create container (0514)
+# -> start container (0517) -> application started
+DELAYS = [0.02, 0.01, 0.3, 0.05, 0.05]
+
+# Threads that send requests to the apiserver
+WORKERS = 8
+
+
+def enable_logging(verbose):
+    """Enable logging -> only used for debugging this script"""
+    # Set parameters
+    new_level = logging.INFO
+    if verbose:
+        new_level = logging.DEBUG
+
+    new_format = "[%(asctime)s %(filename)20s:%(lineno)4s - %(funcName)25s() ] %(message)s"
+    logging.basicConfig(format=new_format, level=new_level, datefmt="%Y-%m-%d %H:%M:%S")
+    logging.debug("Logging has been enabled")
+
+
+def k8s_time(t_ns=None):
+    """Format a time as a Kubernetes timestamp with microseconds (MicroTime)
+
+    Args:
+        t_ns (int, optional): Time (ns). Defaults to now.
+
+    Returns:
+        str: Timestamp, like 2023-09-03T11:50:03.183541Z
+    """
+    if t_ns is None:
+        t_ns = time.time_ns()
+
+    dt = datetime.fromtimestamp(t_ns / 10**9, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def cri_time(t_ns):
+    """Format a time like containerd does in container logs, in the local time zone
+
+    Args:
+        t_ns (int): Time (ns)
+
+    Returns:
+        str: Timestamp, like 2023-09-03T11:50:03.183541380+02:00
+    """
+    dt = datetime.fromtimestamp(t_ns // 10**9).astimezone()
+    offset = dt.strftime("%z")
+    offset = "Z" if offset == "+0000" else offset[:3] + ":" + offset[3:]
+    return "%s.%09d%s" % (dt.strftime("%Y-%m-%dT%H:%M:%S"), t_ns % 10**9, offset)
+
+
+class Client:
+    """HTTPS client for the apiserver, with one keep-alive connection per thread"""
+
+    def __init__(self, server, path):
+        """Initialize the object
+
+        Args:
+            server (str): URL of the apiserver
+            path (str): Directory with ca.crt, client.crt, and client.key
+        """
+        url = urlparse(server)
+        self.host = url.hostname
+        self.port = url.port or 443
+
+        self.context = ssl.create_default_context(cafile=os.path.join(path, "ca.crt"))
+        self.context.load_cert_chain(
+            os.path.join(path, "client.crt"), os.path.join(path, "client.key")
+        )
+        self.local = threading.local()
+
+    def connect(self):
+        """Open a new connection to the apiserver
+
+        Returns:
+            HTTPSConnection: Connection
+        """
+        return http.client.HTTPSConnection(self.host, self.port, context=self.context)
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        """Send a request over the connection of this thread, reconnect once if it broke
+
+        Args:
+            method (str): HTTP method
+            path (str): API path
+            body (dict, optional): Body to send as JSON. Defaults to None.
+            content_type (str, optional): Content type of the body, for patches
+
+        Returns:
+            int: Status code
+            bytes: Response body
+        """
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = content_type
+
+        for attempt in range(2):
+            if getattr(self.local, "connection", None) is None:
+                self.local.connection = self.connect()
+
+            try:
+                self.local.connection.request(method, path, body=data, headers=headers)
+                response = self.local.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                self.local.connection.close()
+                self.local.connection = None
+                if attempt == 1:
+                    raise
+
+        return None, None
+
+
+class Timer(threading.Thread):
+    """Run callbacks at a given time, all from one thread"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.heap = []
+        self.count = 0
+        self.cond = threading.Condition()
+
+    def schedule(self, t, func, *args):
+        """Run a function at a given time
+
+        Args:
+            t (float): Time to run the function at, like time.time()
+            func (func): Function to run
+            args (list): Arguments of the function
+        """
+        with self.cond:
+            # The counter keeps the heap from comparing functions when times are equal
+            heapq.heappush(self.heap, (t, self.count, func, args))
+            self.count += 1
+            self.cond.notify()
+
+    def run(self):
+        """Run callbacks as they become due"""
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.time():
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.cond.wait(timeout)
+
+                _, _, func, args = heapq.heappop(self.heap)
+
+            func(*args)
+
+
+class HollowKubelet:
+    """Kubelet for all hollow nodes on this VM: keeps the nodes alive and fakes their pods"""
+
+    def __init__(self, client, args):
+        """Initialize the object
+
+        Args:
+            client (Client): Client for the apiserver
+            args (Namespace): Argparse object
+        """
+        self.client = client
+        self.args = args
+        self.delays = args.delays or DELAYS
+
+        hostname = socket.gethostname().lower().replace("_", "")
+        self.nodes = ["%s-hollow-%i" % (hostname, i) for i in range(args.nodes)]
+        self.names = set(self.nodes)
+        self.ip = self.get_ip()
+
+        self.pods = {}
+        self.lock = threading.Lock()
+
+        self.prints = open(PRINTS, "a", encoding="utf-8", buffering=1)
+        self.print_lock = threading.Lock()
+
+        self.timer = Timer()
+        self.requests = queue.Queue()
+
+    def get_ip(self):
+        """Get the IP this VM uses to reach the apiserver, used as address of all hollow nodes
+
+        Returns:
+            str: IP address
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((self.client.host, self.client.port))
+            return s.getsockname()[0]
+
+    def send(self, method, path, body=None, content_type="application/json", allow=None):
+        """Queue a request for the worker threads, which log it if it fails
+
+        Args:
+            method (str): HTTP method
+            path (str): API path
+            body (dict, optional): Body to send as JSON. Defaults to None.
+            content_type (str, optional): Content type of the body, for patches
+            allow (list(int), optional): Error status codes that are expected. Defaults to None.
+        """
+        self.requests.put((method, path, body, content_type, allow or []))
+
+    def work(self):
+        """Send queued requests to the apiserver"""
+        while True:
+            method, path, body, content_type, allow = self.requests.get()
+            try:
+                status, data = self.client.request(method, path, body, content_type)
+            except (http.client.HTTPException, OSError) as e:
+                logging.warning("Request %s %s failed: %s", method, path, str(e))
+                continue
+
+            if status >= 400 and status not in allow:
+                logging.warning("Request %s %s returned %i: %s", method, path, status, data)
+
+    def custom_print(self, line):
+        """Write a custom print, in the format of our kubelet build
+
+        Args:
+            line (str): Print after [CONTINUUM], like 0500 pod=default/empty-1-f4lwj
+        """
+        t = time.time_ns()
+        stamp = datetime.fromtimestamp(t / 10**9).strftime("%m%d %H:%M:%S.%f")
+        with self.print_lock:
+            self.prints.write(
+                "I%s %7i hollow_node.go:1] %%!s(int64=%i) [CONTINUUM] %s\n"
+                % (stamp, os.getpid(), t, line)
+            )
+
+    def node_status(self):
+        """Get the status of a hollow node, which is always healthy
+
+        Returns:
+            dict: Node status
+        """
+        now = k8s_time()[:19] + "Z"
+        conditions = [
+            ["MemoryPressure", "False", "KubeletHasSufficientMemory"],
+            ["DiskPressure", "False", "KubeletHasNoDiskPressure"],
+            ["PIDPressure", "False", "KubeletHasSufficientPID"],
+            ["Ready", "True", "KubeletReady"],
+        ]
+        capacity = {"cpu": str(self.args.cpu), "memory": "%iGi" % (self.args.memory), "pods": "110"}
+        return {
+            "capacity": capacity,
+            "allocatable": capacity,
+            "conditions": [
+                {
+                    "type": kind,
+                    "status": status,
+                    "reason": reason,
+                    "lastHeartbeatTime": now,
+                    "lastTransitionTime": now,
+                }
+                for kind, status, reason in conditions
+            ],
+        }
+
+    def register(self):
+        """Register all hollow nodes and their leases with the apiserver"""
+        for name in self.nodes:
+            node = {
+                "apiVersion": "v1",
+                "kind": "Node",
+                "metadata": {
+                    "name": name,
+                    "labels": {
+                        "kubernetes.io/hostname": name,
+                        "kubernetes.io/os": "linux",
+                        "kubernetes.io/arch": "amd64",
+                        HOLLOW_LABEL: "true",
+                    },
+                },
+                "status": {
+                    "addresses": [
+                        {"type": "InternalIP", "address": self.ip},
+                        {"type": "Hostname", "address": name},
+                    ],
+                    "nodeInfo": {
+                        "architecture": "amd64",
+                        "operatingSystem": "linux",
+                        "kubeletVersion": self.args.version,
+                    },
+                    **self.node_status(),
+                },
+            }
+            self.send("POST", "/api/v1/nodes", node, allow=[409])
+
+            lease = {
+                "apiVersion": "coordination.k8s.io/v1",
+                "kind": "Lease",
+                "metadata": {"name": name},
+                "spec": {
+                    "holderIdentity": name,
+                    "leaseDurationSeconds": LEASE_DURATION,
+                    "renewTime": k8s_time(),
+                },
+            }
+            self.send(
+                "POST",
+                "/apis/coordination.k8s.io/v1/namespaces/kube-node-lease/leases",
+                lease,
+                allow=[409],
+            )
+
+        self.report_status()
+
+    def report_status(self):
+        """Report the status of all nodes, and schedule the next report"""
+        for name in self.nodes:
+            self.send(
+                "PATCH",
+                "/api/v1/nodes/%s/status" % (name),
+                {"status": self.node_status()},
+                "application/strategic-merge-patch+json",
+            )
+
+        self.timer.schedule(time.time() + STATUS_INTERVAL, self.report_status)
+
+    def renew_leases(self):
+        """Renew the lease of all nodes, and schedule the next renewal"""
+        body = {"spec": {"renewTime": k8s_time()}}
+        for name in self.nodes:
+            self.send(
+                "PATCH",
+                "/apis/coordination.k8s.io/v1/namespaces/kube-node-lease/leases/%s" % (name),
+                body,
+                "application/merge-patch+json",
+            )
+
+        self.timer.schedule(time.time() + LEASE_INTERVAL, self.renew_leases)
+
+    def handle(self, event, pod):
+        """Process a watch event of a pod
+
+        Args:
+            event (str): Event type, ADDED, MODIFIED, or DELETED
+            pod (dict): Pod object
+        """
+        if pod["spec"].get("nodeName") not in self.names:
+            return
+
+        meta = pod["metadata"]
+        uid = meta["uid"]
+        with self.lock:
+            if event == "DELETED":
+                self.pods.pop(uid, None)
+                shutil.rmtree(self.log_dir(pod), ignore_errors=True)
+                return
+
+            state = self.pods.get(uid)
+            if meta.get("deletionTimestamp"):
+                # Like the kubelet: stop the pod and finish the graceful deletion
+                if state is None or not state["deleting"]:
+                    self.pods[uid] = {"deleting": True}
+                    self.send(
+                        "DELETE",
+                        "/api/v1/namespaces/%s/pods/%s" % (meta["namespace"], meta["name"]),
+                        {"gracePeriodSeconds": 0, "preconditions": {"uid": uid}},
+                        allow=[404, 409],
+                    )
+
+                return
+
+            if state is not None or pod["status"].get("phase") in ["Succeeded", "Failed"]:
+                return
+
+            self.pods[uid] = {"deleting": False}
+
+        self.start_pod(pod)
+
+    def alive(self, pod):
+        """Check if a pod should still be simulated
+
+        Args:
+            pod (dict): Pod object
+
+        Returns:
+            bool: False if the pod is being deleted
+        """
+        with self.lock:
+            state = self.pods.get(pod["metadata"]["uid"])
+            return state is not None and not state["deleting"]
+
+    def phase(self, pod, code, containers=False):
+        """Write the custom print of a kubelet phase, per container if needed
+
+        Args:
+            pod (dict): Pod object
+            code (str): Custom print code
+            containers (bool, optional): Print once per container. Defaults to False.
+        """
+        if not self.alive(pod):
+            return
+
+        name = "%s/%s" % (pod["metadata"]["namespace"], pod["metadata"]["name"])
+        if not containers:
+            self.custom_print("%s pod=%s" % (code, name))
+            return
+
+        for container in pod["spec"]["containers"]:
+            self.custom_print("%s pod=%s container=%s" % (code, name, container["name"]))
+
+    def start_pod(self, pod):
+        """Simulate the kubelet phases of a new pod
+
+        Args:
+            pod (dict): Pod object
+        """
+        self.custom_print(
+            "0500 pod=%s/%s" % (pod["metadata"]["namespace"], pod["metadata"]["name"])
+        )
+
+        t = time.time()
+        phases = [["0504", False], ["0505", False], ["0514", True], ["0517", True]]
+        for delay, (code, containers) in zip(self.delays, phases):
+            t += delay
+            self.timer.schedule(t, self.phase, pod, code, containers)
+
+        t += self.delays[-1]
+        self.timer.schedule(t, self.run_pod, pod)
+
+    def log_dir(self, pod):
+        """Get the log directory of a pod
+
+        Args:
+            pod (dict): Pod object
+
+        Returns:
+            str: Path
+        """
+        meta = pod["metadata"]
+        return os.path.join(POD_LOGS, "%s_%s_%s" % (meta["namespace"], meta["name"], meta["uid"]))
+
+    def run_pod(self, pod):
+        """Start the application of a pod: write its first log line and report it as running
+
+        Args:
+            pod (dict): Pod object
+        """
+        if not self.alive(pod):
+            return
+
+        t = time.time_ns()
+        for container in pod["spec"]["containers"]:
+            path = os.path.join(self.log_dir(pod), container["name"])
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "0.log"), "a", encoding="utf-8") as f:
+                f.write("%s stdout F Start the application\n" % (cri_time(t)))
+
+        now = k8s_time(t)[:19] + "Z"
+        status = {
+            "phase": "Running",
+            "hostIP": self.ip,
+            "podIP": self.ip,
+            "startTime": now,
+            "conditions": [
+                {"type": kind, "status": "True", "lastTransitionTime": now}
+                for kind in ["Initialized", "ContainersReady", "Ready"]
+            ],
+            "containerStatuses": [
+                {
+                    "name": container["name"],
+                    "image": container["image"],
+                    "imageID": "",
+                    "containerID": "containerd://%s" % (uuid.uuid4().hex),
+                    "ready": True,
+                    "started": True,
+                    "restartCount": 0,
+                    "state": {"running": {"startedAt": now}},
+                }
+                for container in pod["spec"]["containers"]
+            ],
+        }
+        self.patch_status(pod, status)
+
+        # The empty application only sleeps, other pods (like daemons) keep running
+        sleep = None
+        for env in pod["spec"]["containers"][0].get("env", []):
+            if env["name"] == "SLEEP_TIME":
+                sleep = float(env["value"])
+
+        if sleep is not None:
+            self.timer.schedule(time.time() + sleep, self.finish_pod, pod, status)
+
+    def finish_pod(self, pod, status):
+        """Report the application of a pod as finished
+
+        Args:
+            pod (dict): Pod object
+            status (dict): Status reported when the pod started
+        """
+        if not self.alive(pod):
+            return
+
+        now = k8s_time()[:19] + "Z"
+        status["phase"] = "Succeeded"
+        status["conditions"] = [
+            {"type": kind, "status": "False", "reason": "PodCompleted", "lastTransitionTime": now}
+            for kind in ["ContainersReady", "Ready"]
+        ]
+        for container in status["containerStatuses"]:
+            started = container["state"]["running"]["startedAt"]
+            container["ready"] = False
+            container["started"] = False
+            container["state"] = {
+                "terminated": {
+                    "exitCode": 0,
+                    "reason": "Completed",
+                    "startedAt": started,
+                    "finishedAt": now,
+                    "containerID": container["containerID"],
+                }
+            }
+
+        self.patch_status(pod, status)
+
+    def patch_status(self, pod, status):
+        """Update the status of a pod
+
+        Args:
+            pod (dict): Pod object
+            status (dict): New status
+        """
+        meta = pod["metadata"]
+        self.send(
+            "PATCH",
+            "/api/v1/namespaces/%s/pods/%s/status" % (meta["namespace"], meta["name"]),
+            {"status": status},
+            "application/strategic-merge-patch+json",
+            allow=[404],
+        )
+
+    def watch(self):
+        """Follow all pods in the cluster, and restart the watch if the apiserver closes it"""
+        version = None
+        while True:
+            if version is None:
+                status, data = self.client.request("GET", "/api/v1/pods")
+                if status != 200:
+                    logging.warning("Could not list pods: %s", data)
+                    time.sleep(1)
+                    continue
+
+                pods = json.loads(data)
+                version = pods["metadata"]["resourceVersion"]
+                for pod in pods["items"]:
+                    self.handle("ADDED", pod)
+
+            connection = self.client.connect()
+            try:
+                connection.request(
+                    "GET",
+                    "/api/v1/pods?watch=1&allowWatchBookmarks=true&resourceVersion=%s" % (version),
+                    headers={"Accept": "application/json"},
+                )
+                response = connection.getresponse()
+                for line in response:
+                    event = json.loads(line)
+                    if event["type"] == "ERROR":
+                        # Our resource version is too old, list everything again
+                        version = None
+                        break
+
+                    version = event["object"]["metadata"]["resourceVersion"]
+                    if event["type"] != "BOOKMARK":
+                        self.handle(event["type"], event["object"])
+            except (http.client.HTTPException, OSError, ValueError) as e:
+                logging.debug("Pod watch closed: %s", str(e))
+            finally:
+                connection.close()
+
+    def run(self):
+        """Start all threads, and process pod events until killed"""
+        for _ in range(WORKERS):
+            threading.Thread(target=self.work, daemon=True).start()
+
+        self.timer.start()
+        self.register()
+        self.renew_leases()
+        logging.info("Registered %i hollow nodes", len(self.nodes))
+
+        self.watch()
+
+
+def main(args):
+    """Main function
+
+    Args:
+        args (Namespace): Argparse object
+    """
+    os.makedirs(os.path.dirname(PRINTS), exist_ok=True)
+    client = Client(args.server, args.credentials)
+    HollowKubelet(client, args).run()
+
+
+if __name__ == "__main__":
+    # Get input arguments and parse them
+    parser = argparse.ArgumentParser()
+    parser.add_argument("server", type=str, help="URL of the apiserver")
+    parser.add_argument("credentials", type=str, help="Directory with the apiserver credentials")
+    parser.add_argument("-v", "--verbose", action="store_true", help="increase verbosity level")
+    parser.add_argument("-n", "--nodes", type=int, default=10, help="Number of hollow nodes")
+    parser.add_argument("--cpu", type=int, default=4, help="CPU cores per hollow node")
+    parser.add_argument("--memory", type=int, default=8, help="Memory (GB) per hollow node")
+    parser.add_argument("--version", type=str, default="v1.27.0", help="Kubelet version to report")
+    parser.add_argument(
+        "-d",
+        "--delays",
+        type=lambda s: [float(d) for d in s.split(",")],
+        default=None,
+        help="Delays (s) between the 5 simulated kubelet phases, comma separated",
+    )
+    arguments = parser.parse_args()
+
+    if arguments.nodes < 1 or (arguments.delays is not None and len(arguments.delays) != 5):
+        print("Need at least 1 node, and exactly 5 delays")
+        sys.exit(1)
+
+    enable_logging(arguments.verbose)
+    main(arguments)
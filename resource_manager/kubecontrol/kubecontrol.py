@@ -5,8 +5,10 @@ This resource manager doesn't have any/many help functions, see the /kubernetes
 
 import logging
 import os
+import sys
 
 from infrastructure import ansible
+from resource_manager.kubernetes import kube_api
 from resource_manager.kubernetes import kubernetes
 
 
@@ -24,10 +26,17 @@ def add_options(_config):
         [
             "kube_deployment",
             str,
-            lambda x: x in ["pod", "container", "file", "call"],
+            lambda x: x in ["pod", "container", "file", "call", "bulk"],
             False,
             "pod",
         ],
+        ["bulk_concurrency", int, lambda x: x >= 1, False, 16],
+        ["bulk_qps", float, lambda x: x >= 0.0, False, 0.0],
+        ["bulk_burst", int, lambda x: x >= 1, False, 10],
+        ["bulk_batch", int, lambda x: x >= 1, False, 1],
+        ["bulk_rate", float, lambda x: x >= 0.0, False, 0.0],
+        ["hollow_nodes", int, lambda x: x >= 0, False, 0],
+        ["hollow_delays", list, lambda x: len(x) == 5, False, []],
         [
             "kube_version",
             str,
@@ -57,6 +66,13 @@ def verify_options(parser, config):
         != 0
     ):
         parser.error(r"ERROR: Kubernetes requires (#clouds-1) % #endpoints == 0 (-1 for control)")
+    elif config["benchmark"]["hollow_delays"]:
+        try:
+            config["benchmark"]["hollow_delays"] = [
+                float(d) for d in config["benchmark"]["hollow_delays"]
+            ]
+        except ValueError:
+            parser.error("ERROR: hollow_delays should be 5 comma separated numbers")
 
 
 def start(config, machines):
@@ -136,6 +152,9 @@ def start(config, machines):
     logging.debug("Check output for Ansible command [%s]", " ".join(command))
     ansible.check_output((output, error))
 
+    if config["benchmark"]["hollow_nodes"] > 0:
+        start_hollow_nodes(config, machines)
+
     # Install observability packages (Prometheus, Grafana) if configured by the user
     if config["benchmark"]["observability"]:
         command = [
@@ -152,3 +171,63 @@ def start(config, machines):
 
         logging.debug("Check output for Ansible command [%s]", " ".join(command))
         ansible.check_output((output, error))
+
+
+def start_hollow_nodes(config, machines):
+    """Start simulated nodes on every cloud worker, see cloud/hollow_node.py.
+    The real workers are cordoned, so all pods of the benchmark go to the hollow nodes.
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+    """
+    hollow_nodes = (config["infrastructure"]["cloud_nodes"] - 1) * config["benchmark"][
+        "hollow_nodes"
+    ]
+    logging.info("Start %i hollow nodes", hollow_nodes)
+
+    # The hollow nodes use the same credentials as the framework
+    client = kube_api.get_client(config, machines)
+
+    delays = ""
+    if config["benchmark"]["hollow_delays"]:
+        delays = "-d " + ",".join(str(d) for d in config["benchmark"]["hollow_delays"])
+
+    extra_vars = {
+        "server": client.server.geturl(),
+        "hollow_nodes": config["benchmark"]["hollow_nodes"],
+        "cpu": config["infrastructure"]["cloud_cores"],
+        "memory": config["infrastructure"]["cloud_memory"],
+        "version": config["benchmark"]["kube_version"],
+        "delays": delays,
+    }
+
+    command = [
+        "ansible-playbook",
+        "-i",
+        os.path.join(config["infrastructure"]["base_path"], ".continuum/inventory_vms"),
+        "--extra-vars",
+        " ".join("%s='%s'" % (k, v) for k, v in extra_vars.items()),
+        os.path.join(config["infrastructure"]["base_path"], ".continuum/cloud/hollow_node.yml"),
+    ]
+
+    output, error = machines[0].process(config, command)[0]
+
+    logging.debug("Check output for Ansible command [%s]", " ".join(command))
+    ansible.check_output((output, error))
+
+    kubernetes.verify_running_cluster(config, machines, hollow_nodes=hollow_nodes)
+
+    # Keep pods off the real workers, only the control plane and hollow nodes remain
+    workers = [
+        node["metadata"]["name"]
+        for node in client.nodes()
+        if "continuum/hollow" not in node["metadata"].get("labels", {})
+        and "node-role.kubernetes.io/control-plane" not in node["metadata"].get("labels", {})
+    ]
+    command = "kubectl cordon %s" % (" ".join(workers))
+    output, error = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])[0]
+
+    if error and not all("[CONTINUUM]" in l for l in error):
+        logging.error("Could not cordon the real workers: %s", "".join(error))
+        sys.exit()
@@ -0,0 +1,317 @@
+"""\
+Talk to the Kubernetes apiserver directly instead of running kubectl over SSH for every call.
+The apiserver port on the cloud controller is forwarded to the host over one SSH connection,
+and all requests reuse the same authenticated HTTPS connection pool.
+"""
+
+import atexit
+import base64
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from urllib.parse import urlparse
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+# Hostname that is always in the certificate of a kubeadm apiserver.
+# We connect via localhost, so verify the certificate against this name instead.
+APISERVER_HOSTNAME = "kubernetes"
+
+# Number of items per page when listing objects
+PAGE_SIZE = 500
+
+# Client shared by all modules, see get_client()
+CLIENT = None
+
+
+class HostnameAdapter(HTTPAdapter):
+    """Verify the server certificate against a fixed hostname instead of the connected host"""
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["assert_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+class KubeAPI:
+    """Client for the Kubernetes apiserver on the cloud controller.
+    Credentials are taken from the admin kubeconfig on the controller, and the apiserver is
+    reached through an SSH port forward that lives as long as the framework.
+    """
+
+    def __init__(self, config, machines):
+        """Initialize the object
+
+        Args:
+            config (dict): Parsed configuration
+            machines (list(Machine object)): List of machine objects representing physical machines
+        """
+        self.config = config
+        self.machines = machines
+
+        self.tunnel = None
+        self.port = None
+        self.server = None
+        self.session = None
+
+    def connect(self):
+        """Get credentials from the cloud controller, and open the port forward to the apiserver"""
+        logging.debug("Connect to the Kubernetes apiserver on the cloud controller")
+
+        command = ["kubectl", "config", "view", "--raw", "-o", "json"]
+        output, error = self.machines[0].process(
+            self.config, command, ssh=self.config["cloud_ssh"][0]
+        )[0]
+
+        if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
+            logging.error("Could not get kubeconfig: %s", "".join(error))
+            sys.exit()
+
+        # Custom prints may appear around the json output
+        output = [line for line in output if "[CONTINUUM]" not in line]
+        kubeconfig = json.loads("".join(output))
+
+        cluster = kubeconfig["clusters"][0]["cluster"]
+        user = kubeconfig["users"][0]["user"]
+        self.server = urlparse(cluster["server"])
+
+        # Requests needs the credentials as files
+        path = os.path.join(self.config["infrastructure"]["base_path"], ".continuum/kube_api")
+        os.makedirs(path, exist_ok=True)
+
+        files = {
+            "ca.crt": cluster["certificate-authority-data"],
+            "client.crt": user["client-certificate-data"],
+            "client.key": user["client-key-data"],
+        }
+        for name, data in files.items():
+            with open(os.path.join(path, name), "wb", opener=private_opener) as f:
+                f.write(base64.b64decode(data))
+
+        self.session = requests.Session()
+        self.session.cert = (os.path.join(path, "client.crt"), os.path.join(path, "client.key"))
+        self.session.verify = os.path.join(path, "ca.crt")
+        self.session.mount("https://", HostnameAdapter(APISERVER_HOSTNAME, pool_maxsize=32))
+
+        self.open_tunnel()
+        atexit.register(self.close)
+
+    def open_tunnel(self):
+        """Forward a free local port to the apiserver via the cloud controller"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+
+        # Kubeconfigs may leave out the port of the apiserver
+        port = self.server.port
+        if port is None:
+            port = 443 if self.server.scheme == "https" else 80
+
+        command = [
+            "ssh",
+            "-N",
+            "-o",
+            "ExitOnForwardFailure=yes",
+            "-L",
+            "%i:%s:%i" % (self.port, self.server.hostname, port),
+            self.config["cloud_ssh"][0],
+            "-i",
+            self.config["ssh_key"],
+        ]
+
+        # pylint: disable-next=consider-using-with
+        self.tunnel = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        # Wait until the port forward accepts connections
+        for _ in range(100):
+            if self.tunnel.poll() is not None:
+                break
+
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.1)
+
+        logging.error("Could not forward the apiserver port from %s", self.config["cloud_ssh"][0])
+        sys.exit()
+
+    def close(self):
+        """Close the connection to the apiserver"""
+        if self.session is not None:
+            self.session.close()
+
+        if self.tunnel is not None and self.tunnel.poll() is None:
+            self.tunnel.terminate()
+            self.tunnel.wait()
+
+    def request(self, method, path, params=None, allow=None):
+        """Send a request to the apiserver. Reopens the port forward once if it was closed.
+
+        Args:
+            method (str): HTTP method
+            path (str): API path, for example /api/v1/namespaces/default/pods
+            params (dict, optional): Query parameters. Defaults to None.
+            allow (list(int), optional): Error status codes that shouldn't crash. Defaults to None.
+
+        Returns:
+            (Response): Response from the apiserver
+        """
+        url = "https://127.0.0.1:%i%s" % (self.port, path)
+        try:
+            response = self.session.request(method, url, params=params, timeout=60)
+        except requests.ConnectionError:
+            logging.debug("Connection to the apiserver lost, reconnect")
+            self.tunnel.terminate()
+            self.tunnel.wait()
+            self.open_tunnel()
+
+            url = "https://127.0.0.1:%i%s" % (self.port, path)
+            response = self.session.request(method, url, params=params, timeout=60)
+
+        if response.status_code >= 400 and response.status_code not in (allow or []):
+            logging.error(
+                "Request %s %s failed with status %i: %s",
+                method,
+                path,
+                response.status_code,
+                response.text,
+            )
+            sys.exit()
+
+        return response
+
+    def list(self, path, label_selector=None, field_selector=None):
+        """List all objects of a type, requested in pages so huge lists don't time out
+
+        Args:
+            path (str): API path of the object list
+            label_selector (str, optional): Only list objects with these labels. Defaults to None.
+            field_selector (str, optional): Only list objects with these fields. Defaults to None.
+
+        Returns:
+            list(dict): All objects
+        """
+        params = {"limit": PAGE_SIZE}
+        if label_selector is not None:
+            params["labelSelector"] = label_selector
+        if field_selector is not None:
+            params["fieldSelector"] = field_selector
+
+        items = []
+        while True:
+            body = self.request("GET", path, params=params).json()
+            items += body["items"]
+
+            token = body["metadata"].get("continue")
+            if not token:
+                return items
+
+            params["continue"] = token
+
+    def get(self, path, allow=None):
+        """Get a single object
+
+        Args:
+            path (str): API path of the object
+            allow (list(int), optional): Error status codes that shouldn't crash. Defaults to None.
+
+        Returns:
+            dict: The object, None if the request returned an allowed error
+        """
+        response = self.request("GET", path, allow=allow)
+        if response.status_code >= 400:
+            return None
+
+        return response.json()
+
+    def delete(self, path, label_selector=None):
+        """Delete an object, or a collection of objects. Dependents are deleted in the background.
+
+        Args:
+            path (str): API path of the object or object list
+            label_selector (str, optional): Only delete objects with these labels. Defaults to None.
+
+        Returns:
+            dict: Status or deleted object(s) as reported by the apiserver
+        """
+        params = {"propagationPolicy": "Background"}
+        if label_selector is not None:
+            params["labelSelector"] = label_selector
+
+        return self.request("DELETE", path, params=params).json()
+
+    def pods(self, namespace="default", label_selector=None):
+        """List all pods in a namespace, ordered by node like 'kubectl --sort-by=.spec.nodeName'
+
+        Args:
+            namespace (str, optional): Namespace of the pods. Defaults to "default".
+            label_selector (str, optional): Only list pods with these labels. Defaults to None.
+
+        Returns:
+            list(dict): All pods
+        """
+        pods = self.list("/api/v1/namespaces/%s/pods" % (namespace), label_selector)
+        return sorted(pods, key=lambda pod: pod["spec"].get("nodeName", ""))
+
+    def nodes(self):
+        """List all nodes in the cluster
+
+        Returns:
+            list(dict): All nodes
+        """
+        return self.list("/api/v1/nodes")
+
+    def logs(self, pod, container=None, namespace="default"):
+        """Get the logs of a container, with a timestamp per line like 'kubectl logs --timestamps'
+
+        Args:
+            pod (str): Name of the pod
+            container (str, optional): Name of the container, if the pod has many. Defaults to None.
+            namespace (str, optional): Namespace of the pod. Defaults to "default".
+
+        Returns:
+            list(str): Log lines
+        """
+        params = {"timestamps": "true"}
+        if container is not None:
+            params["container"] = container
+
+        path = "/api/v1/namespaces/%s/pods/%s/log" % (namespace, pod)
+        return self.request("GET", path, params=params).text.splitlines()
+
+
+def private_opener(path, flags):
+    """Open a file that is only readable by the current user, used for credentials"""
+    return os.open(path, flags, 0o600)
+
+
+def get_client(config, machines):
+    """Get the client for the apiserver, connect the first time this is called
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+
+    Returns:
+        (KubeAPI): Connected client
+    """
+    global CLIENT
+
+    if CLIENT is None:
+        CLIENT = KubeAPI(config, machines)
+        CLIENT.connect()
+
+    return CLIENT
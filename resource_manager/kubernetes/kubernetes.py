@@ -2,14 +2,49 @@
 Setup Kubernetes on cloud
 """
 
+import base64
+import gzip
+import io
 import logging
 import os
+import re
 import sys
+import tarfile
 import time
 
+import numpy as np
 import pandas as pd
 
 from infrastructure import ansible
+from infrastructure import clock
+
+from . import kube_api
+from .pod_tracker import PodTracker, to_epoch
+from .resource_receiver import ResourceReceiver
+
+# Record written by the cgroup resource collector (resource_usage.py) per cgroup per sample
+RESOURCE_RECORD = np.dtype(
+    [
+        ("time", "<i8"),
+        ("id", "<u4"),
+        ("cpu", "<u8"),
+        ("memory", "<u8"),
+        ("read", "<u8"),
+        ("written", "<u8"),
+    ]
+)
+
+# Suffix of simulated nodes, see resource_manager/kubecontrol/cloud/hollow_node.py
+HOLLOW_NODE = re.compile(r"-hollow-\d+$")
+
+# Interval of the time grid all resource metrics are aligned to (s)
+RESOURCE_INTERVAL = 0.1
+
+# Read resource metrics this long before and after the benchmark, clocks of VMs may differ (s)
+RESOURCE_MARGIN = 5.0
+
+# Rows per chunk when reading resource metric files
+RESOURCE_CHUNK = 100000
 
 
 def add_options(_config):
@@ -108,51 +143,81 @@ def start(config, machines):
         ansible.check_output((output, error))
 
 
-def verify_running_cluster(config, machines):
+def verify_running_cluster(config, machines, hollow_nodes=0):
     """Verify that all nodes in the cluster have status Ready
     If not, either wait until they are ready or stop the framework
 
     Args:
         config (dict): Parsed configuration
         machines (list(Machine object)): List of machine objects representing physical machines
+        hollow_nodes (int, optional): Number of simulated nodes to wait for as well. Defaults to 0.
     """
     logging.info("Verify if all nodes in the cluster are connected")
 
-    pending = True
-    i = 0
+    client = kube_api.get_client(config, machines)
+    nodes_total = config["infrastructure"]["cloud_nodes"] + config["infrastructure"]["edge_nodes"]
+    nodes_total += hollow_nodes
 
-    while i < config["infrastructure"]["cloud_nodes"] + config["infrastructure"]["edge_nodes"]:
-        # Get the list of nodes
-        if pending:
-            command = ["kubectl", "get", "nodes"]
-            output, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
+    while True:
+        nodes = client.nodes()
 
-            if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-                logging.error("".join(error))
+        ready = 0
+        for node in nodes:
+            conditions = {c["type"]: c["status"] for c in node["status"].get("conditions", [])}
+            status = conditions.get("Ready")
+
+            # Status "Unknown" means the node is still connecting, or its kubelet crashed
+            if status == "True":
+                ready += 1
+            elif status not in ["False", "Unknown", None]:
+                logging.error(
+                    "[ERROR] Node %s has unexpected status %s", node["metadata"]["name"], status
+                )
                 sys.exit()
 
-            # The first couple of lines may have custom prints, skip
-            offset = 0
-            for offset, o in enumerate(output):
-                if "NAME" in o and "STATUS" in o:
-                    break
+        if len(nodes) >= nodes_total and ready == len(nodes):
+            break
 
-        # Find the status
-        line = output[i + 1 + offset].rstrip().split(" ")
-        line = [s for s in line if s != ""]
-        node = line[0]
-        status = line[1]
+        time.sleep(5)
 
-        # Check status of node
-        if status == "Ready":
-            i += 1
-            pending = False
-        elif status == "NotReady":
-            time.sleep(5)
-            pending = True
-        else:
-            logging.error("[ERROR] Node %s has unexpected status %s", node, status)
-            sys.exit()
+
+def get_cloud_workers(config):
+    """Get the number of cloud worker nodes in Kubernetes
+
+    Args:
+        config (dict): Parsed configuration
+
+    Returns:
+        int: Number of worker nodes, including simulated hollow nodes
+    """
+    workers = config["infrastructure"]["cloud_nodes"] - 1
+    if config["benchmark"].get("hollow_nodes", 0) > 0:
+        workers *= config["benchmark"]["hollow_nodes"]
+
+    return workers
+
+
+def get_node_vm(config, node):
+    """Get the VM a Kubernetes node runs on, for simulated hollow nodes as well.
+    Kubernetes names nodes by hostname, which is the VM name without underscores.
+
+    Args:
+        config (dict): Parsed configuration
+        node (str): Name of the Kubernetes node, like cloud1user or cloud1user-hollow-12
+
+    Returns:
+        str: Name of the VM like cloud1_user, None if the node isn't a VM
+    """
+    if node is None:
+        return None
+
+    node = HOLLOW_NODE.sub("", node)
+    for ssh in config["cloud_ssh"] + config["edge_ssh"]:
+        name = ssh.split("@")[0]
+        if node in [name, name.replace("_", "")]:
+            return name
+
+    return None
 
 
 def cache_worker(config, machines, app_vars):
@@ -167,7 +232,7 @@ def cache_worker(config, machines, app_vars):
 
     # Set parameters based on mode
     if config["mode"] == "cloud":
-        worker_apps = config["infrastructure"]["cloud_nodes"] - 1
+        worker_apps = get_cloud_workers(config)
         cores = config["infrastructure"]["cloud_cores"]
     elif config["mode"] == "edge":
         worker_apps = config["infrastructure"]["edge_nodes"]
@@ -204,103 +269,66 @@ def cache_worker(config, machines, app_vars):
 
     ansible.check_output(machines[0].process(config, command, shell=True)[0])
 
+    # Follow the status of the cache pods from before they are launched
+    tracker = PodTracker(config, machines)
+    tracker.start()
+
     # This only creates the file we need, now launch the benchmark
     if (
         "kube_deployment" in config["benchmark"]
-        and config["benchmark"]["kube_deployment"] == "file"
+        and config["benchmark"]["kube_deployment"] == "bulk"
     ):
-        # Option "file" launches a kubectl command on an entire directory
-        file = "/home/%s/jobs" % (machines[0].cloud_controller_names[0])
-        command = "kubectl apply -f %s" % (file)
-    elif (
-        "kube_deployment" in config["benchmark"]
-        and config["benchmark"]["kube_deployment"] == "call"
-    ):
-        # Option "call" launches one kubectl command per job file
-        file = "/home/%s/jobs" % (machines[0].cloud_controller_names[0])
-        command = "for filename in /home/%s/jobs/*; do kubectl apply -f \$filename & done" % (
-            machines[0].cloud_controller_names[0]
-        )
-        command = '"%s"' % (command)
+        # Option "bulk" submits the job files without kubectl, see bulk_submit()
+        bulk_submit(config, machines)
     else:
-        file = "/home/%s/job-template.yaml" % (machines[0].cloud_controller_names[0])
-        command = "kubectl apply -f %s" % (file)
+        if (
+            "kube_deployment" in config["benchmark"]
+            and config["benchmark"]["kube_deployment"] == "file"
+        ):
+            # Option "file" launches a kubectl command on an entire directory
+            file = "/home/%s/jobs" % (machines[0].cloud_controller_names[0])
+            command = "kubectl apply -f %s" % (file)
+        elif (
+            "kube_deployment" in config["benchmark"]
+            and config["benchmark"]["kube_deployment"] == "call"
+        ):
+            # Option "call" launches one kubectl command per job file
+            file = "/home/%s/jobs" % (machines[0].cloud_controller_names[0])
+            command = "for filename in /home/%s/jobs/*; do kubectl apply -f \$filename & done" % (
+                machines[0].cloud_controller_names[0]
+            )
+            command = '"%s"' % (command)
+        else:
+            file = "/home/%s/job-template.yaml" % (machines[0].cloud_controller_names[0])
+            command = "kubectl apply -f %s" % (file)
 
-    output, error = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])[0]
+        output, error = machines[0].process(
+            config, command, shell=True, ssh=config["cloud_ssh"][0]
+        )[0]
 
-    if not output or not any("job.batch" in o and "created" in o for o in output):
-        logging.error("Could not deploy pods: %s", "".join(output))
-        logging.error("With error: %s", "".join(error))
-        sys.exit()
-    if error and not all("[CONTINUUM]" in l for l in error):
-        logging.error("Could not deploy pods: %s", "".join(error))
-        sys.exit()
+        if not output or not any("job.batch" in o and "created" in o for o in output):
+            logging.error("Could not deploy pods: %s", "".join(output))
+            logging.error("With error: %s", "".join(error))
+            sys.exit()
+        if error and not all("[CONTINUUM]" in l for l in error):
+            logging.error("Could not deploy pods: %s", "".join(error))
+            sys.exit()
 
-    # Waiting for the applications to fully initialize
-    time.sleep(10)
     logging.info("Deployed %i %s applications", worker_apps, config["mode"])
-
-    pending = True
-    i = 0
-
-    while i < worker_apps:
-        # Get the list of deployed pods
-        if pending:
-            command = [
-                "kubectl",
-                "get",
-                "pods",
-                "-o=custom-columns=NAME:.metadata.name,STATUS:.status.phase",
-                "--sort-by=.spec.nodeName",
-            ]
-            output, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
-
-            if error and any("couldn't find any field with path" in line for line in error):
-                logging.debug("Retry getting list of kubernetes pods")
-                time.sleep(5)
-                pending = True
-                continue
-
-            if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-                logging.error("".join(error))
-                sys.exit()
-
-        # The first couple of lines may have custom prints
-        offset = 0
-        for offset, o in enumerate(output):
-            if "NAME" in o and "STATUS" in o:
-                break
-
-        line = output[i + 1 + offset].rstrip().split(" ")
-        app_name = line[0]
-        app_status = line[-1]
-
-        # Check status of app
-        if app_status in ["Pending", "Running"]:
-            time.sleep(5)
-            pending = True
-        elif app_status == "Succeeded":
-            i += 1
-            pending = False
-        else:
-            logging.error(
-                "Container on cloud/edge %s has status %s, expected Pending, Running, or Succeeded",
-                app_name,
-                app_status,
-            )
-            sys.exit()
+    tracker.wait(
+        lambda counts: counts["Succeeded"] >= worker_apps
+        and counts["Pending"] + counts["ContainerCreating"] + counts["Running"] == 0,
+        "all cache pods have status Succeeded",
+    )
 
     # All apps have succesfully been executed, now kill them
-    command = ["kubectl", "delete", "-f", file]
-    output, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
+    # The cache jobs are the only jobs in the namespace, similar to 'kubectl delete -f file'
+    client = kube_api.get_client(config, machines)
+    client.delete("/apis/batch/v1/namespaces/default/jobs")
 
-    if not output or not any("job.batch" in o and "deleted" in o for o in output):
-        logging.error('Output does not contain "job.batch" and "deleted": %s', "".join(output))
-        sys.exit()
-    elif error and not all("[CONTINUUM]" in l for l in error):
-        logging.error("".join(error))
-
-    time.sleep(10)
+    # Wait until the cache pods are fully removed, so they don't show up in the real benchmark
+    tracker.wait(lambda counts: sum(counts.values()) == 0, "all cache pods are deleted")
+    tracker.stop()
 
 
 def start_worker(config, machines, app_vars, get_starttime=False):
@@ -324,6 +352,12 @@ def start_worker(config, machines, app_vars, get_starttime=False):
         return start_worker_baremetal(config, machines, app_vars)
 
     # For non-mist/baremetal deployments
+    # Follow the status of all pods from before they are launched, so no transition is missed.
+    # The tracker keeps running until the pods are finished, see wait_worker_completion()
+    tracker = PodTracker(config, machines)
+    tracker.start()
+    config["pod_tracker"] = tracker
+
     starttime, kubectl_output = start_worker_kube(config, machines, app_vars, get_starttime)
     status = wait_worker_ready(config, machines, get_starttime)
     return starttime, kubectl_output, status
@@ -350,94 +384,26 @@ def wait_worker_ready(config, machines, get_starttime):
     else:
         # Otherwise, we have 1 pod per application
         if config["mode"] == "cloud":
-            worker_apps = (config["infrastructure"]["cloud_nodes"] - 1) * config["benchmark"][
-                "applications_per_worker"
-            ]
+            worker_apps = get_cloud_workers(config) * config["benchmark"]["applications_per_worker"]
         elif config["mode"] == "edge":
             worker_apps = (
                 config["infrastructure"]["edge_nodes"]
                 * config["benchmark"]["applications_per_worker"]
             )
 
-    status = []
-    while True:
-        # Get the list of all pods
-        command = (
-            "\"date +'%s.%N'; kubectl get pods "
-            + '-o=custom-columns=NAME:.metadata.name,STATUS:.status.phase --sort-by=.spec.nodeName"'
-        )
-        output, error = machines[0].process(
-            config, command, shell=True, ssh=config["cloud_ssh"][0]
-        )[0]
-
-        start_t = float(output[0])
-        output = output[1:]
-
-        # No pods are yet shown in the 'kubectl get pods' command
-        if error and any("couldn't find any field with path" in line for line in error):
-            continue
-
-        # Real crash
-        if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-            logging.error("".join(error))
-            sys.exit()
-
-        # Loop over all pods, check status, and create a list of all current statuses
-        # Possible status:
-        # - Pending
-        # - Running
-        # - Succeeded
-        # - Failed
-        # - Unknown
-        # - ContainerCreating
-        # - Arriving (not yet shown up in kubectl)
-        status_entry = {
-            "time_orig": start_t,
-            "time": start_t,
-            "Arriving": 0,
-            "Pending": 0,
-            "ContainerCreating": 0,
-            "Running": 0,
-            "Succeeded": 0,
-        }
-
-        # The first couple of lines may have custom prints
-        offset = 0
-        for offset, o in enumerate(output):
-            if "NAME" in o and "STATUS" in o:
-                break
-
-        for line in output[1 + offset :]:
-            # Some custom output may appear afterwards - ignore
-            if "CONTINUUM" in line:
-                break
-
-            l = line.rstrip().split(" ")
-            app_name = l[0]
-            app_status = l[-1]
-
-            if app_status in ["Failed", "Unknown", "ErrImageNeverPull"]:
-                logging.error(
-                    'Container on cloud/edge %s has status %s, expected "Pending" or "Running"',
-                    app_name,
-                    app_status,
-                )
-                sys.exit()
-
-            status_entry[app_status] += 1
-
-        pods_in_system = (
-            status_entry["Pending"]
-            + status_entry["Running"]
-            + status_entry["Succeeded"]
-            + status_entry["ContainerCreating"]
-        )
-        status_entry["Arriving"] = worker_apps - pods_in_system
-        status.append(status_entry)
-
-        # Stop if all statuses are running or succeeded
-        if status_entry["Running"] + status_entry["Succeeded"] == worker_apps:
-            break
+    # Possible status:
+    # - Pending
+    # - ContainerCreating
+    # - Running
+    # - Succeeded
+    # - Arriving (not yet shown up in the watch stream)
+    # Pods with status Failed, Unknown, or an image pull error crash the framework
+    tracker = config["pod_tracker"]
+    tracker.wait(
+        lambda counts: counts["Running"] + counts["Succeeded"] == worker_apps,
+        "all pods have status Running or Succeeded",
+    )
+    status = tracker.status(worker_apps)
 
     if get_starttime:
         # Normalize time
@@ -464,6 +430,13 @@ def launch_with_starttime(config, machines):
     """
     starttime = 0.0
 
+    if (
+        "kube_deployment" in config["benchmark"]
+        and config["benchmark"]["kube_deployment"] == "bulk"
+    ):
+        # Option "bulk" timestamps every job itself, so no kubectl output has to be parsed
+        return bulk_submit(config, machines)
+
     if (
         "kube_deployment" in config["benchmark"]
         and config["benchmark"]["kube_deployment"] == "file"
@@ -506,15 +479,10 @@ def launch_with_starttime(config, machines):
         sys.exit()
 
     # Parse all kubectl output and put it in a flat list
-    kubectl_output = []
-    for e in error:
-        if "[CONTINUUM]" in e:
-            time_obj, line = parse_custom_kubernetes_splits(e)
-            if time_obj is False:
-                logging.debug("Couldn't properly parse line: %s", line)
-                continue
-
-            kubectl_output.append([time_obj, line])
+    prints = parse_custom_kubernetes_prints(
+        [e for e in error if "[CONTINUUM]" in e], component="kubectl"
+    )
+    kubectl_output = [list(entry) for entry in zip(prints["time_ns"] / 10**9, prints["line"])]
 
     # Only print "0401" has a job= string attached. We want this job= attached to a 0400
     # and a 0402 as well for ordering later. The entire list of 0400/0401/0402 is already
@@ -570,6 +538,69 @@ def launch_with_starttime(config, machines):
     return starttime, kubectl_output_updated
 
 
+def bulk_submit(config, machines):
+    """Submit all job files on the cloud controller concurrently, straight to the apiserver.
+    kubectl has no client-side QPS/burst options and one process per job gets throttled, so
+    bulk_submit.py uses a pool of keep-alive connections, a token bucket, and an arrival rate.
+    See resource_manager/kubecontrol/cloud/bulk_submit.py.
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+
+    Returns:
+        (float): Time the submission started on the cloud controller
+        (list(list(float, str))): Time and line of each 0400/0401/0402 print, like "0401 job=X"
+    """
+    rate = config["benchmark"]["bulk_rate"]
+    step = 0
+    ramp = 0.0
+
+    # The churn mode of the empty application ramps up the arrival rate in steps
+    if config["benchmark"].get("churn_rate", 0.0) > 0.0:
+        rate = config["benchmark"]["churn_rate"]
+        step = config["benchmark"]["churn_duration"]
+        ramp = config["benchmark"]["churn_ramp"]
+
+    home = "/home/%s" % (machines[0].cloud_controller_names[0])
+    command = (
+        "python3 %s/bulk_submit.py -c %i --qps %s --burst %i -b %i -r %s -s %i --ramp %s %s/jobs"
+        % (
+            home,
+            config["benchmark"]["bulk_concurrency"],
+            config["benchmark"]["bulk_qps"],
+            config["benchmark"]["bulk_burst"],
+            config["benchmark"]["bulk_batch"],
+            rate,
+            step,
+            ramp,
+            home,
+        )
+    )
+
+    output, error = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])[0]
+
+    # Custom prints and warnings, like those of SSH, are not fatal
+    ignore = ["[continuum]", "due to client-side throttling", "warning"]
+    error = [l for l in error if not any(x in l.lower() for x in ignore)]
+    if error or len(output) < 2:
+        logging.error("Could not deploy pods: %s", "".join(output))
+        logging.error("With error: %s", "".join(error))
+        sys.exit()
+
+    kubectl_output = []
+    for line in output[1:]:
+        t, code = line.strip().split(" ", 1)
+        kubectl_output.append([int(t) / 10**9, code])
+
+    sends = sum(1 for _, line in kubectl_output if line.startswith("0401"))
+    logging.info(
+        "Submitted %i jobs in %.2f seconds", sends, kubectl_output[-1][0] - int(output[0]) / 10**9
+    )
+
+    return int(output[0]) / 10**9, kubectl_output
+
+
 def start_worker_kube(config, machines, app_vars, get_starttime):
     """Start the MQTT subscriber application on cloud / edge workers.
     Submit the job request to the cloud controller, which automatically starts it on the cluster.
@@ -589,9 +620,7 @@ def start_worker_kube(config, machines, app_vars, get_starttime):
 
     # Set parameters based on mode
     if config["mode"] == "cloud":
-        worker_apps = (config["infrastructure"]["cloud_nodes"] - 1) * config["benchmark"][
-            "applications_per_worker"
-        ]
+        worker_apps = get_cloud_workers(config) * config["benchmark"]["applications_per_worker"]
     elif config["mode"] == "edge":
         worker_apps = (
             config["infrastructure"]["edge_nodes"] * config["benchmark"]["applications_per_worker"]
@@ -853,6 +882,49 @@ def start_worker_baremetal(config, machines, app_vars):
     return [cont_name]
 
 
+def start_churn(config, machines, app_vars):
+    """Start a continuous stream of jobs that are deleted once finished, see churn_rate.
+    Unlike start_worker(), we don't wait for all pods to run at the same time, as they never do.
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+        app_vars (dict): Dictionary of variables for a specific app, with the number of jobs
+
+    Returns:
+        (float): Time the submission started on the cloud controller
+        (list(list(float, str))): Time and line of each 0400/0401/0402 print, like "0401 job=X"
+    """
+    tracker = PodTracker(config, machines)
+    tracker.start()
+    config["pod_tracker"] = tracker
+
+    return start_worker_kube(config, machines, app_vars, True)
+
+
+def wait_churn_completion(config, jobs):
+    """Wait until the pods of all churn jobs have finished and are deleted
+
+    Args:
+        config (dict): Parsed configuration
+        jobs (int): Number of submitted jobs, each with one pod
+
+    Returns:
+        (list(dict)): Status of all pods at each transition
+        (dict(dict)): Transition times per pod, see PodTracker.transitions()
+    """
+    logging.info("Wait for all churn pods to finish and be deleted")
+    tracker = config["pod_tracker"]
+    tracker.wait(
+        lambda counts: len(tracker.observed) >= jobs and sum(counts.values()) == 0,
+        "all churn pods are deleted",
+    )
+    tracker.stop()
+    config["pod_tracker"] = None
+
+    return tracker.status(0), tracker.transitions()
+
+
 def wait_worker_completion(config, machines):
     """Wait for all containers to be finished running the benchmark on cloud/edge workers
 
@@ -861,57 +933,20 @@ def wait_worker_completion(config, machines):
         machines (list(Machine object)): List of machine objects representing physical machines
     """
     logging.info("Wait for pods on cloud/edge workers to finish")
-    get_list = True
-    i = 0
 
-    workers = config["infrastructure"]["cloud_nodes"] + config["infrastructure"]["edge_nodes"]
-    if config["mode"] == "cloud" or config["mode"] == "edge":
-        # If there is a control machine, dont count that one in
-        controllers = sum(m.cloud_controller for m in machines)
-        workers -= controllers
-
-    # On the cloud controller, check the status of each pod, and wait until finished
-    while i < workers:
-        # Get the list of deployed pods
-        if get_list:
-            command = [
-                "kubectl",
-                "get",
-                "pods",
-                "-o=custom-columns=NAME:.metadata.name,STATUS:.status.phase",
-                "--sort-by=.spec.nodeName",
-            ]
-            output, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
+    # The tracker is started in start_worker(), but not every flow calls that
+    tracker = config.get("pod_tracker")
+    if tracker is None:
+        tracker = PodTracker(config, machines)
+        tracker.start()
 
-            if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-                logging.error("".join(error))
-                sys.exit()
-
-        # The first couple of lines may have custom prints
-        offset = 0
-        for offset, o in enumerate(output):
-            if "NAME" in o and "STATUS" in o:
-                break
-
-        # Parse list, get status of app i
-        line = output[i + 1 + offset].rstrip().split(" ")
-        app_name = line[0]
-        app_status = line[-1]
-
-        # Check status of app i
-        if app_status == "Running":
-            time.sleep(5)
-            get_list = True
-        elif app_status == "Succeeded":
-            i += 1
-            get_list = False
-        else:
-            logging.error(
-                "ERROR: Container on cloud/edge %s has status %s, expected Running or Succeeded",
-                app_name,
-                app_status,
-            )
-            sys.exit()
+    tracker.wait(
+        lambda counts: counts["Succeeded"] > 0
+        and counts["Pending"] + counts["ContainerCreating"] + counts["Running"] == 0,
+        "all pods have status Succeeded",
+    )
+    tracker.stop()
+    config["pod_tracker"] = None
 
 
 def get_worker_output(config, machines, container_names=None, get_description=False):
@@ -938,122 +973,217 @@ def get_worker_output_kube(config, machines, get_description):
     Args:
         config (dict): Parsed configuration
         machines (list(Machine object)): List of machine objects representing physical machines
-        get_description (bool): Also output an extensive description of all pod properties
+        get_description (bool): Return an index of all pods and containers instead of output
 
     Returns:
         list(list(str)): Output of each container ran on the cloud / edge
+        OR
+        list(dict): Index of all pods, see get_pod_index()
     """
     logging.info("Gather output from subscribers")
 
-    # Get list of pods
-    command = [
-        "kubectl",
-        "get",
-        "pods",
-        "-o=custom-columns=NAME:.metadata.name,STATUS:.status.phase",
-        "--sort-by=.spec.nodeName",
-    ]
-    output, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
+    client = kube_api.get_client(config, machines)
+    pods = client.pods()
 
-    if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-        logging.error("".join(error))
-        sys.exit()
+    # Check if there is only 1 container per pod or multiple - requires different approach
+    # We treat every container as an entity - no matter if there are multiple in a pod
+    sub_pods_mode = False
+    sub_pods = 1
+    if (
+        "kube_deployment" in config["benchmark"]
+        and config["benchmark"]["kube_deployment"] == "container"
+    ):
+        # This deployment has all containers in 1 pod
+        # Assume cloud mode
+        sub_pods_mode = True
+        sub_pods = get_cloud_workers(config) * config["benchmark"]["applications_per_worker"]
+
+    if get_description:
+        # Clock offsets are measured per VM, so also store which VM each pod ran on
+        index = get_pod_index(pods)
+        for pod in index:
+            pod["vm"] = get_node_vm(config, pod["node"])
+
+        return index
+
+    # Loop through every sub-container in each pod
+    targets = []
+    for pod in pods:
+        name = pod["metadata"]["name"]
+        for i in range(1, sub_pods + 1):
+            # Sub-pods-mode requires the name of the container to be appended
+            if sub_pods_mode:
+                targets.append((name, "empty-%i" % (i)))
+            else:
+                targets.append((name, None))
 
-    # The first couple of lines may have custom prints
-    offset = 0
-    for offset, o in enumerate(output):
-        if "NAME" in o and "STATUS" in o:
-            break
+    # Get the logs straight from the nodes the pods ran on
+    logs = get_pod_logs(config, machines, pods)
 
-    # Gather commands to get logs
-    commands = []
-    pods = []
-    for line in output[1 + offset :]:
-        # Some custom output may appear afterwards - ignore
-        if "CONTINUUM" in line:
-            break
+    # For worker output, you need to know to what pod it is related
+    worker_output = []
+    for pod, container in targets:
+        containers = logs.get(pod, {})
+        if container is None:
+            # Pods with a single container
+            lines = next(iter(containers.values()), [])
+        else:
+            lines = containers.get(container, [])
+            pod = "%s %s" % (pod, container)
 
-        pod = line.split(" ")[0]
+        worker_output.append([pod, lines])
 
-        # Check if there is only 1 container per pod or multiple - requires different approach
-        # We treat every container as an entity - no matter if there are multiple in a pod
-        sub_pods_mode = False
-        sub_pods = 1
-        if (
-            "kube_deployment" in config["benchmark"]
-            and config["benchmark"]["kube_deployment"] == "container"
-        ):
-            # This deployment has all containers in 1 pod
-            # This requires special parsing
-            # There is only 1 line in "kubectl get pods", but you can get sub-output anyway
-
-            # Assume cloud mode
-            sub_pods_mode = True
-            sub_pods = (config["infrastructure"]["cloud_nodes"] - 1) * config["benchmark"][
-                "applications_per_worker"
-            ]
+    return worker_output
 
-        # Loop through every sub-container in the single pod
-        if get_description:
-            # Will be identical between containers - per pod level
-            command = ["kubectl", "get", "pod", pod, "-o", "yaml"]
-            for _ in range(sub_pods):
-                commands.append(command)
-                pods.append(pod)
-        else:
-            for i in range(1, sub_pods + 1):
-                # Sub-pods-mode requires the name of the container to be appended
-                if sub_pods_mode:
-                    container = pod + " empty-%i" % (i)
-                else:
-                    container = pod
-
-                command = ["kubectl", "logs", "--timestamps=true", container]
-                commands.append(command)
-                pods.append(container)
-
-    # Append commands into 1 big command
-    big_command = '"'
-    for command in commands:
-        com = " ".join(command) + ";"
-        big_command += com
-        big_command += 'echo "DELIMITER01234";'
-
-    big_command += '"'
-
-    # Get the logs
-    output, error = machines[0].process(
-        config, big_command, ssh=config["cloud_ssh"][0], shell=True
-    )[0]
-
-    # Check error
-    if (error and not all("[CONTINUUM]" in l for l in error)) or not output:
-        logging.error("Container %i: %s", i, "".join(error))
-        sys.exit()
 
-    logging.debug("Assign output to correct pod/container")
+def get_pod_index(pods):
+    """Index the properties of all pods and their containers needed for analysis.
+    Built from one paginated list of all pods, instead of a description per pod.
 
-    # Split based on custom delimiter, and group output per pod
-    worker_output = []
-    entry = []
-    i = 0
-    for line in output:
-        line = line.rstrip()
-        if "DELIMITER01234" in line:
-            if get_description:
-                e = entry
-            else:
-                # For worker output, you need to know to what pod it is related
-                # We dont/cant distinct between containers, but assume correct ordering
-                e = [pods[i], entry]
-                i += 1
+    Args:
+        pods (list(dict)): Pod objects as returned by the Kubernetes API
 
-            worker_output.append(e)
-            entry = []
-        else:
-            entry.append(line)
+    Returns:
+        list(dict): Per pod its name, node, phase, creation and condition timestamps,
+                    and per container its name, ID, and start/finish timestamps
+    """
+    index = []
+    for pod in pods:
+        status = pod["status"]
+
+        containers = []
+        for container in status.get("containerStatuses", []):
+            state = container.get("state", {})
+            state = state.get("terminated", state.get("running", {}))
+            containers.append(
+                {
+                    "name": container["name"],
+                    "id": container.get("containerID", "").split("://")[-1],
+                    "started": to_epoch(state.get("startedAt")),
+                    "finished": to_epoch(state.get("finishedAt")),
+                }
+            )
 
-    return worker_output
+        index.append(
+            {
+                "name": pod["metadata"]["name"],
+                "node": pod["spec"].get("nodeName"),
+                "phase": status.get("phase"),
+                "created": to_epoch(pod["metadata"].get("creationTimestamp")),
+                "conditions": {
+                    c["type"]: to_epoch(c.get("lastTransitionTime"))
+                    for c in status.get("conditions", [])
+                },
+                "containers": containers,
+            }
+        )
+
+    return index
+
+
+def get_pod_logs(config, machines, pods, namespace="default"):
+    """Get the logs of all containers in the given pods, read from /var/log/pods on each node.
+    All nodes are read in parallel, and logs are compressed before being sent to the host.
+    Equivalent to 'kubectl logs --timestamps=true' per container, without the apiserver.
+
+    Args:
+        config (dict): Parsed configuration
+        machines (list(Machine object)): List of machine objects representing physical machines
+        pods (list(dict)): Pod objects as returned by the Kubernetes API
+        namespace (str, optional): Namespace of the pods. Defaults to "default".
+
+    Returns:
+        dict(dict(list(str))): Log lines per container per pod
+    """
+    vms = set(get_node_vm(config, pod["spec"].get("nodeName")) for pod in pods)
+    ssh_nodes = [s for s in config["cloud_ssh"] + config["edge_ssh"] if s.split("@")[0] in vms]
+    if not ssh_nodes:
+        return {}
+
+    logging.debug("Collect pod logs from %i nodes", len(ssh_nodes))
+
+    # Pod log directories are named <namespace>_<pod>_<uid>
+    command = (
+        "\"cd /var/log/pods && sudo find . -maxdepth 1 -name '%s_*' -print0 "
+        + '| sudo tar -czf - --null -T - | base64 -w0"'
+    ) % (namespace)
+    results = machines[0].process(config, command, shell=True, ssh=ssh_nodes)
+
+    names = set(pod["metadata"]["name"] for pod in pods)
+    logs = {}
+    for ssh, (output, error) in zip(ssh_nodes, results):
+        if error and not all("[CONTINUUM]" in l for l in error):
+            logging.error("Could not get pod logs from %s: %s", ssh, "".join(error))
+            sys.exit()
+
+        data = base64.b64decode("".join(line.strip() for line in output))
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            files = {}
+            for member in tar.getmembers():
+                # Path: ./<namespace>_<pod>_<uid>/<container>/<restart>.log[.<rotation>][.gz]
+                parts = member.name.split("/")
+                if not member.isfile() or len(parts) != 4:
+                    continue
+
+                pod = parts[1][len(namespace) + 1 :].rsplit("_", 1)[0]
+                if pod not in names:
+                    continue
+
+                content = tar.extractfile(member).read()
+                if member.name.endswith(".gz"):
+                    content = gzip.decompress(content)
+
+                files.setdefault((pod, parts[2]), []).append((parts[3], content))
+
+        for (pod, container), entries in files.items():
+            # Order by restart, with rotated files (<restart>.log.<date>) before the live log
+            entries.sort(key=lambda e: (int(e[0].split(".")[0]), e[0].endswith(".log"), e[0]))
+            content = b"".join(c for _, c in entries).decode("utf-8", errors="replace")
+            logs.setdefault(pod, {})[container] = parse_cri_log(content.splitlines())
+
+    return logs
+
+
+def parse_cri_log(lines):
+    """Convert container logs in the CRI format used in /var/log/pods to 'kubectl logs' format.
+    Long lines are split by the container runtime into partial lines, which we merge again.
+
+    Example CRI line:
+    2023-08-24T22:23:21.269974123Z stdout F Start connecting with the MQTT broker
+
+    Args:
+        lines (list(str)): Lines from a CRI log file
+
+    Returns:
+        list(str): Log lines with a timestamp prefix, like 'kubectl logs --timestamps=true'
+    """
+    output = []
+    partial = ""
+    partial_time = None
+    for line in lines:
+        fields = line.split(" ", 3)
+        if len(fields) < 3:
+            continue
+
+        timestamp, _, tag = fields[:3]
+        message = fields[3] if len(fields) == 4 else ""
+
+        if tag == "P":
+            if partial_time is None:
+                partial_time = timestamp
+
+            partial += message
+            continue
+
+        if partial_time is not None:
+            timestamp = partial_time
+            message = partial + message
+            partial = ""
+            partial_time = None
+
+        output.append(("%s %s" % (timestamp, message)).rstrip())
+
+    return output
 
 
 def get_worker_output_mist(config, machines, container_names):
@@ -1098,6 +1228,72 @@ def get_worker_output_mist(config, machines, container_names):
     return worker_output
 
 
+# Collect [CONTINUUM] prints of Kubernetes components on a node, between two epoch timestamps.
+# Kubelet prints come from journald, control plane prints from the static pod logs.
+# The journald cursor and the byte offset per log file are saved on the node, so harvesting
+# again on a reused cluster only reads log data that was written since the last harvest.
+# Output: one "<component> <line>" per print, also appended to /var/log/continuum/continuum.txt,
+# sent gzip compressed and base64 encoded.
+HARVEST_SCRIPT = r"""
+start=$1
+end=$2
+state=/var/log/continuum
+mkdir -p $state
+
+{
+    cursor=$state/kubelet.cursor
+    if [ -s $cursor ]; then
+        journalctl -u kubelet --no-pager -o cat --cursor-file=$cursor --until @$end
+    else
+        journalctl -u kubelet --no-pager -o cat --cursor-file=$cursor --since @$start --until @$end
+    fi | grep -iF '[continuum]' | sed 's/^/kubelet /'
+
+    for f in /var/log/pods/kube-system_kube-*/*/*.log /var/log/hollow/kubelet/*.log; do
+        [ -f "$f" ] || continue
+
+        # Container directory kube-apiserver -> component apiserver
+        comp=$(basename $(dirname "$f"))
+        comp=${comp#kube-}
+
+        size=$(stat -c %s "$f")
+        inode=$(stat -c %i "$f")
+        offsets=$state/$(echo "$f" | md5sum | cut -c1-32)
+
+        offset=0
+        old_inode=0
+        [ -f $offsets ] && read offset old_inode < $offsets
+
+        # The log file was rotated
+        if [ "$inode" != "$old_inode" ] || [ "$size" -lt "$offset" ]; then
+            offset=0
+        fi
+
+        tail -c +$((offset + 1)) "$f" | head -c $((size - offset)) \
+            | grep -iF '[continuum]' | sed "s/^/$comp /"
+        echo "$size $inode" > $offsets
+    done
+} | awk -v s=$start -v e=$end '{
+    if (match($0, /int64=[0-9]+/)) {
+        t = substr($0, RSTART + 6, RLENGTH - 6) / 1e9
+        if (t >= s && t <= e) print
+    }
+}' | tee -a $state/continuum.txt | gzip -c | base64 -w0
+"""
+
+
+# Custom print from our Kubernetes build, with the print after [CONTINUUM] and its code
+CUSTOM_PRINT = re.compile(
+    r"int64=(?P<time_ns>\d+)\)\s+\[CONTINUUM\]\s+(?P<line>(?P<code>\S+).*?)\s*$"
+)
+
+# Tags in custom prints that tell to which object a print belongs
+CUSTOM_PRINT_TAGS = {
+    "pod": re.compile(r"pod=(?:default/)?(\S+)"),
+    "container": re.compile(r"container=(?:default/)?(\S+)"),
+    "job": re.compile(r"job=(?:default/)?(\S+)"),
+}
+
+
 def get_control_output(config, machines, starttime, status):
     """Get output from Kubernetes control plane components, used to create detailed timeline
 
@@ -1106,174 +1302,129 @@ def get_control_output(config, machines, starttime, status):
         machines (list(Machine object)): List of machine objects representing physical machines
         starttime (datetime): Invocation time of kubectl apply command that launches the benchmark
         status (list(list(str))): Status of started Kubernetes pods over time
-        worker_description (list(list(str))): Extensive description of each container
+        worker_description (list(dict)): Index of all pods and containers
 
     Returns:
         dict: Parsed output from control plane components
     """
     logging.info("Collect and parse output from Kubernetes controlplane components")
 
-    # Save custom output in file so you can read it later if needed
-    # For control plane
-    command = """\"cd /var/log && \
-        sudo su -c \\\"grep -ri --exclude continuum.txt '\[continuum\]' > continuum.txt\\\"\""""
-    results = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0])
-
-    # For worker nodes
-    if len(config["cloud_ssh"]) > 1:
-        command = """\"sudo su -c \\\"journalctl -u kubelet | \
-            grep -i '\[continuum\]' > /var/log/continuum.txt\\\"\""""
-        results += machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][1:])
-
-    for _, error in results:
-        if error:
-            logging.error("".join(error))
-            sys.exit()
+    # Only harvest prints around the benchmark. Use a one hour margin, as we correct for time zone
+    # differences of up to an hour below.
+    endtime = status[-1]["time_orig"]
+    window_start = int(starttime) - 3600
+    window_end = int(endtime) + 3600
 
-    # Save pods output - it may get overwritten later on
-    command = """\"cd /var/log && \
-        sudo cp -r pods pods-continuum\""""
+    # Harvest all nodes in parallel. Every node filters and compresses its own logs.
+    script = base64.b64encode(HARVEST_SCRIPT.encode("utf-8")).decode("utf-8")
+    command = '"echo %s | base64 -d | sudo bash -s %i %i"' % (script, window_start, window_end)
     results = machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"])
 
-    for _, error in results:
-        if error:
-            logging.error("".join(error))
-            sys.exit()
-
-    # Get output from each cloud node
     outputs = []
-    for ssh in zip(config["cloud_ssh"]):
-        command = ["sudo", "cat", "/var/log/continuum.txt"]
-        output, error = machines[0].process(config, command, ssh=ssh)[0]
-
+    for ssh, (output, error) in zip(config["cloud_ssh"], results):
         if error:
-            logging.error("".join(error))
+            logging.error("Could not harvest logs from %s: %s", ssh, "".join(error))
             sys.exit()
 
-        outputs.append(output)
+        data = base64.b64decode("".join(line.strip() for line in output))
+        outputs.append(gzip.decompress(data).decode("utf-8", errors="replace").splitlines())
 
-    # Parse output, filter per component, get timestamp and custom output
+    # Parse output of all nodes at once, filter per component, get timestamp and custom output
     components = ["kubelet", "scheduler", "apiserver", "proxy", "controller-manager"]
-    parsed = {}
-
-    for ssh, output in zip(config["cloud_ssh"], outputs):
-        name = ssh.split("@")[0]
-        parsed[name] = {}
-
-        for line in output:
-            line = line.strip()
-
-            # Split per Kubernetes controlplane component
-            comp = ""
-            for c in components:
-                if c in line:
-                    comp = c
-                    break
-
-            if comp == "":
-                logging.debug("[WARNING] No component in line: %s", line)
-                continue
-
-            if comp not in parsed[name]:
-                parsed[name][comp] = []
+    df = pd.concat(
+        [
+            parse_custom_kubernetes_prints(output, node=ssh.split("@")[0])
+            for ssh, output in zip(config["cloud_ssh"], outputs)
+        ],
+        ignore_index=True,
+    )
+    df = df[df["component"].isin(components)]
 
-            time_obj, line = parse_custom_kubernetes_splits(line)
-            if time_obj is False:
-                logging.debug("Couldn't properly parse line: %s", line)
-                continue
+    # There may be time zone differences between timestamps
+    # We assume no 2 prints differ by more than 1 hour: move all prints to the hour after start
+    start_ns = int(round(starttime * 10**9))
+    end_ns = int(round(endtime * 10**9))
+    ns_per_hour = 3600 * 10**9
+    df["time_ns"] = start_ns + (df["time_ns"] - start_ns - 1) % ns_per_hour + 1
 
-            parsed[name][comp].append([time_obj, line])
+    # Every component that printed anything gets an entry, even if no print is in the interval
+    parsed_copy = {ssh.split("@")[0]: {} for ssh in config["cloud_ssh"]}
+    for node, component in df[["node", "component"]].drop_duplicates().itertuples(index=False):
+        parsed_copy[node][component] = []
 
     # Now filter out everything before starttime and after endtime
-    # Starttime and endtime are both in 192031029309.1230910293 format
-    endtime = status[-1]["time_orig"]
-    parsed_copy = {}
-    for node, output in parsed.items():
-        parsed_copy[node] = {}
-        for component, out in output.items():
-            parsed_copy[node][component] = []
-            for entry in out:
-                # There may be time zone differences between timestamps
-                # We assume no 2 prints differ by more than 1 hour
-                seconds_per_hour = float(3600)
-                while entry[0] - starttime < seconds_per_hour:
-                    entry[0] += seconds_per_hour
-
-                while entry[0] - starttime > seconds_per_hour:
-                    entry[0] -= seconds_per_hour
-
-                # Now check for time interval
-                if entry[0] >= starttime and entry[0] <= endtime:
-                    parsed_copy[node][component].append(entry)
+    df = df[df["time_ns"] <= end_ns]
+    for (node, component), group in df.groupby(["node", "component"], sort=False):
+        parsed_copy[node][component] = [
+            list(entry) for entry in zip(group["time_ns"] / 10**9, group["line"])
+        ]
 
     return parsed_copy, endtime
 
 
-def parse_custom_kubernetes_splits(line):
-    """Parse lines from Kubernetes custom output, like:
-    I0824 22:23:21.269974    5026 kubectl.go:32] %!s(int64=1692908601269961032) [CONTINUUM] 0400\n
+def parse_custom_kubernetes_prints(lines, node="", component=None):
+    """Parse lines from Kubernetes custom output in bulk, like:
+    I0824 22:23:21.269974    5026 kubectl.go:32] %!s(int64=1692908601269961032) [CONTINUUM] 0400
 
-    To: 1692908601.269961032, 0400
+    To: time_ns=1692908601269961032, code=0400, line="0400"
+    Timestamps are kept as integer nanoseconds, so no precision is lost.
 
     Args:
-        line (str): Line to parse
+        lines (list(str)): Lines to parse
+        node (str, optional): Node the lines come from. Defaults to "".
+        component (str, optional): Component the lines come from. Defaults to None, in which case
+            each line should start with the component, like "kubelet I0824 22:23:21.269974 ..."
 
     Returns:
-        (float, str): timestamp, output line
+        (DataFrame): One row per parsed print, with columns node, component, code, pod,
+            container, job, time_ns, and line (the print after [CONTINUUM])
     """
-    # For each line, get timestamp and unique print
-    line = line.strip()
-    line_split = line.split(" ")
-
-    try:
-        index = line_split.index("[CONTINUUM]")
+    columns = ["node", "component", "code", "pod", "container", "job", "time_ns", "line"]
+    if not lines:
+        return pd.DataFrame(columns=columns).astype({"time_ns": "int64"})
+
+    lines = pd.Series(lines, dtype="object").str.strip()
+    if component is None:
+        split = lines.str.split(" ", n=1, expand=True).reindex(columns=[0, 1])
+        component = split[0]
+        lines = split[1].fillna("")
+
+    df = lines.str.extract(CUSTOM_PRINT)
+    df["node"] = node
+    df["component"] = component
+
+    failed = df["time_ns"].isna()
+    if failed.any():
+        logging.debug(
+            "Couldn't properly parse %i lines, like: %s", failed.sum(), lines[failed].iloc[0]
+        )
+        df = df[~failed]
 
-        # Example: "%!s(int64=1679583342891810186)"
-        time_str = line_split[index - 1]
-        time_str = time_str.split("=")[1][:-1]
-        time_obj_nano = float(time_str)
-        time_obj = time_obj_nano / 10**9
-    except Exception as e:
-        logging.debug("[WARNING][%s] Could not parse line: %s", str(e), line)
-        return False, False
+    df["time_ns"] = df["time_ns"].astype("int64")
+    for tag in ["pod", "container", "job"]:
+        df[tag] = df["line"].str.extract(CUSTOM_PRINT_TAGS[tag], expand=False)
 
-    line = line.split("[CONTINUUM] ")[1]
-    return time_obj, line
+    return df[columns].reset_index(drop=True)
 
 
-def start_resource_metrics(config, machines):
-    """Start the resource metrics server by hand
+def start_resource_metrics(config, _machines):
+    """Start the resource metrics collectors on all cloud VMs, streaming to the host
 
     Args:
         config (dict): Parsed configuration
         machines (list(Machine object)): List of machine objects representing physical machines
     """
-    logging.info("Launch metric server")
+    logging.info("Launch resource metric collectors")
 
-    # First wait for metrics api to be available
-    command = ["kubectl", "top", "nodes"]
-    while True:
-        _, error = machines[0].process(config, command, ssh=config["cloud_ssh"][0])[0]
+    config["resource_receivers"] = []
+    for ssh in config["cloud_ssh"]:
+        receiver = ResourceReceiver(config, ssh)
+        receiver.start()
+        config["resource_receivers"].append(receiver)
 
-        if error and not all("[CONTINUUM]" in l for l in error):
-            logging.debug("Wait for metric-server to come online")
-            time.sleep(5)
-        else:
-            break
 
-    # Now that the api server is up, launch the script to gather data
-    command = "\"bash -c 'nohup python3 -u resource_usage.py -v > resource_usage.txt 2>&1 &'\""
-    machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"][0], wait=False)
-
-    # Now launch the other scripts to get OS resource usage -> on all machines
-    command = (
-        "\"bash -c 'nohup python3 -u resource_usage_os.py -v > resource_usage_os.txt 2>&1 &'\""
-    )
-    machines[0].process(config, command, shell=True, ssh=config["cloud_ssh"], wait=False)
-
-
-def get_resource_output(config, machines, starttime, endtime):
-    """Get the resource usage data from .csv files from VMs and parse it
+def get_resource_output(config, _machines, starttime, endtime):
+    """Stop the resource metrics collectors, and parse the data they streamed to the host
 
     Args:
         config (dict): Parsed configuration
@@ -1282,50 +1433,111 @@ def get_resource_output(config, machines, starttime, endtime):
         endtime (datetime): Time at which the final application is deployed
 
     Returns:
-        (dataframe): Pandas dataframe with resource utilization metrics during our benchmrak deploym
+        (dataframe): Pandas dataframe with all resource utilization metrics on one time grid
     """
-    logging.info("Fetch the resource utilization data from the controlplane VM")
+    logging.info("Stop the resource metric collectors on the cloud VMs")
 
-    # Move the csv file from the VM to the host
-    command = [
-        "ansible-playbook",
-        "-i",
-        os.path.join(config["infrastructure"]["base_path"], ".continuum/inventory_vms"),
-        os.path.join(
-            config["infrastructure"]["base_path"],
-            ".continuum/cloud/resource_usage_back.yml",
-        ),
-    ]
+    for receiver in config["resource_receivers"]:
+        receiver.stop()
 
-    output, error = machines[0].process(config, command)[0]
+    config["resource_receivers"] = []
 
-    logging.debug("Check output for Ansible command [%s]", " ".join(command))
-    ansible.check_output((output, error))
+    frames = filter_metrics_kube(config, starttime, endtime)
+    frames += filter_metrics_os(config, starttime, endtime)
 
-    # Same, but for OS metrics
-    command = [
-        "ansible-playbook",
-        "-i",
-        os.path.join(config["infrastructure"]["base_path"], ".continuum/inventory_vms"),
-        os.path.join(
-            config["infrastructure"]["base_path"],
-            ".continuum/cloud/resource_usage_os_back.yml",
-        ),
-    ]
+    return align_metrics(config, frames, starttime, endtime)
 
-    output, error = machines[0].process(config, command)[0]
 
-    logging.debug("Check output for Ansible command [%s]", " ".join(command))
-    ansible.check_output((output, error))
+def get_node_label(vm_name):
+    """Get the short name of a VM used in resource metric columns: cloud0_user -> cloud0
+
+    Args:
+        vm_name (str): Name of the VM
+
+    Returns:
+        str: Short name of the VM
+    """
+    return vm_name.rsplit("_", 1)[0]
+
+
+def read_resource_usage(path, node, starttime, endtime):
+    """Read the binary output of the cgroup resource collector of one VM.
+    The collector saves counters, which we turn into rates between consecutive samples.
+    Records are ordered by time, so only the benchmark window is read from disk.
+
+    Args:
+        path (str): Path of the collector output, without the .bin/.idx extension
+        node (str): Name of the VM the collector ran on
+        starttime (float): Start of the window to read, in seconds on the VM clock
+        endtime (float): End of the window to read, in seconds on the VM clock
+
+    Returns:
+        (dataframe): Pandas dataframe with resource usage per cgroup per sample
+    """
+    with open(path + ".idx", "r", encoding="utf-8") as f:
+        names = dict(line.rstrip("\n").split("\t", 1) for line in f if line.strip())
+
+    data = np.zeros(0, dtype=RESOURCE_RECORD)
+    if os.path.getsize(path + ".bin") >= RESOURCE_RECORD.itemsize:
+        records = np.memmap(path + ".bin", dtype=RESOURCE_RECORD, mode="r")
+        start = np.searchsorted(records["time"], int(starttime * 10**9))
+        end = np.searchsorted(records["time"], int(endtime * 10**9), side="right")
+        data = np.array(records[start:end])
+
+    df = pd.DataFrame(data).sort_values(["id", "time"], kind="stable")
+
+    # Rates between consecutive samples of the same cgroup
+    new = df["id"].ne(df["id"].shift())
+    dt = df["time"].diff()
+    df["cpu"] = df["cpu"].astype(np.int64).diff() * 10**6 / dt
+    df["io_read"] = df["read"].astype(np.int64).diff() * 10**6 / dt
+    df["io_write"] = df["written"].astype(np.int64).diff() * 10**6 / dt
+    df = df[~new]
+
+    return pd.DataFrame(
+        {
+            "node": node,
+            "name": df["id"].astype(str).map(names),
+            "timestamp": df["time"] / 10**9,
+            "cpu": df["cpu"].astype(np.float32),
+            "memory": (df["memory"] / 2**20).astype(np.float32),
+            "io_read": df["io_read"].astype(np.float32),
+            "io_write": df["io_write"].astype(np.float32),
+        }
+    ).reset_index(drop=True)
+
 
-    df1 = filter_metrics_kube(config, starttime, endtime)
-    df2 = filter_metrics_os(config, starttime, endtime)
+def read_resource_usage_os(path, starttime, endtime):
+    """Read the csv output of the OS resource collector of one VM in chunks,
+    keeping only the benchmark window in memory
+
+    Args:
+        path (str): Path of the collector output
+        starttime (float): Start of the window to read, in seconds on the VM clock
+        endtime (float): End of the window to read, in seconds on the VM clock
+
+    Returns:
+        (dataframe): Pandas dataframe with resource usage per sample
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {column: np.float32 for column in header}
+    dtype["timestamp"] = np.int64
+
+    chunks = []
+    for chunk in pd.read_csv(path, dtype=dtype, chunksize=RESOURCE_CHUNK):
+        chunk = chunk.loc[
+            (chunk["timestamp"] >= int(starttime * 10**9))
+            & (chunk["timestamp"] <= int(endtime * 10**9))
+        ]
+        chunks.append(chunk)
 
-    return df1, df2
+    df = pd.concat(chunks, ignore_index=True)
+    df["timestamp"] = df["timestamp"] / 10**9
+    return df
 
 
 def filter_metrics_kube(config, starttime, endtime):
-    """Filter the metrics gathered via kubectl top
+    """Filter the metrics gathered from cgroups
 
     Args:
         config (dict): Parsed configuration
@@ -1333,26 +1545,60 @@ def filter_metrics_kube(config, starttime, endtime):
         endtime (datetime): Time at which the final application is deployed
 
     Returns:
-        (dataframe): Pandas dataframe with resource utilization metrics during our benchmrak deploym
+        list(list(str, dataframe)): Per VM name, a dataframe with its resource metrics
     """
     logging.debug("Filter kube metric stats")
 
-    # Now read the file via pandas and:
-    # - Only take the timestamps between the start and end of the benchmark
-    # - Offset these values compared to the start time of the benchmark (so row 1 starts near 0.0s)
-    path = os.path.join(config["infrastructure"]["base_path"], ".continuum/resource_usage.csv")
-    df = pd.read_csv(path)
-    df["timestamp"] = df["timestamp"] / 10**9
+    # Read a bit more than the benchmark on both ends, clocks of VMs may be slightly off
+    dfs = []
+    for vm_name in [vm_name.split("@")[0] for vm_name in config["cloud_ssh"]]:
+        path = os.path.join(
+            config["infrastructure"]["base_path"], ".continuum/resource_usage-%s" % (vm_name)
+        )
+        dfs.append(
+            read_resource_usage(
+                path, vm_name, starttime - RESOURCE_MARGIN, endtime + RESOURCE_MARGIN
+            )
+        )
 
-    # Disable warning generated by the lines below
-    pd.options.mode.chained_assignment = None
+    df = pd.concat(dfs, ignore_index=True)
 
-    # Take 1.0 second more on both ends so we can plot the t=0 and t=endtime points
-    df_filtered = df.loc[
-        (df["timestamp"] > (starttime - 1.0)) & (df["timestamp"] < (endtime + 1.0))
-    ]
-    df_filtered["timestamp"] -= starttime
-    return df_filtered
+    # Save the usage of every pod and component for analysis next to the other results
+    df.to_csv(
+        os.path.join("./logs", "%s_resources_cgroups.csv" % (config["timestamp"])),
+        index=False,
+        encoding="utf-8",
+    )
+
+    # Summarize as one column per node and control plane component, with CPU in millicores
+    # and memory in MiB like 'kubectl top'
+    frames = []
+    for vm_name in [vm_name.split("@")[0] for vm_name in config["cloud_ssh"]]:
+        node = df.loc[(df["node"] == vm_name) & (df["name"] == "node")]
+        label = get_node_label(vm_name)
+        frames.append(
+            [
+                vm_name,
+                node[["timestamp", "cpu", "memory"]].rename(
+                    columns={"cpu": label + "_cpu", "memory": label + "_memory"}
+                ),
+            ]
+        )
+
+    controller = config["cloud_ssh"][0].split("@")[0]
+    pods = df.loc[(df["node"] == controller) & df["name"].str.startswith("kube-system/")]
+    for component in ["etcd", "apiserver", "controller-manager", "scheduler"]:
+        usage = pods.loc[pods["name"].str.contains(component, regex=False)]
+        frames.append(
+            [
+                controller,
+                usage[["timestamp", "cpu", "memory"]].rename(
+                    columns={"cpu": component + "_cpu", "memory": component + "_memory"}
+                ),
+            ]
+        )
+
+    return frames
 
 
 def filter_metrics_os(config, starttime, endtime):
@@ -1364,35 +1610,72 @@ def filter_metrics_os(config, starttime, endtime):
         endtime (datetime): Time at which the final application is deployed
 
     Returns:
-        (dataframe): Pandas dataframe with resource utilization metrics during our benchmrak deploym
+        list(list(str, dataframe)): Per VM name, a dataframe with its resource metrics
     """
     logging.debug("Filter os metric stats")
 
-    # Gather all data from each VM first
-    dfs = []
+    frames = []
     for vm_name in [vm_name.split("@")[0] for vm_name in config["cloud_ssh"]]:
         path = os.path.join(
             config["infrastructure"]["base_path"], ".continuum/resource_usage_os-%s.csv" % (vm_name)
         )
-        df = pd.read_csv(path)
-        df["timestamp"] = df["timestamp"] / 10**9
+        df = read_resource_usage_os(path, starttime - RESOURCE_MARGIN, endtime + RESOURCE_MARGIN)
 
-        df_filtered = df.loc[
-            (df["timestamp"] > (starttime - 1.0)) & (df["timestamp"] < (endtime + 1.0))
-        ]
-        df_filtered["timestamp"] -= starttime
-        df_filtered.rename(
-            columns={
-                "timestamp": "Time (s)",
-                "cpu-used (%)": "cpu-used %s" % (vm_name) + " (%)",
-                "memory-used (%)": "memory-used %s" % (vm_name) + " (%)",
-            },
-            inplace=True,
-        )
+        # Add the VM name to every metric: cpu-used (%) -> cpu-used cloud0 (%)
+        label = get_node_label(vm_name)
+        columns = {}
+        for column in df.columns[1:]:
+            columns[column] = column.replace(" (", " %s (" % (label))
+
+        frames.append([vm_name, df.rename(columns=columns)])
+
+    return frames
+
+
+def align_metrics(config, frames, starttime, endtime):
+    """Merge the resource metrics of all VMs into one frame with a fixed time interval.
+    Timestamps of each VM are first corrected for its clock offset, then every grid point
+    takes the nearest sample of each metric, if there is one within the sampling interval.
+
+    Args:
+        config (dict): Parsed configuration
+        frames (list(list(str, dataframe))): Per VM name, a dataframe with its resource metrics
+        starttime (datetime): Invocation time of kubectl apply command that launches the benchmark
+        endtime (datetime): Time at which the final application is deployed
 
-        # Save with deep copy just to be safe
-        dfs.append(df_filtered.copy(deep=True))
+    Returns:
+        (dataframe): Pandas dataframe with a Time (s) column relative to the start of the
+                     benchmark, and one float32 column per metric per VM
+    """
+    logging.debug("Align resource metrics of all VMs on one time grid")
+
+    # The start and end of the benchmark are measured on the controller
+    model = config.get("clock")
+    controller = config["cloud_ssh"][0].split("@")[0]
+    start = clock.to_host(model, controller, starttime)
+    end = clock.to_host(model, controller, endtime)
+
+    # Take 1.0 second more on both ends so we can plot the t=0 and t=endtime points
+    grid = np.arange(-1.0, end - start + 1.0 + RESOURCE_INTERVAL / 2, RESOURCE_INTERVAL)
+    df_aligned = pd.DataFrame({"Time (s)": np.round(grid, 6) + 0.0})
+
+    for vm_name, df in frames:
+        if df.empty:
+            continue
+
+        df = df.copy()
+        df["Time (s)"] = clock.to_host(model, vm_name, df.pop("timestamp").to_numpy()) - start
+        df = df.sort_values("Time (s)")
+
+        # Only use samples that are close to the grid point
+        tolerance = RESOURCE_INTERVAL
+        if len(df) > 1:
+            tolerance = max(tolerance, float(np.median(np.diff(df["Time (s)"].to_numpy()))))
+
+        df_aligned = pd.merge_asof(
+            df_aligned, df, on="Time (s)", direction="nearest", tolerance=tolerance
+        )
 
-    # Now save in one big dataframe
-    df_final = pd.concat(dfs)
-    return df_final
+    columns = df_aligned.columns[1:]
+    df_aligned[columns] = df_aligned[columns].astype(np.float32)
+    return df_aligned
@@ -0,0 +1,137 @@
+"""\
+Run the resource collectors of a VM and stream their output to stdout, for the host to receive.
+All output is multiplexed over stdout as frames: a header (channel, length) followed by data.
+Sampling stops as soon as stdin is closed, so the collectors never outlive the connection.
+"""
+
+import argparse
+import logging
+import struct
+import sys
+import threading
+
+import resource_usage
+import resource_usage_os
+
+# Channel (uint8) and data length (uint32) of a frame
+HEADER = struct.Struct("<BI")
+
+# Channel per output file of the collectors
+CHANNELS = {
+    "resource_usage.bin": 0,
+    "resource_usage.idx": 1,
+    "resource_usage_os.csv": 2,
+}
+
+
+class Channel:
+    """File-like object that writes each write() as one frame to stdout"""
+
+    lock = threading.Lock()
+
+    def __init__(self, name):
+        """Initialize the object
+
+        Args:
+            name (str): Output file the data belongs to, see CHANNELS
+        """
+        self.channel = CHANNELS[name]
+
+    def write(self, data):
+        """Write data to stdout as one frame
+
+        Args:
+            data (str or bytes): Data to write
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        with Channel.lock:
+            sys.stdout.buffer.write(HEADER.pack(self.channel, len(data)) + data)
+
+    def flush(self):
+        """Flush stdout"""
+        with Channel.lock:
+            sys.stdout.buffer.flush()
+
+
+def run(target, stop, *args):
+    """Run a collector, and stop all collectors if it crashes or the host disconnects
+
+    Args:
+        target (func): Collector function
+        stop (Event): Event that stops all collectors
+        args (list): Arguments of the collector
+    """
+    try:
+        target(*args)
+    except (BrokenPipeError, OSError) as e:
+        logging.debug("[WARNING][%s] Collector stopped", str(e))
+    finally:
+        stop.set()
+
+
+def main(args):
+    """Main function
+
+    Args:
+        args (Namespace): Argparse object
+    """
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=run,
+            args=(
+                resource_usage.collect,
+                stop,
+                args.interval,
+                Channel("resource_usage.bin"),
+                Channel("resource_usage.idx"),
+                stop,
+            ),
+        ),
+        threading.Thread(
+            target=run,
+            args=(
+                resource_usage_os.collect,
+                stop,
+                args.interval_os,
+                Channel("resource_usage_os.csv"),
+                stop,
+            ),
+        ),
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    # The host closes stdin to stop the collectors
+    sys.stdin.read()
+    logging.info("Stdin closed, stop collecting")
+    stop.set()
+
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    # Get input arguments and parse them
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", action="store_true", help="increase verbosity level")
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.05,
+        help="Interval in seconds to measure cgroup resource usage, between 0.01 and 0.1",
+    )
+    parser.add_argument(
+        "--interval-os",
+        type=float,
+        default=0.5,
+        help="Interval in seconds to measure OS resource usage",
+    )
+    arguments = parser.parse_args()
+
+    resource_usage.enable_logging(arguments.verbose)
+    main(arguments)
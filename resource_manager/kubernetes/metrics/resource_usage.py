@@ -0,0 +1,333 @@
+"""\
+Measure resource usage of Kubernetes components and pods on a node, directly from cgroups.
+Supports cgroup v2, and falls back to cgroup v1 if v2 is not mounted.
+
+Output is binary to keep up with 10-100 ms intervals:
+- resource_usage.bin: One fixed-size record per cgroup per sample, see RECORD
+- resource_usage.idx: One line per cgroup, mapping its id in the records to a name
+"""
+
+import argparse
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+# Time (ns), cgroup id, CPU time (us), memory (bytes), disk read (bytes), disk written (bytes)
+# CPU time and disk bytes are counters, the host computes rates from consecutive records
+RECORD = struct.Struct("<qIQQQQ")
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+POD_LOGS = "/var/log/pods"
+
+# Cgroups of Kubernetes pods, with the cgroupfs or systemd cgroup driver
+# For example: kubepods/burstable/pod<uid> or kubepods-burstable-pod<uid_with_underscores>.slice
+# Static pods, like the control plane, use a 32 hex digit config hash as UID instead
+POD_CGROUP = re.compile(
+    r"pod([0-9a-f]{8}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{12}|[0-9a-f]{32})"
+)
+
+# Services that are part of Kubernetes but don't run in pods
+SERVICES = ["kubelet", "containerd"]
+
+# Search for new pods at most this often (s)
+DISCOVER_INTERVAL = 1.0
+
+
+def enable_logging(verbose):
+    """Enable logging -> only used for debugging this script"""
+    # Set parameters
+    new_level = logging.INFO
+    if verbose:
+        new_level = logging.DEBUG
+
+    new_format = "[%(asctime)s %(filename)20s:%(lineno)4s - %(funcName)25s() ] %(message)s"
+    logging.basicConfig(format=new_format, level=new_level, datefmt="%Y-%m-%d %H:%M:%S")
+    logging.debug("Logging has been enabled")
+
+
+class Cgroup:
+    """Files of one cgroup, kept open so every sample only costs a few pread() calls"""
+
+    def __init__(self, name, path, version):
+        """Open the cgroup files
+
+        Args:
+            name (str): Name of the cgroup in the output
+            path (str): Path of the cgroup relative to the cgroup root
+            version (int): Cgroup version, 1 or 2
+        """
+        self.name = name
+        self.version = version
+
+        if version == 2:
+            base = os.path.join(CGROUP_ROOT, path)
+            files = [
+                os.path.join(base, "cpu.stat"),
+                os.path.join(base, "memory.current"),
+                os.path.join(base, "io.stat"),
+            ]
+        else:
+            files = [
+                os.path.join(CGROUP_ROOT, "cpuacct", path, "cpuacct.usage"),
+                os.path.join(CGROUP_ROOT, "memory", path, "memory.usage_in_bytes"),
+                os.path.join(CGROUP_ROOT, "blkio", path, "blkio.throttle.io_service_bytes"),
+            ]
+
+        self.fds = []
+        try:
+            for file in files:
+                self.fds.append(os.open(file, os.O_RDONLY))
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        """Close all files of the cgroup"""
+        for fd in self.fds:
+            os.close(fd)
+
+        self.fds = []
+
+    def read(self):
+        """Read the current counters of the cgroup
+
+        Returns:
+            (int, int, int, int): CPU time (us), memory (bytes), disk read and written (bytes)
+        """
+        cpu = os.pread(self.fds[0], 4096, 0)
+        memory = int(os.pread(self.fds[1], 64, 0))
+        io = os.pread(self.fds[2], 65536, 0).split()
+
+        read = 0
+        written = 0
+        if self.version == 2:
+            # cpu.stat starts with: usage_usec 123
+            cpu = int(cpu.split(maxsplit=2)[1])
+
+            # io.stat has one line per device: 8:0 rbytes=1 wbytes=2 rios=3 ...
+            for field in io:
+                if field.startswith(b"rbytes="):
+                    read += int(field[7:])
+                elif field.startswith(b"wbytes="):
+                    written += int(field[7:])
+        else:
+            # cpuacct.usage is in ns
+            cpu = int(cpu) // 1000
+
+            # blkio has lines like: 8:0 Read 123
+            for i in range(1, len(io) - 1, 3):
+                if io[i] == b"Read":
+                    read += int(io[i + 1])
+                elif io[i] == b"Write":
+                    written += int(io[i + 1])
+
+        return cpu, memory, read, written
+
+
+def get_version():
+    """Get the cgroup version of this node
+
+    Returns:
+        int: 2 for the unified hierarchy, 1 otherwise
+    """
+    if os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+        return 2
+
+    return 1
+
+
+def get_pod_names():
+    """Map pod UIDs to pod names using the log directories the kubelet creates for each pod
+
+    Returns:
+        dict(str): Pod name (namespace/name) per pod UID
+    """
+    names = {}
+    try:
+        directories = os.listdir(POD_LOGS)
+    except OSError:
+        return names
+
+    # Directories are named <namespace>_<name>_<uid>
+    for directory in directories:
+        fields = directory.split("_")
+        if len(fields) == 3:
+            names[fields[2]] = "%s/%s" % (fields[0], fields[1])
+
+    return names
+
+
+def discover(version):
+    """Find all cgroups to measure: Kubernetes services and pods
+
+    Args:
+        version (int): Cgroup version, 1 or 2
+
+    Returns:
+        dict(str): Cgroup name per path relative to the cgroup root
+    """
+    root = CGROUP_ROOT
+    if version == 1:
+        root = os.path.join(CGROUP_ROOT, "memory")
+
+    cgroups = {}
+    for service in SERVICES:
+        path = "system.slice/%s.service" % (service)
+        if os.path.isdir(os.path.join(root, path)):
+            cgroups[path] = service
+
+    names = None
+    for base in ["kubepods.slice", "kubepods"]:
+        for dirpath, dirnames, _ in os.walk(os.path.join(root, base)):
+            for dirname in list(dirnames):
+                match = POD_CGROUP.search(dirname)
+                if match is None:
+                    continue
+
+                # Don't descend into the containers of a pod
+                dirnames.remove(dirname)
+
+                if names is None:
+                    names = get_pod_names()
+
+                uid = match.group(1).replace("_", "-")
+                path = os.path.relpath(os.path.join(dirpath, dirname), root)
+                cgroups[path] = names.get(uid, "pod/%s" % (uid))
+
+    return cgroups
+
+
+def read_node(stat, meminfo, ticks):
+    """Read the CPU time and memory usage of the entire node
+
+    Args:
+        stat (int): File descriptor of /proc/stat
+        meminfo (int): File descriptor of /proc/meminfo
+        ticks (int): Clock ticks per second
+
+    Returns:
+        (int, int, int, int): CPU time (us), memory (bytes), disk read and written (bytes)
+    """
+    # cpu user nice system idle iowait irq softirq steal ...
+    fields = os.pread(stat, 4096, 0).split(b"\n", 1)[0].split()
+    busy = sum(int(fields[i]) for i in [1, 2, 3, 6, 7, 8])
+    cpu = busy * 10**6 // ticks
+
+    memory = {}
+    for line in os.pread(meminfo, 8192, 0).split(b"\n"):
+        fields = line.split()
+        if len(fields) >= 2 and fields[0] in [b"MemTotal:", b"MemAvailable:"]:
+            memory[fields[0]] = int(fields[1]) * 1024
+
+    return cpu, memory[b"MemTotal:"] - memory[b"MemAvailable:"], 0, 0
+
+
+def collect(interval, f, f_idx, stop):
+    """Sample all cgroups every interval until stopped
+
+    Args:
+        interval (float): Interval in seconds between samples
+        f (file): Binary file to write the records to
+        f_idx (file): Text file to write the cgroup index to
+        stop (Event): Stop sampling once this is set
+    """
+    version = get_version()
+    logging.info("Use cgroup v%i, sample every %f seconds", version, interval)
+
+    stat = os.open("/proc/stat", os.O_RDONLY)
+    meminfo = os.open("/proc/meminfo", os.O_RDONLY)
+    ticks = os.sysconf("SC_CLK_TCK")
+
+    cgroups = {}
+    ids = {}
+    discover_every = max(1, int(DISCOVER_INTERVAL / interval))
+    interval = int(interval * 10**9)
+
+    # The node itself always has id 0
+    f_idx.write("0\tnode\n")
+    f_idx.flush()
+
+    # Schedule samples at fixed times, so time spent sampling doesn't cause drift
+    start_time = time.time_ns()
+    tick = 0
+    while not stop.is_set():
+        if tick % discover_every == 0:
+            for path, name in discover(version).items():
+                if path in cgroups:
+                    continue
+
+                try:
+                    cgroups[path] = Cgroup(name, path, version)
+                except OSError:
+                    continue
+
+                if path not in ids:
+                    ids[path] = len(ids) + 1
+                    f_idx.write("%i\t%s\n" % (ids[path], name))
+                    f_idx.flush()
+
+        now = time.time_ns()
+        records = [RECORD.pack(now, 0, *read_node(stat, meminfo, ticks))]
+
+        for path, cgroup in list(cgroups.items()):
+            try:
+                records.append(RECORD.pack(now, ids[path], *cgroup.read()))
+            except (OSError, ValueError, IndexError):
+                # The pod has been deleted
+                cgroup.close()
+                del cgroups[path]
+
+        f.write(b"".join(records))
+        f.flush()
+
+        # Wait until the next sample should happen, skip samples we are too late for
+        tick += 1
+        next_time = start_time + tick * interval
+        now = time.time_ns()
+        if now >= next_time:
+            skipped = (now - next_time) // interval + 1
+            logging.debug("[WARNING] Can't keep up with interval, skip %i samples", skipped)
+            tick += skipped
+            next_time = start_time + tick * interval
+
+        stop.wait((next_time - now) / 10**9)
+
+    for cgroup in cgroups.values():
+        cgroup.close()
+
+
+def main(args):
+    """Main function
+
+    Args:
+        args (Namespace): Argparse object
+    """
+    with open("resource_usage.bin", "wb") as f, open(
+        "resource_usage.idx", "w", encoding="utf-8"
+    ) as f_idx:
+        collect(args.interval, f, f_idx, threading.Event())
+
+
+if __name__ == "__main__":
+    # Get input arguments and parse them
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", action="store_true", help="increase verbosity level")
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.05,
+        help="Interval in seconds to measure resource usage, between 0.01 and 0.1",
+    )
+    arguments = parser.parse_args()
+
+    if not 0.01 <= arguments.interval <= 0.1:
+        print("Interval should be between 0.01 and 0.1 seconds")
+        sys.exit()
+
+    enable_logging(arguments.verbose)
+    main(arguments)
@@ -0,0 +1,272 @@
+"""\
+Measure resource usage of a VM from /proc, without spawning processes.
+All files are kept open and re-read every sample, and rates are computed in this process.
+The CPU time spent by this script itself is reported as well.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+# Pressure stall information is only available on kernels built with CONFIG_PSI
+PRESSURE = ["cpu", "memory", "io"]
+
+# Block devices that are not real disks
+VIRTUAL_DISKS = ("loop", "ram", "zram", "dm-", "md", "sr")
+
+COLUMNS = [
+    "timestamp",
+    "cpu-used (%)",
+    "memory-used (%)",
+    "disk-read (kB/s)",
+    "disk-write (kB/s)",
+    "net-receive (kB/s)",
+    "net-transmit (kB/s)",
+    "pressure-cpu (%)",
+    "pressure-memory (%)",
+    "pressure-io (%)",
+    "sampler-cpu (%)",
+]
+
+
+def enable_logging(verbose):
+    """Enable logging -> only used for debugging this script"""
+    # Set parameters
+    new_level = logging.INFO
+    if verbose:
+        new_level = logging.DEBUG
+
+    new_format = "[%(asctime)s %(filename)20s:%(lineno)4s - %(funcName)25s() ] %(message)s"
+    logging.basicConfig(format=new_format, level=new_level, datefmt="%Y-%m-%d %H:%M:%S")
+    logging.debug("Logging has been enabled")
+
+
+def open_files():
+    """Open all /proc files we read every sample
+
+    Returns:
+        dict(int): File descriptor per file name
+    """
+    fds = {}
+    for name in ["stat", "meminfo", "diskstats", "net/dev"]:
+        fds[name] = os.open("/proc/" + name, os.O_RDONLY)
+
+    for name in PRESSURE:
+        try:
+            fds["pressure/" + name] = os.open("/proc/pressure/" + name, os.O_RDONLY)
+        except OSError:
+            logging.debug("[WARNING] Pressure stall information for %s is not available", name)
+
+    return fds
+
+
+def get_disks():
+    """Get the names of all real disks, partitions are counted as part of their disk
+
+    Returns:
+        set(bytes): Disk names
+    """
+    try:
+        names = os.listdir("/sys/block")
+    except OSError:
+        return set()
+
+    return {name.encode() for name in names if not name.startswith(VIRTUAL_DISKS)}
+
+
+def read(fd):
+    """Read a /proc file from the start
+
+    Args:
+        fd (int): File descriptor
+
+    Returns:
+        list(list(bytes)): Fields per line
+    """
+    data = b""
+    while True:
+        chunk = os.pread(fd, 65536, len(data))
+        if not chunk:
+            break
+
+        data += chunk
+
+    return [line.split() for line in data.split(b"\n") if line]
+
+
+def sample(fds, disks):
+    """Read all counters and gauges once
+
+    Args:
+        fds (dict(int)): File descriptor per file name, see open_files()
+        disks (set(bytes)): Disks to measure, see get_disks()
+
+    Returns:
+        dict(int): Counters since boot (CPU, disk, network, pressure) and memory usage
+    """
+    values = {}
+
+    # cpu user nice system idle iowait irq softirq steal ...
+    cpu = [int(f) for f in read(fds["stat"])[0][1:9]]
+    values["cpu_idle"] = cpu[3] + cpu[4]
+    values["cpu_total"] = sum(cpu)
+
+    memory = {line[0]: int(line[1]) for line in read(fds["meminfo"])}
+    values["memory_total"] = memory[b"MemTotal:"]
+    values["memory_used"] = memory[b"MemTotal:"] - memory[b"MemAvailable:"]
+
+    # major minor name reads merged sectors_read ms writes merged sectors_written ...
+    values["disk_read"] = 0
+    values["disk_write"] = 0
+    for line in read(fds["diskstats"]):
+        if line[2] not in disks:
+            continue
+
+        values["disk_read"] += int(line[5]) * 512
+        values["disk_write"] += int(line[9]) * 512
+
+    # interface: rx_bytes packets errs drop fifo frame compressed multicast tx_bytes ...
+    values["net_receive"] = 0
+    values["net_transmit"] = 0
+    for line in read(fds["net/dev"])[2:]:
+        if line[0] == b"lo:":
+            continue
+
+        values["net_receive"] += int(line[1])
+        values["net_transmit"] += int(line[9])
+
+    # some avg10=0.00 avg60=0.00 avg300=0.00 total=123
+    for name in PRESSURE:
+        if "pressure/" + name in fds:
+            values["pressure_" + name] = int(read(fds["pressure/" + name])[0][4][6:])
+
+    # CPU time of this process, so the overhead of sampling is known
+    values["sampler"] = time.process_time_ns()
+
+    return values
+
+
+def to_row(t, dt, old, new):
+    """Compute usage between two samples
+
+    Args:
+        t (int): Time of the new sample (ns)
+        dt (int): Time between the samples (ns)
+        old (dict(int)): Previous sample, see sample()
+        new (dict(int)): Current sample, see sample()
+
+    Returns:
+        list(str): Row to write, in the order of COLUMNS
+    """
+    cpu_total = new["cpu_total"] - old["cpu_total"]
+    cpu_busy = cpu_total - (new["cpu_idle"] - old["cpu_idle"])
+
+    def rate(key):
+        """Change of a byte counter, in kB/s"""
+        return (new[key] - old[key]) * 10**6 / dt
+
+    def pressure(key):
+        """Share of time some task stalled, from a counter in us"""
+        if key not in new:
+            return ""
+
+        return "%.2f" % ((new[key] - old[key]) * 10**5 / dt)
+
+    return [
+        str(t),
+        "%.2f" % (100.0 * cpu_busy / max(1, cpu_total)),
+        "%.2f" % (100.0 * new["memory_used"] / new["memory_total"]),
+        "%.2f" % (rate("disk_read")),
+        "%.2f" % (rate("disk_write")),
+        "%.2f" % (rate("net_receive")),
+        "%.2f" % (rate("net_transmit")),
+        pressure("pressure_cpu"),
+        pressure("pressure_memory"),
+        pressure("pressure_io"),
+        "%.2f" % (100.0 * (new["sampler"] - old["sampler"]) / dt),
+    ]
+
+
+def collect(interval, f, stop):
+    """Sample the VM every interval until stopped
+
+    Args:
+        interval (float): Interval in seconds between samples
+        f (file): Text file to write the samples to, as csv
+        stop (Event): Stop sampling once this is set
+    """
+    fds = open_files()
+    disks = get_disks()
+    interval = int(interval * 10**9)
+
+    # Write header to file
+    logging.debug("Columns: %s", ", ".join(COLUMNS))
+    f.write(",".join(COLUMNS) + "\n")
+    f.flush()
+
+    # Schedule samples at fixed times, so time spent sampling doesn't cause drift
+    start_time = time.time_ns()
+    old_time = start_time
+    old = sample(fds, disks)
+    tick = 0
+    while True:
+        # Wait until the next sample should happen, skip samples we are too late for
+        tick += 1
+        next_time = start_time + tick * interval
+        now = time.time_ns()
+        if now >= next_time:
+            skipped = (now - next_time) // interval + 1
+            logging.debug("[WARNING] Can't keep up with interval, skip %i samples", skipped)
+            tick += skipped
+            next_time = start_time + tick * interval
+
+        if stop.wait((next_time - now) / 10**9):
+            break
+
+        now = time.time_ns()
+        new = sample(fds, disks)
+
+        line = ",".join(to_row(now, now - old_time, old, new))
+        logging.debug("Write line: %s", line)
+        f.write(line + "\n")
+        f.flush()
+
+        old_time = now
+        old = new
+
+    for fd in fds.values():
+        os.close(fd)
+
+
+def main(args):
+    """Main function
+
+    Args:
+        args (Namespace): Argparse object
+    """
+    with open("resource_usage_os.csv", "w", encoding="utf-8") as f:
+        collect(args.interval, f, threading.Event())
+
+
+if __name__ == "__main__":
+    # Get input arguments and parse them
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", action="store_true", help="increase verbosity level")
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.5,
+        help="Interval in seconds to measure resource usage",
+    )
+    arguments = parser.parse_args()
+
+    if arguments.interval <= 0:
+        print("Interval should be larger than 0 seconds")
+        sys.exit()
+
+    enable_logging(arguments.verbose)
+    main(arguments)
@@ -0,0 +1,406 @@
+"""\
+Track the lifecycle of Kubernetes pods using a single watch stream on the controller.
+Replaces polling 'kubectl get pods' in a loop: the apiserver only pushes changes to us,
+so the cost of tracking is constant regardless of how many pods are deployed.
+"""
+
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+from datetime import datetime, timezone
+
+# Pod statuses used in the status timeline, in lifecycle order
+STATUSES = ["Pending", "ContainerCreating", "Running", "Succeeded"]
+
+# Pod statuses and container waiting reasons that indicate a crashed deployment
+FAILED_STATUSES = ["Failed", "Unknown"]
+FAILED_REASONS = ["ErrImageNeverPull", "ErrImagePull", "ImagePullBackOff", "CrashLoopBackOff"]
+
+# Conditions of which we save the transition time as reported by Kubernetes
+CONDITIONS = ["PodScheduled", "Initialized", "ContainersReady", "Ready"]
+
+# One line per watch event, fields separated by tabs. Each line is prefixed by the controller
+# with the time the event arrived, using a bash builtin so we don't spawn a process per event.
+WATCH_TEMPLATE = (
+    '{.type}{\\"\\t\\"}'
+    + '{.object.metadata.name}{\\"\\t\\"}'
+    + '{.object.metadata.creationTimestamp}{\\"\\t\\"}'
+    + '{.object.metadata.deletionTimestamp}{\\"\\t\\"}'
+    + '{.object.status.phase}{\\"\\t\\"}'
+    + '{.object.status.conditions}{\\"\\t\\"}'
+    + '{.object.status.containerStatuses}{\\"\\n\\"}'
+)
+
+
+def transition_time(status, created, conditions, containers):
+    """Get the time a pod moved to its current status, as reported by Kubernetes.
+    These timestamps have second resolution, but don't include the watch and SSH latency.
+
+    Args:
+        status (str): Current status of the pod
+        created (str): Creation timestamp of the pod
+        conditions (list(dict)): Conditions of the pod
+        containers (list(dict)): Container statuses of the pod
+
+    Returns:
+        float: Seconds since epoch, None if Kubernetes doesn't report it
+    """
+    transitions = {
+        c["type"]: c.get("lastTransitionTime") for c in conditions if c.get("status") == "True"
+    }
+    states = [container.get("state", {}) for container in containers]
+
+    if status == "Pending":
+        return to_epoch(created)
+    if status == "ContainerCreating":
+        return to_epoch(transitions.get("PodScheduled"))
+    if status == "Running":
+        started = [to_epoch(s["running"].get("startedAt")) for s in states if "running" in s]
+        started = [t for t in started if t is not None]
+        return to_epoch(transitions.get("Ready")) or (max(started) if started else None)
+    if status == "Succeeded":
+        finished = [
+            to_epoch(s["terminated"].get("finishedAt")) for s in states if "terminated" in s
+        ]
+        finished = [t for t in finished if t is not None]
+        return max(finished) if finished else None
+
+    return None
+
+
+def to_epoch(s):
+    """Parse a Kubernetes RFC3339 timestamp (2023-09-03T11:50:03Z) to seconds since epoch
+
+    Args:
+        s (str): Kubernetes timestamp, may be None
+
+    Returns:
+        float: Seconds since epoch, None if there was no timestamp
+    """
+    if not s:
+        return None
+
+    dt = datetime.strptime(s, "%Y-%m-%dT%H:%M:%SZ")
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class PodTracker:
+    """Follow the status of all pods in a namespace via 'kubectl get pods --watch'.
+    The watch runs on the cloud controller over one SSH connection for the entire benchmark.
+    Every change to a pod is timestamped on the controller the moment it arrives, which
+    gives a status timeline at event resolution instead of at polling resolution.
+    """
+
+    def __init__(self, config, machines, namespace="default"):
+        """Initialize the object
+
+        Args:
+            config (dict): Parsed configuration
+            machines (list(Machine object)): List of machine objects representing physical machines
+            namespace (str, optional): Namespace to track pods in. Defaults to "default".
+        """
+        self.config = config
+        self.machines = machines
+        self.namespace = namespace
+
+        self.process = None
+        self.thread = None
+        self.stopped = False
+        self.failure = None
+
+        # Latest state per pod, and the time each pod was first seen in each status
+        self.pods = {}
+        self.observed = {}
+        self.conditions = {}
+        self.deleted = {}
+
+        # Status counts, with the full history of counts as the events arrived
+        self.counts = {status: 0 for status in STATUSES + FAILED_STATUSES}
+        self.history = []
+
+        # Every status transition, ordered by the time Kubernetes reports, for the status timeline
+        self.events = []
+        self.last_transition = {}
+
+        self.cond = threading.Condition()
+
+    def command(self):
+        """Build the SSH command that starts the watch on the cloud controller
+
+        Returns:
+            list(str): Command to execute
+        """
+        script = (
+            'kubectl get pods -n %s --watch --output-watch-events -o jsonpath="%s" 2>/dev/null '
+            + '| while IFS= read -r line; do echo "$EPOCHREALTIME\t$line"; done'
+        ) % (self.namespace, WATCH_TEMPLATE)
+
+        return [
+            "ssh",
+            self.config["cloud_ssh"][0],
+            "-i",
+            self.config["ssh_key"],
+            "bash -c '%s'" % (script),
+        ]
+
+    def start(self):
+        """Start the watch stream and the thread processing its events"""
+        logging.debug("Start watching pods in namespace %s", self.namespace)
+
+        # pylint: disable-next=consider-using-with
+        self.process = subprocess.Popen(
+            self.command(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+
+        self.thread = threading.Thread(target=self.read, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the watch stream"""
+        logging.debug("Stop watching pods in namespace %s", self.namespace)
+        self.stopped = True
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+        with self.cond:
+            self.cond.notify_all()
+
+    def read(self):
+        """Process events from the watch stream until the tracker is stopped.
+        The apiserver closes long-running watches after a while: restart the watch in that case.
+        The restarted watch first lists all existing pods again, so no state is lost.
+        """
+        while True:
+            for line in self.process.stdout:
+                self.parse(line.rstrip("\n"))
+
+            if self.stopped:
+                return
+
+            logging.debug("Pod watch stream closed, restart it")
+            time.sleep(1)
+            # pylint: disable-next=consider-using-with
+            self.process = subprocess.Popen(
+                self.command(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+            )
+
+    def parse(self, line):
+        """Parse one line of the watch stream and update the state of that pod
+
+        Example line (tab separated):
+        1692908601.269961  MODIFIED  empty-1-f4lwj    Pending  [{"lastProbeTime":null,...}]  [...]
+
+        Args:
+            line (str): Line from the watch stream
+        """
+        fields = line.split("\t")
+        if len(fields) != 8:
+            logging.debug("[WARNING] Could not parse watch event: %s", line)
+            return
+
+        t, event, name, created, deletion, phase, conditions, containers = fields
+        try:
+            t = float(t)
+            conditions = json.loads(conditions) if conditions else []
+            containers = json.loads(containers) if containers else []
+        except ValueError as e:
+            logging.debug("[WARNING][%s] Could not parse watch event: %s", str(e), line)
+            return
+
+        status = phase
+        for container in containers:
+            waiting = container.get("state", {}).get("waiting", {})
+            reason = waiting.get("reason", "")
+            if reason in FAILED_REASONS:
+                status = reason
+            elif reason == "ContainerCreating" and phase == "Pending":
+                status = "ContainerCreating"
+
+        with self.cond:
+            # Pods that are being deleted no longer count towards the status of the deployment
+            if event == "DELETED" or deletion:
+                if name in self.pods:
+                    self.update(name, None, t)
+                    self.deleted[name] = t
+            elif event in ["ADDED", "MODIFIED"]:
+                self.update(
+                    name, status, t, transition_time(status, created, conditions, containers)
+                )
+
+                for condition in conditions:
+                    if condition["type"] in CONDITIONS and condition.get("status") == "True":
+                        self.conditions.setdefault(name, {})[condition["type"]] = to_epoch(
+                            condition["lastTransitionTime"]
+                        )
+
+                if status in FAILED_REASONS and self.failure is None:
+                    self.failure = (name, status)
+
+            self.cond.notify_all()
+
+    def update(self, name, status, t, t_transition=None):
+        """Move a pod to a new status, and record the status counts if they changed.
+        Should only be called while holding the lock.
+
+        Args:
+            name (str): Name of the pod
+            status (str): New status of the pod, None if the pod was deleted
+            t (float): Time at which the controller received the event
+            t_transition (float, optional): Time of the transition reported by Kubernetes,
+                only used to order transitions. Defaults to None, then the arrival time is used.
+        """
+        old = self.pods.get(name)
+        if old == status:
+            return
+
+        if old in self.counts:
+            self.counts[old] -= 1
+
+        if status is None:
+            del self.pods[name]
+        else:
+            self.pods[name] = status
+            self.observed.setdefault(name, {}).setdefault(status, t)
+            if status in self.counts:
+                self.counts[status] += 1
+            if status in FAILED_STATUSES and self.failure is None:
+                self.failure = (name, status)
+
+        self.history.append([t, dict(self.counts)])
+
+        # Keep the transitions of a pod in order, as timestamps only have second resolution
+        t_transition = t if t_transition is None else t_transition
+        t_transition = max(t_transition, self.last_transition.get(name, t_transition))
+        self.last_transition[name] = t_transition
+        self.events.append((t_transition, t, old, status))
+
+    def wait(self, condition, description, timeout=None):
+        """Block until the status counts satisfy a condition.
+        Exits the framework if any pod ends up in a failed status while waiting, unless a timeout
+        is given: then the caller decides what a failed pod means.
+
+        Args:
+            condition (func(dict) -> bool): Function on the status counts
+            description (str): What we are waiting for, used for logging
+            timeout (float, optional): Stop waiting after this many seconds. Defaults to None.
+
+        Returns:
+            float: Controller time of the event that satisfied the condition,
+                   None if a timeout was given and it passed or a pod failed
+        """
+        logging.debug("Wait until %s", description)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while not condition(self.counts):
+                if self.failure is not None:
+                    if deadline is not None:
+                        logging.debug("Pod %s has status %s", self.failure[0], self.failure[1])
+                        return None
+
+                    logging.error(
+                        "Container on cloud/edge %s has status %s, expected %s",
+                        self.failure[0],
+                        self.failure[1],
+                        description,
+                    )
+                    sys.exit()
+
+                if self.stopped:
+                    logging.error("Pod watch stopped while waiting until %s", description)
+                    sys.exit()
+
+                if deadline is None:
+                    self.cond.wait()
+                elif not self.cond.wait(max(0.0, deadline - time.monotonic())):
+                    if time.monotonic() >= deadline:
+                        logging.debug("Timed out waiting until %s", description)
+                        return None
+
+            if self.history:
+                return self.history[-1][0]
+
+            return None
+
+    def get_failure(self):
+        """Get the first failed pod since the last clear_failure()
+
+        Returns:
+            tuple(str, str): Name and status of the pod, None if no pod failed
+        """
+        with self.cond:
+            return self.failure
+
+    def clear_failure(self):
+        """Forget the first failed pod, after all pods of a deployment have been deleted"""
+        with self.cond:
+            self.failure = None
+
+    def status(self, expected):
+        """Build the status timeline: the number of pods per status after every transition.
+        Transitions are ordered by the time Kubernetes reports for them, so events that arrive
+        out of order over the watch don't skew the timeline. Times are those at which the events
+        arrived on the controller: Kubernetes timestamps only have second resolution and come from
+        the apiserver and kubelet clocks, so they can't be compared with the other timestamps.
+
+        Args:
+            expected (int): Number of pods that should be deployed
+
+        Returns:
+            (list(dict)): Status of all pods at each transition
+        """
+        status = []
+        counts = {s: 0 for s in STATUSES + FAILED_STATUSES}
+        t = None
+        with self.cond:
+            for _, t_arrival, old, new in sorted(self.events, key=lambda e: e[:2]):
+                # Keep the timeline monotonic, so the last entry is the last event that arrived
+                t = t_arrival if t is None else max(t, t_arrival)
+                if old in counts:
+                    counts[old] -= 1
+                if new in counts:
+                    counts[new] += 1
+
+                entry = {
+                    "time_orig": t,
+                    "time": t,
+                    "Arriving": 0,
+                    "Pending": counts["Pending"],
+                    "ContainerCreating": counts["ContainerCreating"],
+                    "Running": counts["Running"],
+                    "Succeeded": counts["Succeeded"],
+                }
+
+                pods_in_system = sum(counts[s] for s in STATUSES)
+                entry["Arriving"] = max(0, expected - pods_in_system)
+                status.append(entry)
+
+        return status
+
+    def transitions(self):
+        """Get the transition times of every pod seen by the tracker
+
+        Returns:
+            dict(dict): Per pod: the time each status was first observed (controller clock),
+                        the time each condition became true (as reported by Kubernetes),
+                        and the time the pod was deleted, if it was
+        """
+        with self.cond:
+            return {
+                name: {
+                    "observed": dict(observed),
+                    "conditions": dict(self.conditions.get(name, {})),
+                    "deleted": self.deleted.get(name),
+                }
+                for name, observed in self.observed.items()
+            }
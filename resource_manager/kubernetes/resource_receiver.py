@@ -0,0 +1,107 @@
+"""\
+Receive resource usage samples from the VMs while the benchmark runs.
+Each VM streams the output of its collectors over one SSH connection, see
+metrics/resource_stream.py. We write it to local files as it arrives, so nothing has to be fetched
+afterwards and the VM disks don't fill up. Closing the connection stops the collectors.
+"""
+
+import logging
+import os
+import struct
+import subprocess
+import threading
+
+# Channel (uint8) and data length (uint32) of a frame, see metrics/resource_stream.py
+HEADER = struct.Struct("<BI")
+
+# Local output file per channel, formatted with the VM name
+FILES = {
+    0: "resource_usage-%s.bin",
+    1: "resource_usage-%s.idx",
+    2: "resource_usage_os-%s.csv",
+}
+
+
+class ResourceReceiver:
+    """Start the resource collectors on a VM, and save their streamed output on the host"""
+
+    def __init__(self, config, ssh):
+        """Initialize the object
+
+        Args:
+            config (dict): Parsed configuration
+            ssh (str): VM to collect resource usage on, as name@ip
+        """
+        self.config = config
+        self.ssh = ssh
+        self.name = ssh.split("@")[0]
+
+        self.process = None
+        self.thread = None
+        self.received = 0
+
+    def path(self, name):
+        """Get the local path of an output file
+
+        Args:
+            name (str): File name, formatted with the VM name
+
+        Returns:
+            str: Path of the file
+        """
+        return os.path.join(
+            self.config["infrastructure"]["base_path"], ".continuum", name % (self.name)
+        )
+
+    def start(self):
+        """Start the collectors on the VM, and the thread receiving their output"""
+        logging.debug("Start collecting resource usage on %s", self.name)
+
+        command = [
+            "ssh",
+            self.ssh,
+            "-i",
+            self.config["ssh_key"],
+            "python3 -u resource_stream.py",
+        ]
+
+        with open(self.path("resource_stream-%s.txt"), "wb") as log:
+            # pylint: disable-next=consider-using-with
+            self.process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log
+            )
+
+        self.thread = threading.Thread(target=self.receive, daemon=True)
+        self.thread.start()
+
+    def receive(self):
+        """Write every frame to the file of its channel, until the stream closes"""
+        files = {channel: open(self.path(name), "wb") for channel, name in FILES.items()}
+
+        try:
+            stream = self.process.stdout
+            while True:
+                header = stream.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+
+                channel, length = HEADER.unpack(header)
+                data = stream.read(length)
+                if len(data) < length:
+                    break
+
+                files[channel].write(data)
+                self.received += length
+        finally:
+            for f in files.values():
+                f.close()
+
+    def stop(self):
+        """Stop the collectors by closing their stdin, and wait for the last samples"""
+        logging.debug("Stop collecting resource usage on %s", self.name)
+        self.process.stdin.close()
+        self.thread.join()
+        self.process.wait()
+
+        if self.received == 0:
+            logging.warning("Did not receive any resource usage from %s", self.name)
@@ -334,10 +334,19 @@ xargs -I %% sh -c \"virsh destroy %%\""
             )
 
             # Now plot resources
-            df1 = pd.read_csv(p["resource"])
-            df2 = pd.read_csv(p["resource_os"])
+            df_resources = pd.read_csv(p["resource"])
+            if p["resource_os"] != "":
+                # Older runs saved OS metrics in a separate file, not yet aligned in time
+                df_os = pd.read_csv(p["resource_os"]).sort_values("Time (s)")
+                df_resources = pd.merge_asof(
+                    df_resources.sort_values("Time (s)"),
+                    df_os,
+                    on="Time (s)",
+                    direction="nearest",
+                )
+
             plot.plot_resources(
-                [df1, df2],
+                df_resources,
                 timestamp,
                 xmax=p["xmax"],
                 ymax=p["ymax"],